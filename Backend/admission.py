@@ -0,0 +1,151 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from cancellation import CANCEL_POLL_SECONDS
+from metrics import ADMISSION_WAIT
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_GENERATIONS = int(os.environ.get("MAX_CONCURRENT_GENERATIONS", "2"))
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", "16"))
+ADMISSION_MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", "30"))
+ADMISSION_REJECT_MODE = os.environ.get("ADMISSION_REJECT_MODE", "fallback")
+EXPECTED_GENERATION_SECONDS = float(os.environ.get("EXPECTED_GENERATION_SECONDS", "30"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a generation cannot start within its deadline"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Generation rejected: {reason}")
+        self.reason = reason
+        self.retry_after = max(1, int(round(retry_after)))
+        self.status_code = 429 if reason == "queue_full" else 503
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded FIFO wait queue in front of the model server.
+
+    At most ``max_concurrent`` generations run at once. Further requests
+    wait in a queue of at most ``max_queue`` entries. A request is rejected
+    straight away when the queue is full, or when the estimated wait
+    (queue position x average generation time / slots) already exceeds
+    its deadline. A queued request is also rejected if its deadline passes
+    before a slot frees up, and leaves the queue as soon as its cancel
+    token fires.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_GENERATIONS, max_queue=ADMISSION_QUEUE_SIZE,
+                 max_wait=ADMISSION_MAX_WAIT, expected_service_time=EXPECTED_GENERATION_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters = deque()
+        self._cond = threading.Condition()
+
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "deadline": 0, "deadline_exceeded": 0}
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+        self.avg_service_time = expected_service_time
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def estimated_wait(self, position=None):
+        """Expected seconds before a request at ``position`` in the queue gets a slot"""
+        if position is None:
+            position = len(self._waiters)
+        if self.in_flight < self.max_concurrent and position == 0:
+            return 0.0
+        return (position // self.max_concurrent + 1) * self.avg_service_time
+
+    def _reject(self, reason):
+        self.rejected[reason] += 1
+        retry_after = self.estimated_wait()
+        logger.warning(
+            f"Admission rejected ({reason}): {self.in_flight} running, {len(self._waiters)} queued"
+        )
+        return AdmissionRejected(reason, retry_after)
+
+    def acquire(self, max_wait=None, cancel=None):
+        """Block until a generation slot is free; returns seconds spent waiting.
+
+        Raises GenerationCancelled if ``cancel`` fires while the request is queued.
+        """
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        start = time.time()
+        deadline = start + max_wait
+
+        with self._cond:
+            if self.in_flight < self.max_concurrent and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                ADMISSION_WAIT.observe(0.0)
+                return 0.0
+
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject("queue_full")
+            if self.estimated_wait(len(self._waiters)) > max_wait:
+                raise self._reject("deadline")
+
+            ticket = object()
+            self._waiters.append(ticket)
+            try:
+                while self._waiters[0] is not ticket or self.in_flight >= self.max_concurrent:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise self._reject("deadline_exceeded")
+                    if cancel is not None:
+                        cancel.check(stage="queued")
+                        remaining = min(remaining, CANCEL_POLL_SECONDS)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+
+            self.in_flight += 1
+            self.admitted += 1
+            waited = time.time() - start
+            self.total_wait += waited
+            self.max_observed_wait = max(self.max_observed_wait, waited)
+            ADMISSION_WAIT.observe(waited)
+            return waited
+
+    def release(self, service_time=None):
+        with self._cond:
+            self.in_flight -= 1
+            if service_time is not None:
+                self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * service_time
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, max_wait=None):
+        """Hold a generation slot for the duration of the block"""
+        self.acquire(max_wait)
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.release(time.time() - start)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "max_wait": self.max_wait,
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "avg_wait_seconds": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+                "max_wait_seconds": round(self.max_observed_wait, 3),
+                "avg_service_seconds": round(self.avg_service_time, 3)
+            }
@@ -1,9 +1,33 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g, stream_with_context
 from flask_cors import CORS
 import logging
+import os
+import threading
 import time
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ollama_client import OLLAMA_HOST
+from ollama_pool import get_ollama_pool
+from health import ReadinessMonitor
+from cache import create_response_cache, make_cache_key
+from singleflight import SingleFlight
+from admission import ADMISSION_REJECT_MODE, AdmissionController, AdmissionRejected
+from trip_sections import SECTION_NAMES, TripSectionStream, split_trip_sections
+from trip_parser import PARSER_VERSION, parse_generation
+from fallback_plans import fallback_budget, fallback_budgets, fallback_itinerary
+from trip_request import InvalidTripRequest, trip_request_from_json
+from warehouse import TripWarehouse, plan_request
+from semantic_cache import SemanticCache
+from knowledge import estimate_tokens, get_knowledge_base
+from model_lifecycle import OLLAMA_KEEP_ALIVE, ModelLifecycle
+from slo_controller import SLO_DEGRADED_CACHE_TTL, SLOController
+from jobs import JOB_MAX_PRIORITY, JobQueue, RetryJob
+from cancellation import CancelToken, GenerationCancelled, PartialStore, continuation_prompt
+from metrics import (CONTENT_TYPE as METRICS_CONTENT_TYPE, FALLBACKS, HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS,
+                     OLLAMA_IN_FLIGHT, OLLAMA_REQUESTS, PROMPT_BUILD_SECONDS, REGISTRY, component_collector,
+                     model_lifecycle_collector, record_ollama_result, render as render_metrics, warehouse_collector)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,142 +35,513 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app) 
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_URL = f"{OLLAMA_HOST}/api/generate"
 MODEL_NAME = "llama3.2"
 
+readiness = ReadinessMonitor(get_ollama_pool, MODEL_NAME)
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.time()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    HTTP_LATENCY.observe(time.time() - g.request_start, route=route)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    HTTP_IN_FLIGHT.dec()
+
 def test_ollama_connection():
-    """Test if Ollama is running and model is available"""
+    """Check that Ollama is running and the model is pulled, without running inference"""
+    return readiness.check_now()["model_available"]
+
+GENERATION_OPTIONS = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "num_predict": 1500,
+    "num_ctx": 4096,
+    "repeat_penalty": 1.1,
+    "stop": ["\n\nHuman:", "\n\nUser:"]
+}
+
+response_cache = create_response_cache()
+generation_flights = SingleFlight()
+admission = AdmissionController()
+partial_generations = PartialStore()
+
+warehouse = TripWarehouse()
+semantic_cache = SemanticCache()
+
+REGISTRY.register_collector('components', component_collector(
+    admission.stats, response_cache.stats, generation_flights.stats, lambda: get_ollama_pool().stats()
+))
+REGISTRY.register_collector('warehouse', warehouse_collector(warehouse.stats))
+
+TRIP_GENERATION_OPTIONS = {
+    **GENERATION_OPTIONS,
+    "num_predict": 2200
+}
+
+def generation_cache_key(template, user_prompt, options=GENERATION_OPTIONS):
+    """Cache key for a generation: normalized prompt, template (plus grounding facts version), model and options"""
+    return make_cache_key(template + get_knowledge_base().version, user_prompt, MODEL_NAME, options)
+
+def lookup_generation(template, trip, options=GENERATION_OPTIONS):
+    """Exact cache, then semantic cache; returns (cache_key, cached or None, X-Cache status, semantic entry)"""
+    cache_key = generation_cache_key(template, trip.prompt, options)
+    cached = response_cache.get(cache_key)
+    if cached:
+        return cache_key, cached, 'HIT', None
+    semantic = (generation_cache_key(template, '', options), trip)
+    similar = semantic_cache.lookup(*semantic)
+    if similar is not None:
+        return cache_key, {'response': similar}, 'SEMANTIC', None
+    return cache_key, None, 'MISS', semantic
+
+def cache_generation(cache_key, result, semantic=None, plan=None, kind=None):
+    """Store a successful generation in the response cache and, given its entry, the semantic cache.
+
+    Given its kind, the parsed form is stored in the same entry. Answers the SLO controller shortened
+    or moved to the small model are kept only briefly and are not offered to near-duplicate requests.
+    """
+    entry = {'response': result}
+    if kind:
+        entry['structured'] = parse_generation(kind, result)
+    if plan and plan['adjustment']:
+        response_cache.set(cache_key, entry, ttl=SLO_DEGRADED_CACHE_TTL)
+        return
+    response_cache.set(cache_key, entry)
+    if semantic:
+        semantic_cache.remember(*semantic, result)
+
+def structured_generation(kind, text, cached=None):
+    """Parsed form of a generation: the one stored with its cache entry, else parsed now"""
+    stored = cached.get('structured') if cached else None
+    if stored and stored.get('version') == PARSER_VERSION:
+        return stored
+    return parse_generation(kind, text)
+
+def wants_structured():
+    """Whether the client asked for the parsed form with ?structured=1"""
+    return request.args.get('structured', '').lower() in ('1', 'true')
+
+def with_structured(body, kind, text, cached=None):
+    """Add 'structured' to a successful JSON body when the client asked for it"""
+    if wants_structured():
+        body['structured'] = structured_generation(kind, text, cached)
+    return body
+
+def build_ollama_payload(prompt, stream=False, options=None, model=None, raw=False):
+    """Build the /api/generate payload shared by blocking and streaming calls"""
+    payload = {
+        "model": model or MODEL_NAME,
+        "prompt": prompt,
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": dict(options or GENERATION_OPTIONS)
+    }
+    if raw:
+        payload["raw"] = True
+    return payload
+
+# A resumed generation always gets room for at least this many new tokens
+MIN_CONTINUATION_TOKENS = 64
+
+def continuation_request(prompt, options, model, partial):
+    """(raw prompt, options) that continue a kept partial answer with the remaining token budget"""
+    options = dict(options or GENERATION_OPTIONS)
+    options['num_predict'] = max(MIN_CONTINUATION_TOKENS, options['num_predict'] - estimate_tokens(partial))
+    return continuation_prompt(model, prompt, partial), options
+
+def resumed_chunk(partial):
+    """Stream chunk that replays a kept partial answer before the continuation"""
+    chunk = {'response': partial, 'done': False, 'resumed': True}
+    return chunk, json.dumps(chunk).encode()
+
+def ollama_chunks(prompt, timeout, options=None, affinity_key=None, model=None, cancel=None):
+    """Yield (chunk, raw line) pairs of one streamed generation, ending with Ollama's final chunk.
+
+    A partial answer kept for ``affinity_key`` is replayed first and continued. ``cancel`` (and the
+    ``timeout`` deadline) is checked between chunks; once it fires the upstream response is closed,
+    which stops Ollama generating, the text so far is kept for a later resume, and
+    GenerationCancelled is raised.
+    """
+    model = model or MODEL_NAME
+    cancel = CancelToken(time.time() + timeout, parent=cancel)
+    pieces = []
+    request_prompt, raw = prompt, False
+    partial = partial_generations.take(affinity_key, model, prompt)
+    if partial:
+        logger.info(f"Resuming {len(partial)} characters of an aborted generation")
+        pieces.append(partial)
+        yield resumed_chunk(partial)
+        request_prompt, options = continuation_request(prompt, options, model, partial)
+        raw = True
+    
+    lines = stream_with_ollama(request_prompt, timeout=timeout, options=options, affinity_key=affinity_key,
+                               model=model, raw=raw)
     try:
-        response = requests.post(OLLAMA_URL, 
-            json={
-                "model": MODEL_NAME,
-                "prompt": "Hello",
-                "stream": False
-            }, 
-            timeout=10
-        )
-        if response.status_code == 200:
-            logger.info(" Ollama connection successful")
-            return True
-        else:
-            logger.error(f" Ollama responded with status: {response.status_code}")
-            return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f" Failed to connect to Ollama: {e}")
-        return False
-
-def generate_with_ollama(prompt, timeout=180):
-    """Generate response using direct Ollama API with optimized settings"""
+        for line in lines:
+            cancel.check()
+            chunk = json.loads(line)
+            if not chunk.get('done'):
+                pieces.append(chunk.get('response', ''))
+            yield chunk, line
+    except Exception:
+        partial_generations.keep(affinity_key, ''.join(pieces), model, prompt)
+        raise
+    finally:
+        lines.close()
+
+def generate_with_ollama(prompt, timeout=180, options=None, affinity_key=None, model=None, cancel=None):
+    """Generate a complete response. Ollama streams it internally so the call can be abandoned between tokens"""
     try:
-        payload = {
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "num_predict": 1500,  
-                "num_ctx": 4096,     
-                "repeat_penalty": 1.1,
-                "stop": ["\n\nHuman:", "\n\nUser:"]  
-            }
-        }
-        
         logger.info(f"Making Ollama request with {timeout}s timeout...")
         
         start_time = time.time()
+        OLLAMA_IN_FLIGHT.inc()
         
-        response = requests.post(OLLAMA_URL, 
-            json=payload, 
-            timeout=timeout,
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            generated_text = result.get('response', 'No response generated')
+        pieces = []
+        for chunk, _ in ollama_chunks(prompt, timeout, options=options, affinity_key=affinity_key, model=model,
+                                      cancel=cancel):
+            if not chunk.get('done'):
+                pieces.append(chunk.get('response', ''))
+                continue
+            generated_text = ''.join(pieces) or 'No response generated'
             elapsed_time = time.time() - start_time
             logger.info(f"Response generated successfully ({len(generated_text)} characters, {elapsed_time:.1f}s)")
+            OLLAMA_REQUESTS.inc(mode='blocking', outcome='success')
+            record_ollama_result(chunk, elapsed_time, 'blocking')
+            latency_controller.observe(chunk, elapsed_time, model)
             return generated_text
-        else:
-            logger.error(f"Ollama API error: {response.status_code} - {response.text}")
-            return None
+        
+        logger.error("Ollama response ended without a final chunk")
+        OLLAMA_REQUESTS.inc(mode='blocking', outcome='error')
+        return None
             
+    except GenerationCancelled as e:
+        OLLAMA_REQUESTS.inc(mode='blocking', outcome='cancelled')
+        if e.reason == 'deadline':
+            logger.error(f"Ollama generation passed its {timeout}s deadline; aborted")
+            return "TIMEOUT"
+        logger.info("Generation abandoned by its client; aborted")
+        return None
     except requests.exceptions.Timeout:
         logger.error(f"Ollama request timed out after {timeout} seconds")
+        OLLAMA_REQUESTS.inc(mode='blocking', outcome='timeout')
         return "TIMEOUT"
     except requests.exceptions.ConnectionError:
         logger.error("Cannot connect to Ollama - is it running?")
+        OLLAMA_REQUESTS.inc(mode='blocking', outcome='error')
         return None
     except Exception as e:
         logger.error(f"Error calling Ollama: {e}")
+        OLLAMA_REQUESTS.inc(mode='blocking', outcome='error')
         return None
+    finally:
+        OLLAMA_IN_FLIGHT.dec()
 
-def vector_db_store_travel_data(destination, itinerary_text, budget_text, metadata=None):
+def requested_max_wait():
+    """Per-request admission deadline from the X-Max-Queue-Wait header (seconds), if given"""
     try:
-        """
-        import chromadb
-        from chromadb.utils import embedding_functions
+        return float(request.headers['X-Max-Queue-Wait'])
+    except (KeyError, ValueError):
+        return None
+
+def generate_shared(cache_key, full_prompt, timeout, options=None, max_wait=None, semantic=None, plan=None,
+                    kind=None):
+    """Run one generation per cache key across concurrent requests, caching successes.
+
+    Returns (result, shared) where shared is True when this request waited on
+    a generation started by another request. Raises AdmissionRejected when no
+    model slot frees up within max_wait.
+    """
+    def generate():
+        with admission.slot(max_wait):
+            result = generate_with_ollama(full_prompt, timeout=timeout, options=options, affinity_key=cache_key,
+                                          model=plan['model'] if plan else None)
+        if result is not None and result != "TIMEOUT":
+            cache_generation(cache_key, result, semantic, plan, kind)
+        return result
+    
+    return generation_flights.do(cache_key, generate)
+
+def stream_with_ollama(prompt, timeout=180, options=None, affinity_key=None, model=None, raw=False):
+    """Yield raw NDJSON lines from Ollama as soon as each chunk is generated; closing it aborts the request"""
+    payload = build_ollama_payload(prompt, stream=True, options=options, model=model, raw=raw)
+    
+    logger.info(f"Making streaming Ollama request with {timeout}s timeout...")
+    
+    with get_ollama_pool().stream("/api/generate", payload, timeout=timeout, affinity_key=affinity_key) as response:
+        if response.status_code != 200:
+            raise requests.exceptions.HTTPError(
+                f"Ollama API error: {response.status_code} - {response.text}"
+            )
+        for line in response.iter_lines():
+            if line:
+                yield line
+
+def stream_summary_frame(chunk, start_time, first_token_time, plan=None):
+    """Final frame of a stream: wall-clock timing, Ollama's token counters and the SLO plan"""
+    eval_count = chunk.get('eval_count', 0)
+    eval_duration = chunk.get('eval_duration', 0)
+    return {
+        'done': True,
+        'status': 'success',
+        'timing': {
+            'time_to_first_token': round(first_token_time - start_time, 3) if first_token_time else None,
+            'total_duration': round(time.time() - start_time, 3),
+            'ollama_total_duration': chunk.get('total_duration', 0) / 1e9,
+            'load_duration': chunk.get('load_duration', 0) / 1e9
+        },
+        'tokens': {
+            'prompt_eval_count': chunk.get('prompt_eval_count', 0),
+            'eval_count': eval_count,
+            'tokens_per_second': round(eval_count / (eval_duration / 1e9), 2) if eval_duration else None
+        },
+        'generation': plan
+    }
+
+def stream_generation_frames(full_prompt, trip, fallback_fn, timeout, cache_key=None, options=None, semantic=None,
+                             plan=None, cancel=None, kind=None):
+    """Relay Ollama chunks as NDJSON frames and finish with a timing/token summary frame.
+
+    Stops (aborting the Ollama request) when ``cancel`` fires because every client left.
+    """
+    start_time = time.time()
+    first_token_time = None
+    characters = 0
+    pieces = []
+    OLLAMA_IN_FLIGHT.inc()
+    
+    try:
+        for chunk, line in ollama_chunks(full_prompt, timeout, options=options, affinity_key=cache_key,
+                                         model=plan['model'] if plan else None, cancel=cancel):
+            if not chunk.get('done'):
+                if first_token_time is None:
+                    first_token_time = time.time()
+                piece = chunk.get('response', '')
+                characters += len(piece)
+                pieces.append(piece)
+                yield line + b"\n"
+                continue
+            
+            logger.info(f"Stream completed ({characters} characters, {time.time() - start_time:.1f}s)")
+            
+            if cache_key:
+                cache_generation(cache_key, ''.join(pieces), semantic, plan, kind)
+            
+            OLLAMA_REQUESTS.inc(mode='stream', outcome='success')
+            record_ollama_result(chunk, time.time() - start_time, 'stream',
+                                 time_to_first_token=first_token_time - start_time if first_token_time else None)
+            latency_controller.observe(chunk, time.time() - start_time, plan['model'] if plan else None)
+            yield json.dumps(stream_summary_frame(chunk, start_time, first_token_time, plan)).encode() + b"\n"
+            return
+    
+    except GenerationCancelled as e:
+        OLLAMA_REQUESTS.inc(mode='stream', outcome='cancelled')
+        if e.reason == 'disconnect':
+            logger.info(f"Stream abandoned by its clients after {characters} characters; Ollama request aborted")
+            yield CANCELLED_FRAME
+            return
+        logger.error(f"Ollama stream passed its {timeout}s deadline; aborted")
+        if first_token_time is None:
+            record_fallback(fallback_fn, 'timeout')
+            yield json.dumps({
+                'response': fallback_fn(trip),
+                'done': True,
+                'status': 'fallback',
+                'message': 'AI took too long to respond. Here\'s a basic structure.'
+            }).encode() + b"\n"
+            return
+        yield json.dumps({'done': True, 'status': 'timeout', 'message': 'AI stopped responding mid-stream'}).encode() + b"\n"
+        return
+    except requests.exceptions.Timeout:
+        logger.error(f"Ollama stream timed out after {timeout} seconds")
+        OLLAMA_REQUESTS.inc(mode='stream', outcome='timeout')
+        if first_token_time is None:
+            record_fallback(fallback_fn, 'timeout')
+            yield json.dumps({
+                'response': fallback_fn(trip),
+                'done': True,
+                'status': 'fallback',
+                'message': 'AI took too long to respond. Here\'s a basic structure.'
+            }).encode() + b"\n"
+            return
+        yield json.dumps({'done': True, 'status': 'timeout', 'message': 'AI stopped responding mid-stream'}).encode() + b"\n"
+        return
+    except Exception as e:
+        logger.error(f"Error streaming from Ollama: {e}")
+        OLLAMA_REQUESTS.inc(mode='stream', outcome='error')
+        yield json.dumps({
+            'done': True,
+            'status': 'error',
+            'message': 'Ollama service unavailable. Please ensure Ollama is running with llama3.2 model.'
+        }).encode() + b"\n"
+        return
+    finally:
+        OLLAMA_IN_FLIGHT.dec()
+    
+    OLLAMA_REQUESTS.inc(mode='stream', outcome='error')
+    yield json.dumps({'done': True, 'status': 'error', 'message': 'Ollama stream ended unexpectedly'}).encode() + b"\n"
+
+# Last frame of a stream every client left, so that a subscriber arriving late never waits on a silent cut
+CANCELLED_FRAME = json.dumps({'done': True, 'status': 'cancelled', 'message': 'Generation cancelled'}).encode() + b"\n"
+
+def cached_stream_frames(cached):
+    """Replay a cached generation as a single chunk followed by the summary frame"""
+    yield json.dumps({'response': cached['response'], 'done': False}).encode() + b"\n"
+    yield json.dumps({'done': True, 'status': 'success', 'cached': True}).encode() + b"\n"
+
+def admitted_stream_frames(frames_fn, trip, fallback_fn, max_wait=None, cancel=None):
+    """Hold a model slot while streaming; emit a fallback or busy frame when admission is refused"""
+    try:
+        admission.acquire(max_wait, cancel)
+    except GenerationCancelled:
+        logger.info("Stream abandoned while queued for a model slot")
+        yield CANCELLED_FRAME
+        return
+    except AdmissionRejected as e:
+        if ADMISSION_REJECT_MODE == 'fallback':
+            record_fallback(fallback_fn, 'busy')
+            yield json.dumps({
+                'response': fallback_fn(trip),
+                'done': True,
+                'status': 'fallback',
+                'message': 'AI is busy right now. Here\'s a basic structure.',
+                'retry_after': e.retry_after
+            }).encode() + b"\n"
+        else:
+            yield json.dumps({
+                'done': True,
+                'status': 'busy',
+                'message': 'AI is busy right now. Please retry shortly.',
+                'retry_after': e.retry_after
+            }).encode() + b"\n"
+        return
+    
+    start_time = time.time()
+    try:
+        yield from frames_fn()
+    finally:
+        admission.release(time.time() - start_time)
+
+def stream_shared(cache_key, full_prompt, trip, fallback_fn, timeout, options=None, max_wait=None, semantic=None,
+                  plan=None, kind=None):
+    """Attach to the token stream for this cache key, starting the generation if needed"""
+    return generation_flights.stream(
+        f"stream:{cache_key}",
+        lambda cancel: admitted_stream_frames(
+            lambda: stream_generation_frames(full_prompt, trip, fallback_fn, timeout=timeout, cache_key=cache_key,
+                                             options=options, semantic=semantic, plan=plan, cancel=cancel,
+                                             kind=kind),
+            trip, fallback_fn, max_wait, cancel
+        )
+    )
+
+def record_fallback(fallback_fn, reason):
+    """Count a fallback response, labelled by the fallback generator that produced it"""
+    FALLBACKS.inc(kind=fallback_fn.__name__.replace('generate_fallback_', ''), reason=reason)
+
+def invalid_request_response(error):
+    """400 response listing every field that failed validation"""
+    return jsonify({'error': str(error), 'details': error.errors}), 400
+
+def busy_response(rejection, fallback_body, kind):
+    """Answer a request refused by admission control with a fallback or a 429/503"""
+    headers = {'Retry-After': str(rejection.retry_after)}
+    if ADMISSION_REJECT_MODE == 'fallback':
+        FALLBACKS.inc(kind=kind, reason='busy')
+        return jsonify({
+            **fallback_body,
+            'status': 'fallback',
+            'message': 'AI is busy right now. Here\'s a basic plan.'
+        }), 200, headers
+    return jsonify({
+        'error': 'Server busy',
+        'message': 'Too many trip plans are being generated. Please retry shortly.',
+        'retry_after': rejection.retry_after
+    }), rejection.status_code, headers
+
+def trip_frame_tagger(trip):
+    """Return a function that re-tags one combined-stream frame into section-tagged frames"""
+    splitter = TripSectionStream()
+    
+    def section_frames(pieces, status=None):
+        out = []
+        for section, text in pieces:
+            frame = {'section': section, 'response': text, 'done': False}
+            if status:
+                frame['status'] = status
+            out.append(json.dumps(frame).encode() + b"\n")
+        return out
+    
+    def tag(line):
+        frame = json.loads(line)
         
-        chroma_client = chromadb.Client()
+        if not frame.get('done'):
+            return section_frames(splitter.feed(frame.get('response', '')))
         
-        embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
+        if frame.get('status') == 'fallback':
+            out = section_frames(splitter.feed(frame.pop('response', '')) + splitter.flush(), status='fallback')
+        else:
+            out = section_frames(splitter.flush())
         
-        collection = chroma_client.get_or_create_collection(
-            name="travel_itineraries",
-            embedding_function=embedding_fn
-        )
+        if frame.get('status') in ('success', 'fallback'):
+            missing = [name for name in SECTION_NAMES if name not in splitter.seen]
+            for name in missing:
+                FALLBACKS.inc(kind=name, reason='missing_section')
+                out += section_frames([(name, TRIP_SECTION_FALLBACKS[name](trip))], status='fallback')
+        out.append(json.dumps(frame).encode() + b"\n")
+        return out
+    
+    return tag
+
+def stream_trip_frames(frames, trip):
+    """Re-tag a combined trip stream so each chunk names the section it belongs to"""
+    tag = trip_frame_tagger(trip)
+    for line in frames:
+        yield from tag(line)
+
+def ndjson_response(frames, cache_status=None, shared=False):
+    """Wrap a frame generator in an unbuffered NDJSON streaming response"""
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+    if cache_status:
+        headers['X-Cache'] = cache_status
+    if shared:
+        headers['X-Coalesced'] = 'true'
+    return Response(stream_with_context(frames), mimetype='application/x-ndjson', headers=headers)
+
+def vector_db_store_travel_data(destination, itinerary_text, budget_text, metadata=None):
+    """Embed a generated itinerary and budget into the local vector store for similar-trip retrieval"""
+    try:
+        from vector_store import get_vector_store
         
         documents = [
             f"Destination: {destination}\n\nItinerary:\n{itinerary_text}",
             f"Destination: {destination}\n\nBudget:\n{budget_text}"
         ]
-        
-        import hashlib
-        doc_ids = [
-            hashlib.md5(f"{destination}_itinerary_{time.time()}".encode()).hexdigest(),
-            hashlib.md5(f"{destination}_budget_{time.time()}".encode()).hexdigest()
-        ]
-        
         metadatas = [
-            {
-                "destination": destination,
-                "type": "itinerary",
-                "timestamp": time.time(),
-                **(metadata or {})
-            },
-            {
-                "destination": destination,
-                "type": "budget",
-                "timestamp": time.time(),
-                **(metadata or {})
-            }
+            {"destination": destination, "type": doc_type, "timestamp": time.time(), **(metadata or {})}
+            for doc_type in ("itinerary", "budget")
         ]
-        
-        collection.add(
-            documents=documents,
-            ids=doc_ids,
-            metadatas=metadatas
-        )
+        doc_ids = get_vector_store().add(documents, metadatas)
         
         logger.info(f"Stored travel data for {destination} in vector database")
-        
         return {
             "status": "success",
             "destination": destination,
             "documents_stored": len(documents),
             "ids": doc_ids
         }
-        """
-        
-        logger.info(f"[DEMO] Vector DB storage simulated for: {destination}")
-        return {
-            "status": "demo_mode",
-            "message": "Vector DB function ready for integration",
-            "destination": destination
-        }
         
     except Exception as e:
         logger.error(f"Vector DB storage error: {e}")
@@ -155,135 +550,225 @@ def vector_db_store_travel_data(destination, itinerary_text, budget_text, metada
             "message": str(e)
         }
 
-def vector_db_search_similar_trips(query, destination=None, limit=5):
+def vector_db_search_similar_trips(query, destination=None, limit=5, types=("itinerary", "budget")):
+    """Nearest stored itineraries/budgets to a query, optionally restricted to one destination"""
     try:
-        """
-        import chromadb
-        from chromadb.utils import embedding_functions
+        from vector_store import get_vector_store
         
-        chroma_client = chromadb.Client()
-        embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
-        
-        collection = chroma_client.get_collection(
-            name="travel_itineraries",
-            embedding_function=embedding_fn
-        )
-        
-        where_filter = {"type": {"$in": ["itinerary", "budget"]}}
+        where = {"type": list(types)}
         if destination:
-            where_filter["destination"] = destination
-        
-        results = collection.query(
-            query_texts=[query],
-            n_results=limit,
-            where=where_filter
-        )
-        
-        similar_trips = []
-        for i, doc in enumerate(results['documents'][0]):
-            similar_trips.append({
-                "content": doc,
-                "metadata": results['metadatas'][0][i],
-                "distance": results['distances'][0][i],
-                "relevance_score": 1 - results['distances'][0][i]
-            })
-        
-        logger.info(f"Found {len(similar_trips)} similar trips for query: {query}")
+            where["destination"] = destination
+        similar_trips = get_vector_store().search(query, limit=limit, where=where)
+        logger.info(f"Found {len(similar_trips)} similar trips for query: {query[:100]}")
         return similar_trips
-        """
-        
-        logger.info(f"[DEMO] Vector search simulated for: {query}")
-        return [
-            {
-                "status": "demo_mode",
-                "query": query,
-                "destination_filter": destination
-            }
-        ]
         
     except Exception as e:
         logger.error(f"Vector DB search error: {e}")
         return []
 
+def remember_trip_plan(trip, parts):
+    """Keep a freshly generated, complete trip plan in the vector store for similar-trip retrieval"""
+    if trip.destination and all(parts[name]['status'] == 'success' for name in SECTION_NAMES):
+        vector_db_store_travel_data(trip.destination, parts['itinerary']['response'], parts['budget']['response'], {
+            'duration': trip.duration,
+            'travelers': trip.travelers,
+            'prompt': trip.prompt[:500]
+        })
+
+def similar_trips_params(data):
+    """Validate a similar-trips body into (query, destination, limit); raises InvalidTripRequest"""
+    if not isinstance(data, dict):
+        raise InvalidTripRequest({'body': 'expected a JSON object'})
+    errors = {}
+    query = data.get('query')
+    if not isinstance(query, str) or not query.strip():
+        errors['query'] = 'required non-empty string'
+    destination = data.get('destination')
+    if destination is not None and not isinstance(destination, str):
+        errors['destination'] = 'must be a string'
+    limit = data.get('limit', 5)
+    if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= 50:
+        errors['limit'] = 'must be an integer between 1 and 50'
+    if errors:
+        raise InvalidTripRequest(errors, "Invalid similar-trips request")
+    return query.strip(), destination or None, limit
+
 ITINERARY_TEMPLATE = """Create a {duration}-day travel itinerary for {destination}.
 
 Travel Details: {prompt}
+{itinerary_facts}
+{facts_note}Fill in this skeleton for every day, at most {day_words} words per day:
+Day N: <theme>
+- Morning: <activity>
+- Afternoon: <activity>
+- Evening: <activity>
+- Food: <where/what to eat>
 
-Provide a day-by-day plan with:
-- Morning, afternoon, evening activities
-- Key attractions and local experiences
-- Food recommendations
-- Transportation tips
-- Practical advice
-
-Format: "Day 1:", "Day 2:", etc. Keep it concise but engaging.
+Finish with "Tips:" and at most {tips_words} words on transport and practical advice.
 """
 
-BUDGET_TEMPLATE = """Create a budget breakdown for a {duration}-day trip to {destination} for {travelers} travelers.
+BUDGET_TEMPLATE = """Create a budget breakdown for a {duration}-day trip to {destination} for {travelers}.
 
 Details: {prompt}
+{budget_facts}
+{facts_note}Fill in this skeleton with amounts for the whole group, at most {budget_words} words:
+1. Transportation (round trip): <amount>
+2. Accommodation (<nights> nights x <per night>): <amount>
+3. Food (<days> days x <per day>): <amount>
+4. Activities and local transport: <amount>
+5. Total estimated cost: <amount>
+Money-saving tips: <two short bullets>
+"""
 
-Provide costs for:
-1. Transportation (round trip)
-2. Accommodation (per night)
-3. Food (daily)
-4. Activities and local transport
-5. Total estimated cost
+TRIP_TEMPLATE = """Plan a {duration}-day trip to {destination} for {travelers}.
+
+Travel Details: {prompt}
+{itinerary_facts}{budget_facts}
+{facts_note}Write exactly two sections, each starting with its header on its own line:
 
-Use appropriate currency. Include money-saving tips.
-Keep response focused and practical.
+=== ITINERARY ===
+For every day, at most {day_words} words:
+Day N: <theme>
+- Morning: <activity>
+- Afternoon: <activity>
+- Evening: <activity>
+- Food: <where/what to eat>
+
+=== BUDGET ===
+Amounts for the whole group, at most {budget_words} words:
+1. Transportation (round trip): <amount>
+2. Accommodation (<nights> nights x <per night>): <amount>
+3. Food (<days> days x <per day>): <amount>
+4. Activities and local transport: <amount>
+5. Total estimated cost: <amount>
 """
 
-def create_optimized_prompt(template, user_prompt):
-    """Extract key details and create optimized prompt"""
- 
-    duration = "multi"
-    if "day" in user_prompt.lower():
-        import re
-        duration_match = re.search(r'(\d+)-day', user_prompt)
-        if duration_match:
-            duration = duration_match.group(1)
-    
-    destination = "the destination"
-    if "visiting" in user_prompt.lower():
-        dest_match = re.search(r'visiting\s+([^.]+)', user_prompt)
-        if dest_match:
-            destination = dest_match.group(1).strip()
-    
-    travelers = "travelers"
-    if "traveler(s)" in user_prompt:
-        travel_match = re.search(r'(\d+)\s+traveler', user_prompt)
-        if travel_match:
-            travelers = travel_match.group(1) + " travelers"
-    
-    return template.format(
-        duration=duration,
-        destination=destination,
-        travelers=travelers,
-        prompt=user_prompt
-    )
+GENERATION_TEMPLATES = {
+    'itinerary': ITINERARY_TEMPLATE,
+    'budget': BUDGET_TEMPLATE,
+    'trip': TRIP_TEMPLATE
+}
+
+def _token_budgets(spec, defaults):
+    budgets = dict(defaults)
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() in budgets and value.strip().isdigit():
+            budgets[name.strip()] = int(value)
+    return budgets
+
+# Output and fact-block token budgets per prompt section, e.g.
+# PROMPT_TOKEN_BUDGETS="itinerary_day=80,budget=200,itinerary_facts=0" (0 drops that fact block)
+PROMPT_TOKEN_BUDGETS = _token_budgets(os.environ.get("PROMPT_TOKEN_BUDGETS", ""), {
+    'itinerary_day': 100,
+    'itinerary_tips': 60,
+    'budget': 220,
+    'itinerary_facts': 200,
+    'budget_facts': 150
+})
+# Headroom over the requested length before num_predict cuts a generation off
+NUM_PREDICT_HEADROOM = 1.25
+# Ollama reloads the model whenever num_ctx changes, so grounded prompts share one
+# smaller context size and only outsized requests fall back to the full one
+PROMPT_NUM_CTX = int(os.environ.get("PROMPT_NUM_CTX", "2048"))
+
+# Preloaded with the context size most generations use, so they never trigger a reload
+model_lifecycle = ModelLifecycle(get_ollama_pool, MODEL_NAME, PROMPT_NUM_CTX)
+REGISTRY.register_collector('model_lifecycle', model_lifecycle_collector(model_lifecycle.stats))
+
+latency_controller = SLOController(MODEL_NAME)
+# Section lengths the SLO controller scales down together with num_predict
+OUTPUT_BUDGETS = ('itinerary_day', 'itinerary_tips', 'budget')
+
+def grounding_fields(trip, budgets=PROMPT_TOKEN_BUDGETS):
+    """Retrieved fact blocks and per-section word limits for the prompt templates"""
+    knowledge = get_knowledge_base()
+    itinerary_facts = knowledge.itinerary_facts(trip, budgets['itinerary_facts'])
+    budget_facts = knowledge.budget_facts(trip, budgets['budget_facts'])
+    return {
+        'itinerary_facts': f"\n{itinerary_facts}\n" if itinerary_facts else "",
+        'budget_facts': f"\n{budget_facts}\n" if budget_facts else "",
+        'facts_note': "Prefer the places and prices above. " if itinerary_facts or budget_facts else "",
+        'day_words': budgets['itinerary_day'] * 3 // 4,
+        'tips_words': budgets['itinerary_tips'] * 3 // 4,
+        'budget_words': budgets['budget'] * 3 // 4
+    }
+
+def section_token_budget(kind, trip, budgets=PROMPT_TOKEN_BUDGETS):
+    """Output tokens the skeleton for one generation kind should need"""
+    itinerary = (trip.duration or 5) * budgets['itinerary_day'] + budgets['itinerary_tips']
+    return {'itinerary': itinerary, 'budget': budgets['budget'], 'trip': itinerary + budgets['budget']}[kind]
+
+def generation_options(kind, trip, full_prompt):
+    """Ollama options sized to the section budgets: num_predict from the skeleton, num_ctx to fit"""
+    base = TRIP_GENERATION_OPTIONS if kind == 'trip' else GENERATION_OPTIONS
+    num_predict = min(base['num_predict'], int(section_token_budget(kind, trip) * NUM_PREDICT_HEADROOM))
+    fits = estimate_tokens(full_prompt) + num_predict <= PROMPT_NUM_CTX
+    return {**base, 'num_predict': num_predict, 'num_ctx': PROMPT_NUM_CTX if fits else base['num_ctx']}
+
+def create_optimized_prompt(template, trip, budgets=PROMPT_TOKEN_BUDGETS):
+    """Fill a prompt template from the parsed trip request and its retrieved destination facts"""
+    start_time = time.perf_counter()
+    prompt = template.format(**trip.template_fields(), **grounding_fields(trip, budgets))
+    PROMPT_BUILD_SECONDS.observe(time.perf_counter() - start_time)
+    return prompt
+
+def build_generation(kind, trip):
+    """Template, grounded prompt and sized options for an 'itinerary', 'budget' or 'trip' generation"""
+    template = GENERATION_TEMPLATES[kind]
+    full_prompt = create_optimized_prompt(template, trip)
+    return template, full_prompt, generation_options(kind, trip, full_prompt)
+
+def plan_generation(kind, trip, full_prompt, options, load=None):
+    """Fit a cache-missed generation to the latency SLO; returns (full_prompt, options, plan or None)"""
+    plan = latency_controller.plan(options, estimate_tokens(full_prompt), load or admission, resident_ctx=PROMPT_NUM_CTX)
+    if plan is None:
+        return full_prompt, options, None
+    scale = plan['num_predict'] / options['num_predict']
+    if scale < 1:
+        # Ask for shorter sections instead of letting num_predict cut the answer off mid-way
+        budgets = {**PROMPT_TOKEN_BUDGETS,
+                   **{name: max(1, int(PROMPT_TOKEN_BUDGETS[name] * scale)) for name in OUTPUT_BUDGETS}}
+        full_prompt = create_optimized_prompt(GENERATION_TEMPLATES[kind], trip, budgets)
+    return full_prompt, {**options, 'num_predict': plan['num_predict'], 'num_ctx': plan['num_ctx']}, plan
 
 @app.route('/api/generate-itinerary', methods=['POST'])
 def generate_itinerary():
     """Generate AI-powered travel itinerary"""
     try:
-        data = request.json
-        user_prompt = data.get('prompt', '')
+        trip = trip_request_from_json(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+    
+    try:
+        logger.info(f"Generating itinerary for: {trip.prompt[:100]}...")
         
-        if not user_prompt:
-            return jsonify({'error': 'No prompt provided'}), 400
+        planned = warehouse.lookup(trip)
+        if planned:
+            return jsonify(with_structured({'response': planned['itinerary'], 'status': 'success'}, 'itinerary',
+                                           planned['itinerary'])), 200, {'X-Cache': 'WAREHOUSE'}
         
-        logger.info(f"Generating itinerary for: {user_prompt[:100]}...")
+        template, full_prompt, options = build_generation('itinerary', trip)
+        cache_key, cached, cache_status, semantic = lookup_generation(template, trip, options)
+        if cached:
+            logger.info(f"Itinerary served from cache ({cache_status})")
+            return jsonify(with_structured({
+                'response': cached['response'],
+                'status': 'success'
+            }, 'itinerary', cached['response'], cached)), 200, {'X-Cache': cache_status}
      
-        full_prompt = create_optimized_prompt(ITINERARY_TEMPLATE, user_prompt)
-        
-        result = generate_with_ollama(full_prompt, timeout=180)
+        full_prompt, options, plan = plan_generation('itinerary', trip, full_prompt, options)
+        try:
+            result, shared = generate_shared(cache_key, full_prompt, timeout=180, options=options,
+                                             max_wait=requested_max_wait(), semantic=semantic, plan=plan,
+                                             kind='itinerary')
+        except AdmissionRejected as e:
+            return busy_response(e, {'response': generate_fallback_itinerary(trip)}, 'itinerary')
         
         if result == "TIMEOUT":
+            FALLBACKS.inc(kind='itinerary', reason='timeout')
             return jsonify({
-                'response': generate_fallback_itinerary(user_prompt),
+                'response': generate_fallback_itinerary(trip),
                 'status': 'fallback',
                 'message': 'AI took too long to respond. Here\'s a basic itinerary structure.'
             })
@@ -295,10 +780,11 @@ def generate_itinerary():
         
         logger.info("Itinerary generated successfully")
         
-        return jsonify({
+        return jsonify(with_structured({
             'response': result,
-            'status': 'success'
-        })
+            'status': 'success',
+            'generation': plan
+        }, 'itinerary', result)), 200, {'X-Cache': 'MISS', 'X-Coalesced': 'true' if shared else 'false'}
         
     except Exception as e:
         logger.error(f"Error generating itinerary: {str(e)}")
@@ -311,22 +797,40 @@ def generate_itinerary():
 def generate_budget():
     """Generate AI-powered budget breakdown"""
     try:
-        data = request.json
-        user_prompt = data.get('prompt', '')
-        
-        if not user_prompt:
-            return jsonify({'error': 'No prompt provided'}), 400
+        trip = trip_request_from_json(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+    
+    try:
+        logger.info(f"Generating budget for: {trip.prompt[:100]}...")
         
-        logger.info(f"Generating budget for: {user_prompt[:100]}...")
+        planned = warehouse.lookup(trip)
+        if planned:
+            return jsonify(with_structured({'response': planned['budget'], 'status': 'success'}, 'budget',
+                                           planned['budget'])), 200, {'X-Cache': 'WAREHOUSE'}
         
-        full_prompt = create_optimized_prompt(BUDGET_TEMPLATE, user_prompt)
+        template, full_prompt, options = build_generation('budget', trip)
+        cache_key, cached, cache_status, semantic = lookup_generation(template, trip, options)
+        if cached:
+            logger.info(f"Budget served from cache ({cache_status})")
+            return jsonify(with_structured({
+                'response': cached['response'],
+                'status': 'success'
+            }, 'budget', cached['response'], cached)), 200, {'X-Cache': cache_status}
         
-        result = generate_with_ollama(full_prompt, timeout=120)
+        full_prompt, options, plan = plan_generation('budget', trip, full_prompt, options)
+        try:
+            result, shared = generate_shared(cache_key, full_prompt, timeout=120, options=options,
+                                             max_wait=requested_max_wait(), semantic=semantic, plan=plan,
+                                             kind='budget')
+        except AdmissionRejected as e:
+            return busy_response(e, {'response': generate_fallback_budget(trip)}, 'budget')
         
         if result == "TIMEOUT":
+            FALLBACKS.inc(kind='budget', reason='timeout')
        
             return jsonify({
-                'response': generate_fallback_budget(user_prompt),
+                'response': generate_fallback_budget(trip),
                 'status': 'fallback',
                 'message': 'AI took too long to respond. Here\'s a basic budget estimate.'
             })
@@ -338,10 +842,11 @@ def generate_budget():
         
         logger.info("Budget generated successfully")
         
-        return jsonify({
+        return jsonify(with_structured({
             'response': result,
-            'status': 'success'
-        })
+            'status': 'success',
+            'generation': plan
+        }, 'budget', result)), 200, {'X-Cache': 'MISS', 'X-Coalesced': 'true' if shared else 'false'}
         
     except Exception as e:
         logger.error(f"Error generating budget: {str(e)}")
@@ -350,116 +855,594 @@ def generate_budget():
             'message': str(e)
         }), 500
 
-def generate_fallback_itinerary(user_prompt):
-    """Generate a basic fallback itinerary when AI times out"""
-    import re
+@app.route('/api/generate-itinerary/stream', methods=['POST'])
+def generate_itinerary_stream():
+    """Stream AI-powered travel itinerary token by token as NDJSON"""
+    try:
+        trip = trip_request_from_json(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
     
-    duration_match = re.search(r'(\d+)-day', user_prompt)
-    duration = int(duration_match.group(1)) if duration_match else 7
+    logger.info(f"Streaming itinerary for: {trip.prompt[:100]}...")
     
-    destination_match = re.search(r'visiting\s+([^.]+)', user_prompt)
-    destination = destination_match.group(1).strip() if destination_match else "your destination"
+    planned = warehouse.lookup(trip)
+    if planned:
+        return ndjson_response(cached_stream_frames({'response': planned['itinerary']}), cache_status='WAREHOUSE')
     
-    fallback = f"""Basic {duration}-day itinerary for {destination}:
-
-Day 1: Arrival
-- Morning: Arrive and check into accommodation
-- Afternoon: Local orientation walk and nearby attractions
-- Evening: Welcome dinner and rest
+    template, full_prompt, options = build_generation('itinerary', trip)
+    cache_key, cached, cache_status, semantic = lookup_generation(template, trip, options)
+    if cached:
+        return ndjson_response(cached_stream_frames(cached), cache_status=cache_status)
+    
+    full_prompt, options, plan = plan_generation('itinerary', trip, full_prompt, options)
+    frames, shared = stream_shared(cache_key, full_prompt, trip, generate_fallback_itinerary, timeout=180, options=options,
+                                   max_wait=requested_max_wait(), semantic=semantic, plan=plan, kind='itinerary')
+    return ndjson_response(frames, cache_status='MISS', shared=shared)
 
-"""
+@app.route('/api/generate-budget/stream', methods=['POST'])
+def generate_budget_stream():
+    """Stream AI-powered budget breakdown token by token as NDJSON"""
+    try:
+        trip = trip_request_from_json(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+    
+    logger.info(f"Streaming budget for: {trip.prompt[:100]}...")
+    
+    planned = warehouse.lookup(trip)
+    if planned:
+        return ndjson_response(cached_stream_frames({'response': planned['budget']}), cache_status='WAREHOUSE')
     
-    for day in range(2, min(duration, 6)): 
-        fallback += f"""Day {day}: Exploration
-- Morning: Visit major attractions in {destination}
-- Afternoon: Local experiences and cultural sites
-- Evening: Local cuisine and leisure time
+    template, full_prompt, options = build_generation('budget', trip)
+    cache_key, cached, cache_status, semantic = lookup_generation(template, trip, options)
+    if cached:
+        return ndjson_response(cached_stream_frames(cached), cache_status=cache_status)
+    
+    full_prompt, options, plan = plan_generation('budget', trip, full_prompt, options)
+    frames, shared = stream_shared(cache_key, full_prompt, trip, generate_fallback_budget, timeout=120, options=options,
+                                   max_wait=requested_max_wait(), semantic=semantic, plan=plan, kind='budget')
+    return ndjson_response(frames, cache_status='MISS', shared=shared)
 
-"""
+def trip_sections_response(result, trip):
+    """Split a combined generation into itinerary and budget parts, backfilling any missing section"""
+    sections = split_trip_sections(result)
+    parts = {}
+    for name in SECTION_NAMES:
+        if name in sections:
+            parts[name] = {'response': sections[name], 'status': 'success'}
+        else:
+            logger.warning(f"Trip generation had no {name} section, using fallback")
+            FALLBACKS.inc(kind=name, reason='missing_section')
+            parts[name] = {'response': TRIP_SECTION_FALLBACKS[name](trip), 'status': 'fallback'}
+    return parts
+
+def generate_warehouse_plan(key):
+    """Generate one warehouse entry with the regular trip prompt; returns (sections, model) or None"""
+    trip = trip_request_from_json(plan_request(key))
+    _, full_prompt, options = build_generation('trip', trip)
+    with admission.slot():
+        result = generate_with_ollama(full_prompt, timeout=240, options=options)
+    if result in (None, "TIMEOUT"):
+        return None
+    sections = split_trip_sections(result)
+    if not all(name in sections for name in SECTION_NAMES):
+        return None
+    return sections, MODEL_NAME
+
+def warehouse_idle():
+    """Only refresh precomputed plans while the model is up and no user request is running or queued"""
+    return readiness.status()['ready'] and admission.in_flight == 0 and admission.queue_depth == 0
+
+warehouse.configure_refresh(generate_warehouse_plan, warehouse_idle)
+
+def warehouse_trip_text(planned):
+    """A warehouse plan in the combined sectioned layout, for the trip stream"""
+    return f"=== ITINERARY ===\n{planned['itinerary']}\n=== BUDGET ===\n{planned['budget']}"
+
+@app.route('/api/generate-trip', methods=['POST'])
+def generate_trip():
+    """Generate itinerary and budget together in a single model call"""
+    try:
+        trip = trip_request_from_json(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
     
-    if duration > 5:
-        fallback += f"""Days 6-{duration}: Extended exploration with day trips, shopping, and relaxation
+    try:
+        logger.info(f"Generating trip plan for: {trip.prompt[:100]}...")
+        
+        planned = warehouse.lookup(trip)
+        if planned:
+            return jsonify(with_structured({
+                'itinerary': {'response': planned['itinerary'], 'status': 'success'},
+                'budget': {'response': planned['budget'], 'status': 'success'},
+                'status': 'success'
+            }, 'trip', warehouse_trip_text(planned))), 200, {'X-Cache': 'WAREHOUSE'}
+        
+        template, full_prompt, options = build_generation('trip', trip)
+        cache_key, cached, cache_status, semantic = lookup_generation(template, trip, options)
+        if cached:
+            logger.info(f"Trip plan served from cache ({cache_status})")
+            return jsonify(with_structured({
+                **trip_sections_response(cached['response'], trip),
+                'status': 'success'
+            }, 'trip', cached['response'], cached)), 200, {'X-Cache': cache_status}
+        
+        full_prompt, options, plan = plan_generation('trip', trip, full_prompt, options)
+        try:
+            result, shared = generate_shared(cache_key, full_prompt, timeout=240, options=options,
+                                             max_wait=requested_max_wait(), semantic=semantic, plan=plan,
+                                             kind='trip')
+        except AdmissionRejected as e:
+            return busy_response(e, {
+                'itinerary': {'response': generate_fallback_itinerary(trip), 'status': 'fallback'},
+                'budget': {'response': generate_fallback_budget(trip), 'status': 'fallback'}
+            }, 'trip')
+        
+        if result == "TIMEOUT":
+            FALLBACKS.inc(kind='trip', reason='timeout')
+            return jsonify({
+                'itinerary': {'response': generate_fallback_itinerary(trip), 'status': 'fallback'},
+                'budget': {'response': generate_fallback_budget(trip), 'status': 'fallback'},
+                'status': 'fallback',
+                'message': 'AI took too long to respond. Here\'s a basic trip plan.'
+            })
+        elif result is None:
+            return jsonify({
+                'error': 'Failed to generate trip plan',
+                'message': 'Ollama service unavailable. Please ensure Ollama is running with llama3.2 model.'
+            }), 500
+        
+        logger.info("Trip plan generated successfully")
+        
+        parts = trip_sections_response(result, trip)
+        if not shared:
+            remember_trip_plan(trip, parts)
+        return jsonify(with_structured({
+            **parts,
+            'status': 'success',
+            'generation': plan
+        }, 'trip', result)), 200, {'X-Cache': 'MISS', 'X-Coalesced': 'true' if shared else 'false'}
+        
+    except Exception as e:
+        logger.error(f"Error generating trip plan: {str(e)}")
+        return jsonify({
+            'error': 'Failed to generate trip plan',
+            'message': str(e)
+        }), 500
 
-"""
+@app.route('/api/generate-trip/stream', methods=['POST'])
+def generate_trip_stream():
+    """Stream itinerary and budget from one generation as section-tagged NDJSON frames"""
+    try:
+        trip = trip_request_from_json(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+    
+    logger.info(f"Streaming trip plan for: {trip.prompt[:100]}...")
     
-    fallback += f"Final Day: Departure and journey home\n\nNote: This is a basic structure. For detailed recommendations, please try again or consult local travel guides."
+    planned = warehouse.lookup(trip)
+    if planned:
+        return ndjson_response(stream_trip_frames(cached_stream_frames({'response': warehouse_trip_text(planned)}), trip), cache_status='WAREHOUSE')
     
-    return fallback
+    template, full_prompt, options = build_generation('trip', trip)
+    cache_key, cached, cache_status, semantic = lookup_generation(template, trip, options)
+    if cached:
+        return ndjson_response(stream_trip_frames(cached_stream_frames(cached), trip), cache_status=cache_status)
+    
+    full_prompt, options, plan = plan_generation('trip', trip, full_prompt, options)
+    frames, shared = stream_shared(cache_key, full_prompt, trip, generate_fallback_trip, timeout=240, options=options,
+                                   max_wait=requested_max_wait(), semantic=semantic, plan=plan, kind='trip')
+    return ndjson_response(stream_trip_frames(frames, trip), cache_status='MISS', shared=shared)
+
+def generate_fallback_itinerary(trip):
+    """Fallback itinerary from the destination's attractions when AI times out or is busy"""
+    return fallback_itinerary(trip)
 
-def generate_fallback_budget(user_prompt):
-    """Generate a basic fallback budget when AI times out"""
-    import re
+def generate_fallback_budget(trip):
+    """Fallback budget priced from the destination cost table when AI times out or is busy"""
+    return fallback_budget(trip)
+
+def generate_fallback_trip(trip):
+    """Combined fallback in the same sectioned layout as TRIP_TEMPLATE output"""
+    return f"""=== ITINERARY ===
+{generate_fallback_itinerary(trip)}
+=== BUDGET ===
+{generate_fallback_budget(trip)}"""
+
+TRIP_SECTION_FALLBACKS = {
+    'itinerary': generate_fallback_itinerary,
+    'budget': generate_fallback_budget
+}
+
+@app.route('/api/similar-trips', methods=['POST'])
+def similar_trips():
+    """Stored itineraries and budgets most similar to a free-text query"""
+    try:
+        query, destination, limit = similar_trips_params(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+    return jsonify({'query': query, 'results': vector_db_search_similar_trips(query, destination, limit)})
+
+JOB_KINDS = {
+    'itinerary': (180, generate_fallback_itinerary),
+    'budget': (120, generate_fallback_budget),
+    'trip': (240, generate_fallback_trip)
+}
+JOB_EVENTS_POLL_SECONDS = 0.5
+JOB_EVENTS_HEARTBEAT_SECONDS = 15
+
+def job_params(data):
+    """Validate a job body into (kind, priority, trip request body, trip); raises InvalidTripRequest"""
+    if not isinstance(data, dict):
+        raise InvalidTripRequest({'body': 'expected a JSON object'})
+    errors = {}
+    kind = data.get('kind', 'trip')
+    if kind not in JOB_KINDS:
+        errors['kind'] = f"must be one of {', '.join(JOB_KINDS)}"
+    priority = data.get('priority', 0)
+    if isinstance(priority, bool) or not isinstance(priority, int) or abs(priority) > JOB_MAX_PRIORITY:
+        errors['priority'] = f'must be an integer between -{JOB_MAX_PRIORITY} and {JOB_MAX_PRIORITY}'
+    body = {k: v for k, v in data.items() if k not in ('kind', 'priority')}
+    try:
+        trip = trip_request_from_json(body)
+    except InvalidTripRequest as e:
+        errors.update(e.errors)
+    if errors:
+        raise InvalidTripRequest(errors, "Invalid job request")
+    return kind, priority, body, trip
+
+def generation_result(kind, text, trip, plan=None, cached=None):
+    """Response body for a finished generation, in the layout of the matching blocking route.
+
+    Job and batch results always carry the parsed form.
+    """
+    structured = structured_generation(kind, text, cached)
+    if kind == 'trip':
+        return {**trip_sections_response(text, trip), 'status': 'success', 'generation': plan, 'structured': structured}
+    return {'response': text, 'status': 'success', 'generation': plan, 'structured': structured}
+
+def fallback_results(kind, trips, reason):
+    """Fallback bodies in the layout of generation_result; budgets are priced in one pass over the cost table"""
+    FALLBACKS.inc(len(trips), kind=kind, reason=reason)
+    budgets = fallback_budgets(trips) if kind != 'itinerary' else None
+    results = []
+    for i, trip in enumerate(trips):
+        if kind == 'trip':
+            results.append({
+                'itinerary': {'response': generate_fallback_itinerary(trip), 'status': 'fallback'},
+                'budget': {'response': budgets[i], 'status': 'fallback'},
+                'status': 'fallback'
+            })
+        else:
+            results.append({'response': budgets[i] if budgets else generate_fallback_itinerary(trip),
+                            'status': 'fallback'})
+    return results
+
+def fallback_result(kind, trip, reason):
+    """Fallback body in the layout of generation_result"""
+    return fallback_results(kind, [trip], reason)[0]
+
+def job_fallback(kind, data):
+    """Fallback body stored on a job that ran out of attempts"""
+    return fallback_result(kind, trip_request_from_json(data), 'job_failed')
+
+def prepare_generation(kind, trip):
+    """Warehouse and cache lookup: (stored body or None, X-Cache status, context for generate_prepared)"""
+    planned = warehouse.lookup(trip)
+    if planned:
+        text = warehouse_trip_text(planned) if kind == 'trip' else planned[kind]
+        return generation_result(kind, text, trip), 'WAREHOUSE', None
     
-    duration_match = re.search(r'(\d+)-day', user_prompt)
-    duration = int(duration_match.group(1)) if duration_match else 7
+    template, full_prompt, options = build_generation(kind, trip)
+    cache_key, cached, cache_status, semantic = lookup_generation(template, trip, options)
+    if cached:
+        return generation_result(kind, cached['response'], trip, cached=cached), cache_status, None
+    return None, 'MISS', (cache_key, full_prompt, options, semantic)
+
+def generate_prepared(kind, trip, context):
+    """Generate a request prepare_generation missed; raises RetryJob when admission is full, RuntimeError on failure"""
+    cache_key, full_prompt, options, semantic = context
+    full_prompt, options, plan = plan_generation(kind, trip, full_prompt, options)
+    try:
+        result, shared = generate_shared(cache_key, full_prompt, timeout=JOB_KINDS[kind][0], options=options,
+                                         semantic=semantic, plan=plan, kind=kind)
+    except AdmissionRejected as e:
+        raise RetryJob(e.reason, e.retry_after)
+    if result == "TIMEOUT":
+        raise RuntimeError("Ollama timed out")
+    if result is None:
+        raise RuntimeError("Ollama service unavailable")
     
-    travelers_match = re.search(r'(\d+)\s+traveler', user_prompt)
-    travelers = int(travelers_match.group(1)) if travelers_match else 2
-    is_international = any(country in user_prompt.lower() for country in ['japan', 'usa', 'europe', 'singapore', 'thailand'])
+    response = generation_result(kind, result, trip, plan)
+    if kind == 'trip' and not shared:
+        remember_trip_plan(trip, response)
+    return response
+
+def run_job(kind, data):
+    """Job worker body: the warehouse, cache and generation path of the blocking routes"""
+    trip = trip_request_from_json(data)
+    stored, _, context = prepare_generation(kind, trip)
+    return stored if stored is not None else generate_prepared(kind, trip, context)
+
+job_queue = JobQueue()
+job_queue.configure(run_job, job_fallback)
+
+def job_links(job):
+    return {'poll': f"/api/jobs/{job['id']}", 'events': f"/api/jobs/{job['id']}/events"}
+
+def job_key(kind, trip):
+    """Deduplication key of a job: the cache key of the generation it would run"""
+    template, _, options = build_generation(kind, trip)
+    return generation_cache_key(template, trip.prompt, options)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a generation and return its job id immediately"""
+    try:
+        kind, priority, body, trip = job_params(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
     
-    if is_international:
-        currency = "$"
-        transport = 800 * travelers
-        accommodation = 80 * duration * travelers
-        food = 40 * duration * travelers
-        activities = 50 * duration * travelers
-        total = transport + accommodation + food + activities
-    else:
-        currency = "₹"
-        transport = 15000 * travelers
-        accommodation = 3000 * duration * travelers
-        food = 1500 * duration * travelers
-        activities = 2000 * duration * travelers
-        total = transport + accommodation + food + activities
+    job_queue.start()
+    job, created = job_queue.submit(kind, body, job_key(kind, trip), priority)
+    return jsonify({**job, 'deduplicated': not created, **job_links(job)}), 202 if created else 200
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a job, with its result once finished"""
+    job_queue.start()
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found', 'message': 'Unknown job id, or its result has expired'}), 404
+    return jsonify({**job, **job_links(job)})
+
+def job_event_frames(job_id):
+    """Server-sent events: a 'status' event on each change, then one 'result' event with the finished job"""
+    last_status = None
+    last_sent = time.time()
+    while True:
+        job = job_queue.get(job_id)
+        if job is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+            return
+        if job['status'] in ('done', 'failed'):
+            yield f"event: result\ndata: {json.dumps(job)}\n\n"
+            return
+        if job['status'] != last_status:
+            last_status = job['status']
+            last_sent = time.time()
+            yield f"event: status\ndata: {json.dumps({k: job.get(k) for k in ('id', 'status', 'queue_position')})}\n\n"
+        elif time.time() - last_sent > JOB_EVENTS_HEARTBEAT_SECONDS:
+            last_sent = time.time()
+            yield ": keep-alive\n\n"
+        time.sleep(JOB_EVENTS_POLL_SECONDS)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Subscribe to a job's status changes and result as server-sent events"""
+    job_queue.start()
+    return Response(stream_with_context(job_event_frames(job_id)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "100"))
+# Model slots all batches together may hold; the rest stay free for the interactive routes
+BATCH_MAX_PARALLEL = int(os.environ.get("BATCH_MAX_PARALLEL", str(max(1, admission.max_concurrent - 1))))
+BATCH_BUSY_RETRIES = 5
+batch_slots = threading.BoundedSemaphore(BATCH_MAX_PARALLEL)
+
+def batch_params(data):
+    """Validate a batch body into (kind, [(index, trip or InvalidTripRequest)]); raises InvalidTripRequest"""
+    if not isinstance(data, dict):
+        raise InvalidTripRequest({'body': 'expected a JSON object'})
+    errors = {}
+    kind = data.get('kind', 'itinerary')
+    if kind not in JOB_KINDS:
+        errors['kind'] = f"must be one of {', '.join(JOB_KINDS)}"
+    items = data.get('requests')
+    if not isinstance(items, list) or not 1 <= len(items) <= BATCH_MAX_SIZE:
+        errors['requests'] = f'must be a list of 1 to {BATCH_MAX_SIZE} trip requests'
+    if errors:
+        raise InvalidTripRequest(errors, "Invalid batch request")
     
-    fallback = f"""Basic Budget Breakdown ({duration} days, {travelers} travelers):
+    trips = []
+    for index, item in enumerate(items):
+        try:
+            trips.append((index, trip_request_from_json(item)))
+        except InvalidTripRequest as e:
+            trips.append((index, e))
+    return kind, trips
 
-**Transportation**: {currency}{transport:,}
-- Round trip flights/transport
+def group_batch(kind, trips):
+    """Collapse identical requests: ({generation key: (trip, [indexes])}, [(index, error)])"""
+    groups = {}
+    invalid = []
+    for index, trip in trips:
+        if isinstance(trip, InvalidTripRequest):
+            invalid.append((index, trip))
+            continue
+        key = job_key(kind, trip)
+        if key in groups:
+            groups[key][1].append(index)
+        else:
+            groups[key] = (trip, [index])
+    return groups, invalid
 
-**Accommodation**: {currency}{accommodation:,}
-- Mid-range hotels/stays
+def batch_frame(indexes, body, cache_status):
+    return json.dumps({'index': indexes[0], 'indexes': indexes, 'cache': cache_status, **body}).encode() + b"\n"
 
-**Food & Meals**: {currency}{food:,}
-- Local restaurants and dining
+def invalid_batch_frame(index, error):
+    return json.dumps({'index': index, 'indexes': [index], 'status': 'invalid', 'error': str(error),
+                       'details': error.errors}).encode() + b"\n"
 
-**Activities**: {currency}{activities:,}
-- Attractions, tours, local transport
+def batch_unavailable_frames(kind, pending):
+    """Fallback frames for every pending batch request at once, for when the model is down"""
+    bodies = fallback_results(kind, [trip for trip, _, _ in pending], 'unavailable')
+    return [batch_frame(indexes, {**body, 'message': 'Ollama service unavailable'}, 'MISS')
+            for (_, indexes, _), body in zip(pending, bodies)]
 
-**Total Estimated Cost**: {currency}{total:,}
+def batch_generate(kind, trip, context):
+    """One batch generation under a shared bulk slot; busy rejections back off instead of failing"""
+    for attempt in range(BATCH_BUSY_RETRIES):
+        with batch_slots:
+            try:
+                return generate_prepared(kind, trip, context)
+            except RetryJob as e:
+                retry_after = e.retry_after
+        if attempt < BATCH_BUSY_RETRIES - 1:
+            time.sleep(min(retry_after, 10))
+    raise RuntimeError("Model server stayed busy")
 
-*Note: These are rough estimates. Actual costs may vary based on season, specific choices, and current market rates. For detailed pricing, please try again or consult travel booking sites.*
-"""
+def batch_frames(kind, trips):
+    """Cache hits first, then each generation as it finishes, then a summary frame"""
+    start_time = time.time()
+    groups, invalid = group_batch(kind, trips)
+    counts = {'cached': 0, 'generated': 0, 'failed': 0, 'fallback': 0}
+    
+    for index, error in invalid:
+        yield invalid_batch_frame(index, error)
+    
+    pending = []
+    for trip, indexes in groups.values():
+        stored, cache_status, context = prepare_generation(kind, trip)
+        if stored is not None:
+            counts['cached'] += 1
+            yield batch_frame(indexes, stored, cache_status)
+        else:
+            pending.append((trip, indexes, context))
+    
+    if pending and not readiness.status()['ready']:
+        # Nothing can be generated; answer the rest from the cost table instead of failing one by one
+        for frame in batch_unavailable_frames(kind, pending):
+            yield frame
+        counts['fallback'] = len(pending)
+        pending = []
+    
+    executor = ThreadPoolExecutor(max_workers=min(BATCH_MAX_PARALLEL, len(pending)) or 1,
+                                  thread_name_prefix='batch')
+    try:
+        futures = {executor.submit(batch_generate, kind, trip, context): (trip, indexes)
+                   for trip, indexes, context in pending}
+        for future in as_completed(futures):
+            trip, indexes = futures[future]
+            try:
+                body = future.result()
+                counts['generated'] += 1
+            except Exception as e:
+                logger.error(f"Batch generation failed: {e}")
+                body = {**fallback_result(kind, trip, 'batch_failed'), 'message': str(e)}
+                counts['failed'] += 1
+            yield batch_frame(indexes, body, 'MISS')
+    finally:
+        # A client that goes away stops the generations that have not started yet
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    yield json.dumps({
+        'done': True,
+        'total': len(trips),
+        'unique': len(groups),
+        'invalid': len(invalid),
+        **counts,
+        'elapsed_seconds': round(time.time() - start_time, 3)
+    }).encode() + b"\n"
+
+@app.route('/api/generate-batch', methods=['POST'])
+def generate_batch():
+    """Plan many trips in one call; results stream back as NDJSON, one frame per unique request"""
+    try:
+        kind, trips = batch_params(request.get_json(silent=True))
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
     
-    return fallback
+    logger.info(f"Batch of {len(trips)} {kind} requests")
+    return ndjson_response(batch_frames(kind, trips))
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    ollama_status = test_ollama_connection()
+    """Health check endpoint (served from the cached readiness status)"""
+    status = readiness.status()
     
     return jsonify({
-        'status': 'healthy' if ollama_status else 'degraded',
-        'ollama_connected': ollama_status,
+        'status': 'healthy' if status['ready'] else 'degraded',
+        'ollama_connected': status['ollama_connected'],
+        'model_available': status['model_available'],
         'model': MODEL_NAME,
+        'checked_at': status['checked_at'],
+        'age_seconds': status['age_seconds'],
         'message': 'AI Travel Assistant API is running'
     })
 
+@app.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: Ollama is reachable and the model is pulled"""
+    status = readiness.status()
+    
+    return jsonify({
+        'status': 'ready' if status['ready'] else 'not_ready',
+        'ollama_connected': status['ollama_connected'],
+        'model_available': status['model_available'],
+        'model': MODEL_NAME,
+        'checked_at': status['checked_at'],
+        'age_seconds': status['age_seconds'],
+        'stale': status['stale'],
+        'error': status['error']
+    }), 200 if status['ready'] else 503
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """Admission queue, coalescing, cache, warehouse, model residency and SLO controller statistics"""
+    return jsonify({
+        'admission': admission.stats(),
+        'singleflight': generation_flights.stats(),
+        'partial_generations': partial_generations.stats(),
+        'cache': response_cache.stats(),
+        'semantic_cache': semantic_cache.stats(),
+        'warehouse': warehouse.stats(),
+        'model_lifecycle': model_lifecycle.stats(),
+        'slo': latency_controller.stats(),
+        'jobs': job_queue.stats(),
+        'ollama_pool': get_ollama_pool().stats()
+    })
+
+API_ENDPOINTS = {
+    'POST /api/generate-itinerary': 'Generate travel itinerary',
+    'POST /api/generate-budget': 'Generate budget breakdown',
+    'POST /api/generate-itinerary/stream': 'Stream travel itinerary (NDJSON)',
+    'POST /api/generate-budget/stream': 'Stream budget breakdown (NDJSON)',
+    'POST /api/generate-trip': 'Generate itinerary and budget in one call',
+    'POST /api/generate-trip/stream': 'Stream itinerary and budget sections (NDJSON)',
+    'POST /api/similar-trips': 'Search previously generated plans by similarity',
+    'POST /api/generate-batch': 'Generate many itineraries, budgets or trips (NDJSON, one frame per request)',
+    'POST /api/jobs': 'Queue an itinerary, budget or trip generation; returns a job id',
+    'GET /api/jobs/<id>': 'Job status and result',
+    'GET /api/jobs/<id>/events': 'Job status and result as server-sent events',
+    'GET /api/stats': 'Admission queue, coalescing, cache and backend statistics',
+    'GET /metrics': 'Prometheus metrics',
+    'GET /health': 'Health check',
+    'GET /health/live': 'Liveness probe',
+    'GET /health/ready': 'Readiness probe (cached, no inference)'
+}
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics"""
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/', methods=['GET'])
 def home():
     """API information"""
-    ollama_status = test_ollama_connection()
+    ollama_status = readiness.status()['ready']
     
     return jsonify({
         'message': 'TravelMate AI Assistant API',
         'version': '1.0',
         'model': MODEL_NAME,
         'ollama_status': 'connected' if ollama_status else 'disconnected',
-        'endpoints': {
-            'POST /api/generate-itinerary': 'Generate travel itinerary',
-            'POST /api/generate-budget': 'Generate budget breakdown', 
-            'GET /health': 'Health check'
-        }
+        'endpoints': API_ENDPOINTS
     })
 
 if __name__ == '__main__':
@@ -467,18 +1450,33 @@ if __name__ == '__main__':
     print("=" * 50)
     
     if test_ollama_connection():
-        print(f"Model: {MODEL_NAME} (Connected)")
+        print(f"Model: {MODEL_NAME} (Connected, preloading with num_ctx={PROMPT_NUM_CTX}, keep_alive={OLLAMA_KEEP_ALIVE})")
     else:
-        print(" Ollama: Not Available")
+        print(" Ollama: Not Available (the model is preloaded once it comes up)")
         print("\n  To fix this issue:")
         print("   1. Install Ollama: https://ollama.ai/download")
         print("   2. Pull the model: ollama pull llama3.2")
         print("   3. Start Ollama service")
     
+    # Waits for readiness itself, so Ollama may come up after the API
+    model_lifecycle.start()
+    
+    # Picks up jobs left queued (or mid-generation) by a previous run
+    job_queue.start()
+    
     print("\n Available endpoints:")
     print("   POST /api/generate-itinerary - AI itinerary generation")
     print("   POST /api/generate-budget    - Smart budget planning")
+    print("   POST /api/generate-itinerary/stream - Streaming itinerary (NDJSON)")
+    print("   POST /api/generate-budget/stream    - Streaming budget (NDJSON)")
+    print("   POST /api/generate-trip      - Itinerary + budget in one call")
+    print("   POST /api/generate-trip/stream      - Streaming trip plan (NDJSON)")
+    print("   POST /api/similar-trips     - Similar stored trip plans")
+    print("   POST /api/generate-batch    - Bulk trip planning (NDJSON)")
+    print("   POST /api/jobs              - Queued generation (poll GET /api/jobs/<id>)")
     print("   GET  /health                - Health check")
+    print("   GET  /health/live           - Liveness probe")
+    print("   GET  /health/ready          - Readiness probe")
     print("=" * 50)
     print(" Server starting on http://localhost:5000")
     print("   Frontend can now connect!\n")
@@ -0,0 +1,1156 @@
+"""Async (ASGI) serving mode for the TravelMate generation API.
+
+Same routes and JSON contract as the Flask app in app.py, but every handler
+is a coroutine and Ollama is called through a non-blocking httpx client, so
+a worker can hold thousands of idle connections waiting on the model
+without a thread each. Run it under a production ASGI server, e.g.:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Match, Route
+
+from admission import (ADMISSION_MAX_WAIT, ADMISSION_QUEUE_SIZE, ADMISSION_REJECT_MODE, EXPECTED_GENERATION_SECONDS,
+                       MAX_CONCURRENT_GENERATIONS, AdmissionRejected)
+from ollama_client import CONNECT_TIMEOUT, POOL_SIZE
+from ollama_pool import get_ollama_pool
+from trip_request import InvalidTripRequest, trip_request_from_json
+from trip_sections import SECTION_NAMES, split_trip_sections
+from warehouse import plan_request
+from metrics import (ADMISSION_WAIT, CONTENT_TYPE as METRICS_CONTENT_TYPE, FALLBACKS, HTTP_IN_FLIGHT, HTTP_LATENCY,
+                     GENERATIONS_CANCELLED, HTTP_REQUESTS, OLLAMA_IN_FLIGHT, OLLAMA_REQUESTS, REGISTRY, component_collector,
+                     record_ollama_result, render as render_metrics)
+from jobs import RetryJob
+from cancellation import CANCEL_POLL_SECONDS, CancelToken, GenerationCancelled
+from app import (API_ENDPOINTS, BATCH_BUSY_RETRIES, BATCH_MAX_PARALLEL, CANCELLED_FRAME, JOB_EVENTS_HEARTBEAT_SECONDS,
+                 JOB_EVENTS_POLL_SECONDS, JOB_KINDS, MODEL_NAME, batch_frame, batch_params, batch_unavailable_frames,
+                 build_generation, build_ollama_payload, cache_generation, continuation_request, fallback_result,
+                 generate_fallback_budget, generate_fallback_itinerary, generate_fallback_trip, generation_result,
+                 group_batch, invalid_batch_frame, job_fallback, job_key, job_links, job_params, job_queue,
+                 latency_controller, lookup_generation, model_lifecycle, partial_generations, plan_generation,
+                 prepare_generation, readiness, record_fallback, remember_trip_plan, response_cache, resumed_chunk,
+                 semantic_cache, similar_trips_params, stream_summary_frame, structured_generation, trip_frame_tagger,
+                 trip_sections_response, vector_db_search_similar_trips, warehouse, warehouse_trip_text)
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_UNAVAILABLE = 'Ollama service unavailable. Please ensure Ollama is running with llama3.2 model.'
+
+
+class AsyncAdmission:
+    """asyncio counterpart of admission.AdmissionController: bounded slots and wait queue.
+
+    As in the threaded controller, a request is rejected before queueing
+    when the queue is full or its estimated wait already exceeds its
+    deadline.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_GENERATIONS, max_queue=ADMISSION_QUEUE_SIZE,
+                 max_wait=ADMISSION_MAX_WAIT, expected_service_time=EXPECTED_GENERATION_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "deadline": 0, "deadline_exceeded": 0}
+        self.avg_service_time = expected_service_time
+        self._sem = asyncio.Semaphore(max_concurrent)
+
+    def estimated_wait(self, position=None):
+        """Expected seconds before a request at ``position`` in the queue gets a slot"""
+        if position is None:
+            position = self.queue_depth
+        if self.in_flight < self.max_concurrent and position == 0:
+            return 0.0
+        return (position // self.max_concurrent + 1) * self.avg_service_time
+
+    def _reject(self, reason):
+        self.rejected[reason] += 1
+        logger.warning(f"Admission rejected ({reason}): {self.in_flight} running, {self.queue_depth} queued")
+        return AdmissionRejected(reason, self.estimated_wait())
+
+    @asynccontextmanager
+    async def slot(self, max_wait=None):
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        if self._sem.locked():
+            if self.queue_depth >= self.max_queue:
+                raise self._reject("queue_full")
+            if self.estimated_wait(self.queue_depth) > max_wait:
+                raise self._reject("deadline")
+            self.queue_depth += 1
+            start = time.time()
+            try:
+                await asyncio.wait_for(self._sem.acquire(), max_wait)
+            except asyncio.TimeoutError:
+                raise self._reject("deadline_exceeded")
+            except asyncio.CancelledError:
+                GENERATIONS_CANCELLED.inc(reason="disconnect", stage="queued")
+                raise
+            finally:
+                self.queue_depth -= 1
+            ADMISSION_WAIT.observe(time.time() - start)
+        else:
+            await self._sem.acquire()
+            ADMISSION_WAIT.observe(0.0)
+
+        self.in_flight += 1
+        self.admitted += 1
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * (time.time() - start)
+            self._sem.release()
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_wait": self.max_wait,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avg_service_seconds": round(self.avg_service_time, 3)
+        }
+
+
+class AsyncFlight:
+    """Frame buffer shared by every streaming request attached to one generation.
+
+    Subscribers count from the moment they are handed out; the producing
+    task is cancelled once the last one has gone away.
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.done = False
+        self.subscribers = 0
+        self.task = None
+        self.cancelled = False
+        self._changed = asyncio.Condition()
+
+    async def publish(self, frame):
+        async with self._changed:
+            self.frames.append(frame)
+            self._changed.notify_all()
+
+    async def finish(self):
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    def subscribe(self):
+        self.subscribers += 1
+        return AsyncSubscription(self)
+
+    def unsubscribe(self):
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done and self.task is not None:
+            logger.info("Last client left a shared stream; cancelling it")
+            self.cancelled = True
+            self.task.cancel()
+
+
+class AsyncSubscription:
+    """Async twin of singleflight.Subscription: released when closed, exhausted, cancelled or collected"""
+
+    def __init__(self, flight):
+        self.flight = flight
+        self.index = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        flight = self.flight
+        if not self.closed:
+            try:
+                async with flight._changed:
+                    await flight._changed.wait_for(lambda: self.index < len(flight.frames) or flight.done)
+            except BaseException:
+                self.close()
+                raise
+            if self.index < len(flight.frames):
+                self.index += 1
+                return flight.frames[self.index - 1]
+            self.close()
+        raise StopAsyncIteration
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flight.unsubscribe()
+
+    async def aclose(self):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+class AsyncGenerationService:
+    """Owns the async Ollama client plus the async admission and coalescing state.
+
+    Backend selection and passive health tracking are delegated to the
+    shared OllamaPool, so both serving modes route and eject identically.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.loop = None
+        self.pool = get_ollama_pool()
+        self.admission = AsyncAdmission()
+        self.tasks = {}
+        self.waiters = {}
+        self.streams = {}
+        self.coalesced = 0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        connections = POOL_SIZE * len(self.pool.backends)
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            headers={'Content-Type': 'application/json'}
+        )
+        logger.info(f"Async Ollama client ready for {len(self.pool.backends)} backend(s) (pool={POOL_SIZE} per backend)")
+
+    async def stop(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    def timeout(self, timeout):
+        return httpx.Timeout(timeout, connect=CONNECT_TIMEOUT)
+
+    async def post(self, path, payload, timeout, affinity_key=None):
+        """POST through the pool, failing over to another backend on connection errors"""
+        tried = []
+        while True:
+            backend = self.pool.acquire(affinity_key, exclude=tried)
+            if backend is None:
+                raise httpx.ConnectError("No Ollama backend reachable")
+            tried.append(backend)
+            start = time.time()
+            try:
+                response = await self.client.post(backend.client.url(path), json=payload, timeout=self.timeout(timeout))
+            except httpx.TimeoutException:
+                self.pool.release(backend, timed_out=True)
+                raise
+            except httpx.TransportError:
+                self.pool.release(backend, failed=True)
+                if len(tried) < len(self.pool.backends):
+                    continue
+                raise
+            self.pool.release(backend, time.time() - start, failed=response.status_code >= 500)
+            return response
+
+    async def ollama_chunks(self, prompt, timeout, options=None, affinity_key=None, model=None):
+        """Async twin of app.ollama_chunks; cancelling the calling task also aborts the Ollama request"""
+        model = model or MODEL_NAME
+        cancel = CancelToken(time.time() + timeout)
+        pieces = []
+        request_prompt, raw = prompt, False
+        partial = partial_generations.take(affinity_key, model, prompt)
+        if partial:
+            logger.info(f"Resuming {len(partial)} characters of an aborted generation")
+            pieces.append(partial)
+            yield resumed_chunk(partial)
+            request_prompt, options = continuation_request(prompt, options, model, partial)
+            raw = True
+
+        lines = self.stream_with_ollama(request_prompt, timeout=timeout, options=options, affinity_key=affinity_key,
+                                        model=model, raw=raw)
+        try:
+            async for line in lines:
+                cancel.check()
+                chunk = json.loads(line)
+                if not chunk.get('done'):
+                    pieces.append(chunk.get('response', ''))
+                yield chunk, line.encode()
+        except asyncio.CancelledError:
+            GENERATIONS_CANCELLED.inc(reason='disconnect', stage='generating')
+            partial_generations.keep(affinity_key, ''.join(pieces), model, prompt)
+            raise
+        except Exception:
+            partial_generations.keep(affinity_key, ''.join(pieces), model, prompt)
+            raise
+        finally:
+            await lines.aclose()
+
+    async def generate_with_ollama(self, prompt, timeout=180, options=None, affinity_key=None, model=None):
+        """Async twin of app.generate_with_ollama with the same return convention"""
+        OLLAMA_IN_FLIGHT.inc()
+        try:
+            logger.info(f"Making async Ollama request with {timeout}s timeout...")
+            start_time = time.time()
+
+            pieces = []
+            async for chunk, _ in self.ollama_chunks(prompt, timeout, options=options, affinity_key=affinity_key,
+                                                     model=model):
+                if not chunk.get('done'):
+                    pieces.append(chunk.get('response', ''))
+                    continue
+                generated_text = ''.join(pieces) or 'No response generated'
+                elapsed_time = time.time() - start_time
+                logger.info(f"Response generated successfully ({len(generated_text)} characters, {elapsed_time:.1f}s)")
+                OLLAMA_REQUESTS.inc(mode='blocking', outcome='success')
+                record_ollama_result(chunk, elapsed_time, 'blocking')
+                latency_controller.observe(chunk, elapsed_time, model)
+                return generated_text
+            logger.error("Ollama response ended without a final chunk")
+            OLLAMA_REQUESTS.inc(mode='blocking', outcome='error')
+            return None
+
+        except asyncio.CancelledError:
+            logger.info("Generation abandoned by its clients; aborted")
+            OLLAMA_REQUESTS.inc(mode='blocking', outcome='cancelled')
+            raise
+        except GenerationCancelled:
+            logger.error(f"Ollama generation passed its {timeout}s deadline; aborted")
+            OLLAMA_REQUESTS.inc(mode='blocking', outcome='cancelled')
+            return "TIMEOUT"
+        except httpx.TimeoutException:
+            logger.error(f"Ollama request timed out after {timeout} seconds")
+            OLLAMA_REQUESTS.inc(mode='blocking', outcome='timeout')
+            return "TIMEOUT"
+        except httpx.TransportError:
+            logger.error("Cannot connect to Ollama - is it running?")
+            OLLAMA_REQUESTS.inc(mode='blocking', outcome='error')
+            return None
+        except Exception as e:
+            logger.error(f"Error calling Ollama: {e}")
+            OLLAMA_REQUESTS.inc(mode='blocking', outcome='error')
+            return None
+        finally:
+            OLLAMA_IN_FLIGHT.dec()
+
+    async def generate_shared(self, cache_key, full_prompt, timeout, options=None, max_wait=None, semantic=None,
+                              plan=None, request=None, kind=None):
+        """Coalesce identical generations onto one task; returns (result, shared).
+
+        Given the HTTP ``request``, a client that disconnects stops waiting (GenerationCancelled). Once
+        every waiter has gone, the task is cancelled, which aborts the Ollama call and frees its slot.
+        """
+        task = self.tasks.get(cache_key)
+        if task is not None:
+            self.coalesced += 1
+            return await self.wait_shared(cache_key, task, request), True
+
+        async def generate():
+            async with self.admission.slot(max_wait):
+                result = await self.generate_with_ollama(full_prompt, timeout=timeout, options=options,
+                                                         affinity_key=cache_key, model=plan['model'] if plan else None)
+            if result is not None and result != "TIMEOUT":
+                await asyncio.to_thread(cache_generation, cache_key, result, semantic, plan, kind)
+            return result
+
+        task = asyncio.ensure_future(generate())
+        self.tasks[cache_key] = task
+        task.add_done_callback(lambda _: self.forget_task(cache_key, task))
+        return await self.wait_shared(cache_key, task, request), False
+
+    def forget_task(self, cache_key, task):
+        """Drop ``task`` from the coalescing map unless a newer task has taken its key"""
+        if self.tasks.get(cache_key) is task:
+            del self.tasks[cache_key]
+
+    async def wait_shared(self, cache_key, task, request=None):
+        """Wait for a shared generation task, or until this waiter's client disconnects"""
+        self.waiters[task] = self.waiters.get(task, 0) + 1
+        try:
+            if request is None:
+                return await asyncio.shield(task)
+            watcher = asyncio.ensure_future(wait_for_disconnect(request))
+            try:
+                await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                watcher.cancel()
+            if task.done():
+                return task.result()
+        finally:
+            self.waiters[task] -= 1
+            if not self.waiters[task]:
+                del self.waiters[task]
+        if task not in self.waiters:
+            logger.info("Every client of a generation disconnected; cancelling it")
+            # Requests arriving while it winds down start a fresh generation
+            self.forget_task(cache_key, task)
+            task.cancel()
+        raise GenerationCancelled('disconnect')
+
+    async def stream_with_ollama(self, prompt, timeout=180, options=None, affinity_key=None, model=None, raw=False):
+        """Stream generate lines, failing over to another backend if one fails before sending anything"""
+        tried = []
+        while True:
+            backend = self.pool.acquire(affinity_key, exclude=tried)
+            if backend is None:
+                raise httpx.ConnectError("No Ollama backend reachable")
+            tried.append(backend)
+            start = time.time()
+            outcome = {"failed": False, "timed_out": False}
+            streamed = False
+            try:
+                async with self.client.stream(
+                    "POST", backend.client.url("/api/generate"),
+                    json=build_ollama_payload(prompt, stream=True, options=options, model=model, raw=raw),
+                    timeout=self.timeout(timeout)
+                ) as response:
+                    if response.status_code != 200:
+                        outcome["failed"] = response.status_code >= 500
+                        await response.aread()
+                        raise httpx.HTTPStatusError(
+                            f"Ollama API error: {response.status_code} - {response.text}",
+                            request=response.request, response=response
+                        )
+                    async for line in response.aiter_lines():
+                        if line:
+                            streamed = True
+                            yield line
+                return
+            except httpx.TimeoutException:
+                outcome["timed_out"] = True
+                raise
+            except httpx.TransportError:
+                outcome["failed"] = True
+                if streamed or len(tried) >= len(self.pool.backends):
+                    raise
+                logger.warning(f"Ollama backend {backend.base_url} failed before streaming, failing over")
+            finally:
+                self.pool.release(backend, time.time() - start, **outcome)
+
+    async def stream_generation_frames(self, full_prompt, trip, fallback_fn, timeout,
+                                       cache_key=None, options=None, max_wait=None, semantic=None, plan=None,
+                                       kind=None):
+        """Async twin of app.stream_generation_frames, including admission control"""
+        try:
+            async with self.admission.slot(max_wait):
+                start_time = time.time()
+                first_token_time = None
+                pieces = []
+                OLLAMA_IN_FLIGHT.inc()
+                try:
+                    async for chunk, line in self.ollama_chunks(full_prompt, timeout, options=options,
+                                                                affinity_key=cache_key,
+                                                                model=plan['model'] if plan else None):
+                        if not chunk.get('done'):
+                            if first_token_time is None:
+                                first_token_time = time.time()
+                            pieces.append(chunk.get('response', ''))
+                            yield line + b"\n"
+                            continue
+
+                        if cache_key:
+                            await asyncio.to_thread(cache_generation, cache_key, ''.join(pieces), semantic, plan,
+                                                    kind)
+                        OLLAMA_REQUESTS.inc(mode='stream', outcome='success')
+                        record_ollama_result(chunk, time.time() - start_time, 'stream',
+                                             time_to_first_token=first_token_time - start_time if first_token_time else None)
+                        latency_controller.observe(chunk, time.time() - start_time, plan['model'] if plan else None)
+                        yield json.dumps(stream_summary_frame(chunk, start_time, first_token_time, plan)).encode() + b"\n"
+                        return
+                finally:
+                    OLLAMA_IN_FLIGHT.dec()
+
+            OLLAMA_REQUESTS.inc(mode='stream', outcome='error')
+            yield json.dumps({'done': True, 'status': 'error', 'message': 'Ollama stream ended unexpectedly'}).encode() + b"\n"
+
+        except AdmissionRejected as e:
+            if ADMISSION_REJECT_MODE == 'fallback':
+                record_fallback(fallback_fn, 'busy')
+                yield json.dumps({
+                    'response': fallback_fn(trip),
+                    'done': True,
+                    'status': 'fallback',
+                    'message': 'AI is busy right now. Here\'s a basic structure.',
+                    'retry_after': e.retry_after
+                }).encode() + b"\n"
+            else:
+                yield json.dumps({
+                    'done': True,
+                    'status': 'busy',
+                    'message': 'AI is busy right now. Please retry shortly.',
+                    'retry_after': e.retry_after
+                }).encode() + b"\n"
+        except asyncio.CancelledError:
+            OLLAMA_REQUESTS.inc(mode='stream', outcome='cancelled')
+            raise
+        except GenerationCancelled:
+            logger.error(f"Ollama stream passed its {timeout}s deadline; aborted")
+            OLLAMA_REQUESTS.inc(mode='stream', outcome='cancelled')
+            if pieces:
+                yield json.dumps({'done': True, 'status': 'timeout', 'message': 'AI stopped responding mid-stream'}).encode() + b"\n"
+                return
+            record_fallback(fallback_fn, 'timeout')
+            yield json.dumps({
+                'response': fallback_fn(trip),
+                'done': True,
+                'status': 'fallback',
+                'message': 'AI took too long to respond. Here\'s a basic structure.'
+            }).encode() + b"\n"
+        except httpx.TimeoutException:
+            logger.error(f"Ollama stream timed out after {timeout} seconds")
+            OLLAMA_REQUESTS.inc(mode='stream', outcome='timeout')
+            if pieces:
+                yield json.dumps({'done': True, 'status': 'timeout', 'message': 'AI stopped responding mid-stream'}).encode() + b"\n"
+                return
+            record_fallback(fallback_fn, 'timeout')
+            yield json.dumps({
+                'response': fallback_fn(trip),
+                'done': True,
+                'status': 'fallback',
+                'message': 'AI took too long to respond. Here\'s a basic structure.'
+            }).encode() + b"\n"
+        except Exception as e:
+            logger.error(f"Error streaming from Ollama: {e}")
+            OLLAMA_REQUESTS.inc(mode='stream', outcome='error')
+            yield json.dumps({'done': True, 'status': 'error', 'message': OLLAMA_UNAVAILABLE}).encode() + b"\n"
+
+    def stream_shared(self, cache_key, frames_fn):
+        """Attach to the frame stream for this key, starting it if nobody else has; returns (frames, shared)"""
+        key = f"stream:{cache_key}"
+        flight = self.streams.get(key)
+        if flight is not None and not flight.cancelled:
+            self.coalesced += 1
+            return flight.subscribe(), True
+
+        flight = AsyncFlight()
+        self.streams[key] = flight
+
+        async def pump():
+            try:
+                async for frame in frames_fn():
+                    await flight.publish(frame)
+            except asyncio.CancelledError:
+                await flight.publish(CANCELLED_FRAME)
+                raise
+            finally:
+                if self.streams.get(key) is flight:
+                    del self.streams[key]
+                await flight.finish()
+
+        flight.task = asyncio.ensure_future(pump())
+        return flight.subscribe(), False
+
+    def stats(self):
+        return {
+            'admission': self.admission.stats(),
+            'singleflight': {
+                'in_flight': len(self.tasks) + len(self.streams),
+                'coalesced': self.coalesced
+            },
+            'partial_generations': partial_generations.stats(),
+            'cache': response_cache.stats(),
+            'semantic_cache': semantic_cache.stats(),
+            'warehouse': warehouse.stats(),
+            'model_lifecycle': model_lifecycle.stats(),
+            'slo': latency_controller.stats(),
+            'jobs': job_queue.stats(),
+            'ollama_pool': self.pool.stats()
+        }
+
+
+service = AsyncGenerationService()
+
+REGISTRY.register_collector('components', component_collector(
+    service.admission.stats, response_cache.stats, lambda: service.stats()['singleflight'], service.pool.stats
+))
+
+def route_label(scope):
+    """Route template for metrics labels, so /api/jobs/<id> paths share one series"""
+    if scope['path'] in ROUTE_PATHS:
+        return scope['path']
+    for route in ROUTES:
+        if route.matches(scope)[0] != Match.NONE:
+            return route.path
+    return 'unmatched'
+
+
+class MetricsMiddleware:
+    """Per-route request counts, header latency and in-flight gauge for the ASGI app"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        route = route_label(scope)
+        start = time.time()
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_with_metrics(message):
+            if message['type'] == 'http.response.start':
+                HTTP_REQUESTS.inc(route=route, method=scope['method'], status=message['status'])
+                HTTP_LATENCY.observe(time.time() - start, route=route)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+
+
+def requested_max_wait(request):
+    try:
+        return float(request.headers['X-Max-Queue-Wait'])
+    except (KeyError, ValueError):
+        return None
+
+
+def with_structured(request, body, kind, text, cached=None):
+    """Add 'structured' to a successful JSON body when the client asked for ?structured=1"""
+    if request.query_params.get('structured', '').lower() in ('1', 'true'):
+        body['structured'] = structured_generation(kind, text, cached)
+    return body
+
+
+async def wait_for_disconnect(request):
+    """Return once the client behind ``request`` has gone away"""
+    while not await request.is_disconnected():
+        await asyncio.sleep(CANCEL_POLL_SECONDS)
+
+
+def client_gone_response():
+    """Nobody reads this; nginx's 499 keeps abandoned requests apart in the HTTP metrics"""
+    return Response(status_code=499)
+
+
+async def read_trip_request(request):
+    """Parse and validate the JSON body; raises InvalidTripRequest"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    return trip_request_from_json(data)
+
+
+def invalid_request_response(error):
+    return JSONResponse({'error': str(error), 'details': error.errors}, status_code=400)
+
+
+def busy_response(rejection, fallback_body, kind):
+    headers = {'Retry-After': str(rejection.retry_after)}
+    if ADMISSION_REJECT_MODE == 'fallback':
+        FALLBACKS.inc(kind=kind, reason='busy')
+        return JSONResponse({
+            **fallback_body,
+            'status': 'fallback',
+            'message': 'AI is busy right now. Here\'s a basic plan.'
+        }, headers=headers)
+    return JSONResponse({
+        'error': 'Server busy',
+        'message': 'Too many trip plans are being generated. Please retry shortly.',
+        'retry_after': rejection.retry_after
+    }, status_code=rejection.status_code, headers=headers)
+
+
+def ndjson_response(frames, cache_status=None, shared=False):
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+    if cache_status:
+        headers['X-Cache'] = cache_status
+    if shared:
+        headers['X-Coalesced'] = 'true'
+    return StreamingResponse(frames, media_type='application/x-ndjson', headers=headers)
+
+
+async def cached_stream_frames(cached):
+    yield json.dumps({'response': cached['response'], 'done': False}).encode() + b"\n"
+    yield json.dumps({'done': True, 'status': 'success', 'cached': True}).encode() + b"\n"
+
+
+async def tag_trip_frames(frames, trip):
+    tag = trip_frame_tagger(trip)
+    async for line in frames:
+        for frame in tag(line):
+            yield frame
+
+
+async def generate_section(request, kind, fallback_fn, timeout):
+    """Shared body of the blocking itinerary and budget routes"""
+    try:
+        trip = await read_trip_request(request)
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+
+    try:
+        logger.info(f"Generating {kind} for: {trip.prompt[:100]}...")
+
+        planned = warehouse.lookup(trip)
+        if planned:
+            return JSONResponse(with_structured(request, {'response': planned[kind], 'status': 'success'}, kind,
+                                                planned[kind]), headers={'X-Cache': 'WAREHOUSE'})
+
+        template, full_prompt, options = build_generation(kind, trip)
+        cache_key, cached, cache_status, semantic = await asyncio.to_thread(lookup_generation, template, trip, options)
+        if cached:
+            return JSONResponse(with_structured(request, {'response': cached['response'], 'status': 'success'}, kind,
+                                                cached['response'], cached), headers={'X-Cache': cache_status})
+
+        full_prompt, options, plan = plan_generation(kind, trip, full_prompt, options, service.admission)
+        try:
+            result, shared = await service.generate_shared(cache_key, full_prompt, timeout, options=options,
+                                                           max_wait=requested_max_wait(request), semantic=semantic,
+                                                           plan=plan, request=request, kind=kind)
+        except AdmissionRejected as e:
+            return busy_response(e, {'response': fallback_fn(trip)}, kind)
+        except GenerationCancelled:
+            return client_gone_response()
+
+        if result == "TIMEOUT":
+            FALLBACKS.inc(kind=kind, reason='timeout')
+            return JSONResponse({
+                'response': fallback_fn(trip),
+                'status': 'fallback',
+                'message': f'AI took too long to respond. Here\'s a basic {kind} structure.'
+            })
+        elif result is None:
+            return JSONResponse({
+                'error': f'Failed to generate {kind}',
+                'message': OLLAMA_UNAVAILABLE
+            }, status_code=500)
+
+        return JSONResponse(with_structured(request, {'response': result, 'status': 'success', 'generation': plan},
+                                            kind, result), headers={
+            'X-Cache': 'MISS',
+            'X-Coalesced': 'true' if shared else 'false'
+        })
+
+    except Exception as e:
+        logger.error(f"Error generating {kind}: {str(e)}")
+        return JSONResponse({'error': f'Failed to generate {kind}', 'message': str(e)}, status_code=500)
+
+
+async def stream_section(request, kind, fallback_fn, timeout, sectioned=False):
+    """Shared body of the streaming routes"""
+    try:
+        trip = await read_trip_request(request)
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+
+    logger.info(f"Streaming {kind} for: {trip.prompt[:100]}...")
+
+    planned = warehouse.lookup(trip)
+    if planned:
+        frames = cached_stream_frames({'response': warehouse_trip_text(planned) if sectioned else planned[kind]})
+        return ndjson_response(tag_trip_frames(frames, trip) if sectioned else frames, cache_status='WAREHOUSE')
+
+    template, full_prompt, options = build_generation(kind, trip)
+    cache_key, cached, cache_status, semantic = await asyncio.to_thread(lookup_generation, template, trip, options)
+    if cached:
+        frames = cached_stream_frames(cached)
+        return ndjson_response(tag_trip_frames(frames, trip) if sectioned else frames, cache_status=cache_status)
+
+    full_prompt, options, plan = plan_generation(kind, trip, full_prompt, options, service.admission)
+    max_wait = requested_max_wait(request)
+    frames, shared = service.stream_shared(cache_key, lambda: service.stream_generation_frames(
+        full_prompt, trip, fallback_fn, timeout, cache_key=cache_key, options=options, max_wait=max_wait,
+        semantic=semantic, plan=plan, kind=kind
+    ))
+    return ndjson_response(tag_trip_frames(frames, trip) if sectioned else frames, cache_status='MISS', shared=shared)
+
+
+async def generate_itinerary(request):
+    """Generate AI-powered travel itinerary"""
+    return await generate_section(request, 'itinerary', generate_fallback_itinerary, 180)
+
+
+async def generate_budget(request):
+    """Generate AI-powered budget breakdown"""
+    return await generate_section(request, 'budget', generate_fallback_budget, 120)
+
+
+async def generate_itinerary_stream(request):
+    return await stream_section(request, 'itinerary', generate_fallback_itinerary, 180)
+
+
+async def generate_budget_stream(request):
+    return await stream_section(request, 'budget', generate_fallback_budget, 120)
+
+
+async def generate_trip(request):
+    """Generate itinerary and budget together in a single model call"""
+    try:
+        trip = await read_trip_request(request)
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+
+    try:
+        planned = warehouse.lookup(trip)
+        if planned:
+            return JSONResponse(with_structured(request, {
+                'itinerary': {'response': planned['itinerary'], 'status': 'success'},
+                'budget': {'response': planned['budget'], 'status': 'success'},
+                'status': 'success'
+            }, 'trip', warehouse_trip_text(planned)), headers={'X-Cache': 'WAREHOUSE'})
+
+        template, full_prompt, options = build_generation('trip', trip)
+        cache_key, cached, cache_status, semantic = await asyncio.to_thread(lookup_generation, template, trip, options)
+        if cached:
+            return JSONResponse(with_structured(request, {
+                **trip_sections_response(cached['response'], trip),
+                'status': 'success'
+            }, 'trip', cached['response'], cached), headers={'X-Cache': cache_status})
+
+        fallback_body = {
+            'itinerary': {'response': generate_fallback_itinerary(trip), 'status': 'fallback'},
+            'budget': {'response': generate_fallback_budget(trip), 'status': 'fallback'}
+        }
+
+        full_prompt, options, plan = plan_generation('trip', trip, full_prompt, options, service.admission)
+        try:
+            result, shared = await service.generate_shared(
+                cache_key, full_prompt, 240, options=options, max_wait=requested_max_wait(request),
+                semantic=semantic, plan=plan, request=request, kind='trip'
+            )
+        except AdmissionRejected as e:
+            return busy_response(e, fallback_body, 'trip')
+        except GenerationCancelled:
+            return client_gone_response()
+
+        if result == "TIMEOUT":
+            FALLBACKS.inc(kind='trip', reason='timeout')
+            return JSONResponse({
+                **fallback_body,
+                'status': 'fallback',
+                'message': 'AI took too long to respond. Here\'s a basic trip plan.'
+            })
+        elif result is None:
+            return JSONResponse({'error': 'Failed to generate trip plan', 'message': OLLAMA_UNAVAILABLE}, status_code=500)
+
+        parts = trip_sections_response(result, trip)
+        if not shared:
+            await asyncio.to_thread(remember_trip_plan, trip, parts)
+        return JSONResponse(with_structured(request, {
+            **parts,
+            'status': 'success',
+            'generation': plan
+        }, 'trip', result), headers={'X-Cache': 'MISS', 'X-Coalesced': 'true' if shared else 'false'})
+
+    except Exception as e:
+        logger.error(f"Error generating trip plan: {str(e)}")
+        return JSONResponse({'error': 'Failed to generate trip plan', 'message': str(e)}, status_code=500)
+
+
+async def generate_trip_stream(request):
+    return await stream_section(request, 'trip', generate_fallback_trip, 240, sectioned=True)
+
+
+async def similar_trips(request):
+    """Stored itineraries and budgets most similar to a free-text query"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    try:
+        query, destination, limit = similar_trips_params(data)
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+    results = await asyncio.to_thread(vector_db_search_similar_trips, query, destination, limit)
+    return JSONResponse({'query': query, 'results': results})
+
+
+async def generate_prepared(kind, trip, context):
+    """Async twin of app.generate_prepared, sharing this process's admission slots and coalescing"""
+    cache_key, full_prompt, options, semantic = context
+    full_prompt, options, plan = plan_generation(kind, trip, full_prompt, options, service.admission)
+    try:
+        result, shared = await service.generate_shared(cache_key, full_prompt, JOB_KINDS[kind][0], options=options,
+                                                       semantic=semantic, plan=plan, kind=kind)
+    except AdmissionRejected as e:
+        raise RetryJob(e.reason, e.retry_after)
+    if result == "TIMEOUT":
+        raise RuntimeError("Ollama timed out")
+    if result is None:
+        raise RuntimeError("Ollama service unavailable")
+
+    response = generation_result(kind, result, trip, plan)
+    if kind == 'trip' and not shared:
+        await asyncio.to_thread(remember_trip_plan, trip, response)
+    return response
+
+
+async def run_job_async(kind, data):
+    """Async twin of app.run_job"""
+    trip = trip_request_from_json(data)
+    stored, _, context = await asyncio.to_thread(prepare_generation, kind, trip)
+    return stored if stored is not None else await generate_prepared(kind, trip, context)
+
+
+async def generate_warehouse_plan_async(key):
+    """Async twin of app.generate_warehouse_plan, admitted through this process's async admission"""
+    trip = trip_request_from_json(plan_request(key))
+    _, full_prompt, options = build_generation('trip', trip)
+    async with service.admission.slot():
+        result = await service.generate_with_ollama(full_prompt, timeout=240, options=options)
+    if result in (None, "TIMEOUT"):
+        return None
+    sections = split_trip_sections(result)
+    if not all(name in sections for name in SECTION_NAMES):
+        return None
+    return sections, MODEL_NAME
+
+
+def refresh_warehouse_plan(key):
+    """Warehouse refresher body; it runs in a thread, so the generation is handed to the service loop"""
+    return asyncio.run_coroutine_threadsafe(generate_warehouse_plan_async(key), service.loop).result()
+
+
+# Precomputed plans refresh only while this process's async admission is idle
+warehouse.configure_refresh(
+    refresh_warehouse_plan,
+    lambda: (service.loop is not None and readiness.status()['ready'] and service.admission.in_flight == 0
+             and service.admission.queue_depth == 0)
+)
+
+batch_slots = asyncio.Semaphore(BATCH_MAX_PARALLEL)
+
+
+async def batch_generate(kind, trip, context):
+    """Async twin of app.batch_generate"""
+    for attempt in range(BATCH_BUSY_RETRIES):
+        async with batch_slots:
+            try:
+                return await generate_prepared(kind, trip, context)
+            except RetryJob as e:
+                retry_after = e.retry_after
+        if attempt < BATCH_BUSY_RETRIES - 1:
+            await asyncio.sleep(min(retry_after, 10))
+    raise RuntimeError("Model server stayed busy")
+
+
+async def batch_frames(kind, trips):
+    """Async twin of app.batch_frames"""
+    start_time = time.time()
+    groups, invalid = await asyncio.to_thread(group_batch, kind, trips)
+    counts = {'cached': 0, 'generated': 0, 'failed': 0, 'fallback': 0}
+
+    for index, error in invalid:
+        yield invalid_batch_frame(index, error)
+
+    pending = []
+    for trip, indexes in groups.values():
+        stored, cache_status, context = await asyncio.to_thread(prepare_generation, kind, trip)
+        if stored is not None:
+            counts['cached'] += 1
+            yield batch_frame(indexes, stored, cache_status)
+        else:
+            pending.append((trip, indexes, context))
+
+    if pending and not (await asyncio.to_thread(readiness.status))['ready']:
+        for frame in batch_unavailable_frames(kind, pending):
+            yield frame
+        counts['fallback'] = len(pending)
+        pending = []
+
+    async def generate(trip, indexes, context):
+        try:
+            body = await batch_generate(kind, trip, context)
+            counts['generated'] += 1
+        except Exception as e:
+            logger.error(f"Batch generation failed: {e}")
+            body = {**fallback_result(kind, trip, 'batch_failed'), 'message': str(e)}
+            counts['failed'] += 1
+        return batch_frame(indexes, body, 'MISS')
+
+    tasks = [asyncio.ensure_future(generate(*item)) for item in pending]
+    try:
+        for next_frame in asyncio.as_completed(tasks):
+            yield await next_frame
+    finally:
+        # A client that goes away stops the generations still queued for a bulk slot
+        for task in tasks:
+            task.cancel()
+
+    yield json.dumps({
+        'done': True,
+        'total': len(trips),
+        'unique': len(groups),
+        'invalid': len(invalid),
+        **counts,
+        'elapsed_seconds': round(time.time() - start_time, 3)
+    }).encode() + b"\n"
+
+
+async def generate_batch(request):
+    """Plan many trips in one call; results stream back as NDJSON, one frame per unique request"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    try:
+        kind, trips = batch_params(data)
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+
+    logger.info(f"Batch of {len(trips)} {kind} requests")
+    return ndjson_response(batch_frames(kind, trips))
+
+
+async def submit_job(request):
+    """Queue a generation and return its job id immediately"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    try:
+        kind, priority, body, trip = job_params(data)
+    except InvalidTripRequest as e:
+        return invalid_request_response(e)
+    job, created = await asyncio.to_thread(job_queue.submit, kind, body, job_key(kind, trip), priority)
+    return JSONResponse({**job, 'deduplicated': not created, **job_links(job)}, status_code=202 if created else 200)
+
+
+async def get_job(request):
+    """Status of a job, with its result once finished"""
+    job = await asyncio.to_thread(job_queue.get, request.path_params['job_id'])
+    if job is None:
+        return JSONResponse({'error': 'Job not found', 'message': 'Unknown job id, or its result has expired'},
+                            status_code=404)
+    return JSONResponse({**job, **job_links(job)})
+
+
+async def job_event_frames(job_id):
+    """Async twin of app.job_event_frames"""
+    last_status = None
+    last_sent = time.time()
+    while True:
+        job = await asyncio.to_thread(job_queue.get, job_id)
+        if job is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+            return
+        if job['status'] in ('done', 'failed'):
+            yield f"event: result\ndata: {json.dumps(job)}\n\n"
+            return
+        if job['status'] != last_status:
+            last_status = job['status']
+            last_sent = time.time()
+            yield f"event: status\ndata: {json.dumps({k: job.get(k) for k in ('id', 'status', 'queue_position')})}\n\n"
+        elif time.time() - last_sent > JOB_EVENTS_HEARTBEAT_SECONDS:
+            last_sent = time.time()
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+
+async def job_events(request):
+    """Subscribe to a job's status changes and result as server-sent events"""
+    return StreamingResponse(job_event_frames(request.path_params['job_id']), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def health_check(request):
+    """Health check endpoint (served from the cached readiness status)"""
+    status = await asyncio.to_thread(readiness.status)
+    return JSONResponse({
+        'status': 'healthy' if status['ready'] else 'degraded',
+        'ollama_connected': status['ollama_connected'],
+        'model_available': status['model_available'],
+        'model': MODEL_NAME,
+        'checked_at': status['checked_at'],
+        'age_seconds': status['age_seconds'],
+        'message': 'AI Travel Assistant API is running'
+    })
+
+
+async def liveness_check(request):
+    return JSONResponse({'status': 'alive'})
+
+
+async def readiness_check(request):
+    status = await asyncio.to_thread(readiness.status)
+    return JSONResponse({
+        'status': 'ready' if status['ready'] else 'not_ready',
+        'ollama_connected': status['ollama_connected'],
+        'model_available': status['model_available'],
+        'model': MODEL_NAME,
+        'checked_at': status['checked_at'],
+        'age_seconds': status['age_seconds'],
+        'stale': status['stale'],
+        'error': status['error']
+    }, status_code=200 if status['ready'] else 503)
+
+
+async def stats(request):
+    return JSONResponse(service.stats())
+
+
+async def metrics(request):
+    return Response(render_metrics(), headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+
+async def home(request):
+    """API information"""
+    status = await asyncio.to_thread(readiness.status)
+    return JSONResponse({
+        'message': 'TravelMate AI Assistant API',
+        'version': '1.0',
+        'model': MODEL_NAME,
+        'ollama_status': 'connected' if status['ready'] else 'disconnected',
+        'endpoints': API_ENDPOINTS
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await service.start()
+    readiness.start()
+    model_lifecycle.start()
+    # Job workers are threads; run each job on this loop so it shares async admission and coalescing
+    loop = asyncio.get_running_loop()
+    job_queue.configure(lambda kind, data: asyncio.run_coroutine_threadsafe(run_job_async(kind, data), loop).result(),
+                        job_fallback)
+    job_queue.start()
+    try:
+        yield
+    finally:
+        job_queue.stop()
+        model_lifecycle.stop()
+        warehouse.stop()
+        await service.stop()
+
+
+ROUTES = [
+    Route('/api/generate-itinerary', generate_itinerary, methods=['POST']),
+    Route('/api/generate-budget', generate_budget, methods=['POST']),
+    Route('/api/generate-itinerary/stream', generate_itinerary_stream, methods=['POST']),
+    Route('/api/generate-budget/stream', generate_budget_stream, methods=['POST']),
+    Route('/api/generate-trip', generate_trip, methods=['POST']),
+    Route('/api/generate-trip/stream', generate_trip_stream, methods=['POST']),
+    Route('/api/similar-trips', similar_trips, methods=['POST']),
+    Route('/api/generate-batch', generate_batch, methods=['POST']),
+    Route('/api/jobs', submit_job, methods=['POST']),
+    Route('/api/jobs/{job_id}', get_job, methods=['GET']),
+    Route('/api/jobs/{job_id}/events', job_events, methods=['GET']),
+    Route('/api/stats', stats, methods=['GET']),
+    Route('/metrics', metrics, methods=['GET']),
+    Route('/health', health_check, methods=['GET']),
+    Route('/health/live', liveness_check, methods=['GET']),
+    Route('/health/ready', readiness_check, methods=['GET']),
+    Route('/', home, methods=['GET'])
+]
+ROUTE_PATHS = {route.path for route in ROUTES}
+
+app = Starlette(
+    routes=ROUTES,
+    middleware=[
+        Middleware(MetricsMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,87 @@
+"""Microbenchmarks for prompt feature extraction.
+
+Compares the old per-function regex extraction with the single-pass
+``TripRequest`` parser, uncached and memoized, on a few prompt shapes.
+
+    python bench_trip_request.py --number 20000
+"""
+import argparse
+import re
+import timeit
+
+from trip_request import _parse, parse_trip_request
+
+PROMPTS = {
+    "frontend": """Plan a 5-day trip for 2 traveler(s) visiting Jaipur.
+
+        Travel preferences:
+        - Transport: train
+        - Accommodation: 4 star hotel
+        - Meals included: breakfast, dinner
+        - Start date: 2025-11-02
+        - Number of travelers: 2
+
+        Please provide a day-by-day itinerary with morning, afternoon, and evening activities.""",
+    "short": "2-day trip visiting Goa. Beach, nightlife, seafood.",
+    "international": "7-day trip to Tokyo for 3 travelers. Food, temples, shopping.",
+    "no_match": "Somewhere warm, please."
+}
+
+
+def legacy_extract(user_prompt):
+    """The extraction the prompt builder and both fallbacks used to repeat per request"""
+    # create_optimized_prompt
+    import re
+    duration = "multi"
+    if "day" in user_prompt.lower():
+        m = re.search(r'(\d+)-day', user_prompt)
+        if m:
+            duration = m.group(1)
+    destination = "the destination"
+    if "visiting" in user_prompt.lower():
+        m = re.search(r'visiting\s+([^.]+)', user_prompt)
+        if m:
+            destination = m.group(1).strip()
+    travelers = "travelers"
+    if "traveler(s)" in user_prompt:
+        m = re.search(r'(\d+)\s+traveler', user_prompt)
+        if m:
+            travelers = m.group(1) + " travelers"
+    # generate_fallback_itinerary
+    m = re.search(r'(\d+)-day', user_prompt)
+    m = re.search(r'visiting\s+([^.]+)', user_prompt)
+    # generate_fallback_budget
+    m = re.search(r'(\d+)-day', user_prompt)
+    m = re.search(r'(\d+)\s+traveler', user_prompt)
+    any(c in user_prompt.lower() for c in ['japan', 'usa', 'europe', 'singapore', 'thailand'])
+    return duration, destination, travelers
+
+
+def run(number):
+    uncached = _parse.__wrapped__
+    results = {}
+    for name, prompt in PROMPTS.items():
+        results[name] = {
+            "legacy_x3": timeit.timeit(lambda: legacy_extract(prompt), number=number),
+            "single_pass": timeit.timeit(lambda: uncached(prompt), number=number),
+            "memoized": timeit.timeit(lambda: parse_trip_request(prompt), number=number)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt extraction microbenchmarks")
+    parser.add_argument("--number", type=int, default=20000, help="iterations per case")
+    args = parser.parse_args()
+
+    re.purge()
+    print(f"{'prompt':<15}{'legacy x3':>12}{'single pass':>14}{'memoized':>12}   (µs per request)")
+    for name, timings in run(args.number).items():
+        per_call = {k: v / args.number * 1e6 for k, v in timings.items()}
+        print(f"{name:<15}{per_call['legacy_x3']:>12.2f}{per_call['single_pass']:>14.2f}{per_call['memoized']:>12.2f}")
+    for name, prompt in PROMPTS.items():
+        print(f"\n{name}: {parse_trip_request(prompt)!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Load test the TravelMate API and report latency percentiles as JSON.
+
+Drives one endpoint either closed-loop (``--concurrency`` clients each
+sending back-to-back requests) or open-loop (``--rate`` Poisson arrivals
+per second, regardless of how fast the server answers). Reports p50/p95/p99
+latency, time-to-first-byte, throughput, fallback and error rates. Runs
+are written to JSON so they can be compared with ``--compare``.
+
+Typical run without a real model:
+    python mock_ollama.py --port 11434 --tokens-per-second 40 --slots 2
+    python app.py
+    python benchmark.py --endpoint trip --stream --concurrency 8 --requests 200 --unique
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+API_URL = "http://localhost:5000"
+
+ENDPOINTS = {
+    "itinerary": "/api/generate-itinerary",
+    "budget": "/api/generate-budget",
+    "trip": "/api/generate-trip"
+}
+
+DEFAULT_PROMPTS = [
+    "2-day trip visiting Goa. Beach, nightlife, seafood.",
+    "2-day trip visiting Jaipur. Heritage, local food.",
+    "3-day trip visiting Kerala. Backwaters, houseboat.",
+    "2-day trip visiting Udaipur. Lakes, palaces.",
+    "5-day trip to Paris for 2 travelers. Museums, cafes.",
+    "4-day trip to Tokyo for 3 people. Food, temples, shopping."
+]
+
+COMPARE_KEYS = ["throughput_rps", "latency.p50", "latency.p95", "latency.p99", "ttfb.p50", "ttfb.p95",
+                "fallback_rate", "error_rate"]
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of an unsorted list (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def distribution(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "min": round(min(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p90": round(percentile(values, 90), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4)
+    }
+
+
+def classify(status_code, body, stream):
+    """Map a response to success, fallback, busy or error"""
+    if status_code in (429, 503):
+        return "busy"
+    if status_code >= 400:
+        return "error"
+    try:
+        if stream:
+            lines = [line for line in body.splitlines() if line.strip()]
+            frames = [json.loads(line) for line in lines]
+            final = frames[-1] if frames else {}
+            statuses = {f.get("status") for f in frames if f.get("done")}
+            status = "fallback" if "fallback" in statuses else final.get("status")
+        else:
+            data = json.loads(body)
+            status = data.get("status")
+            if status == "success" and any(
+                isinstance(part, dict) and part.get("status") == "fallback" for part in data.values()
+            ):
+                status = "fallback"
+    except ValueError:
+        return "error"
+    if status in ("success", "fallback", "busy"):
+        return status
+    return "error"
+
+
+def send_request(session, url, prompt, stream, timeout, max_queue_wait=None):
+    """Send one request; returns a result dict with latency, ttfb and outcome"""
+    headers = {"X-Max-Queue-Wait": str(max_queue_wait)} if max_queue_wait is not None else {}
+    start = time.perf_counter()
+    ttfb = None
+    try:
+        with session.post(url, json={"prompt": prompt}, timeout=timeout, stream=True, headers=headers) as response:
+            ttfb = time.perf_counter() - start
+            chunks = []
+            for chunk in response.iter_content(chunk_size=None):
+                if not chunks:
+                    ttfb = time.perf_counter() - start
+                chunks.append(chunk)
+            body = b"".join(chunks).decode("utf-8", errors="replace")
+            latency = time.perf_counter() - start
+            return {
+                "outcome": classify(response.status_code, body, stream),
+                "status_code": response.status_code,
+                "latency": latency,
+                "ttfb": ttfb,
+                "cache": response.headers.get("X-Cache"),
+                "coalesced": response.headers.get("X-Coalesced") == "true",
+                "bytes": len(body)
+            }
+    except requests.exceptions.Timeout:
+        outcome, error = "timeout", "timeout"
+    except requests.exceptions.RequestException as e:
+        outcome, error = "error", type(e).__name__
+    return {
+        "outcome": outcome,
+        "status_code": None,
+        "latency": time.perf_counter() - start,
+        "ttfb": ttfb,
+        "error": error
+    }
+
+
+class PromptSource:
+    """Round-robin over the prompt list, optionally tagging each one to defeat caching"""
+
+    def __init__(self, prompts, unique=False):
+        self.prompts = prompts
+        self.unique = unique
+        self.run_id = uuid.uuid4().hex[:8]
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            n = self._count
+            self._count += 1
+        prompt = self.prompts[n % len(self.prompts)]
+        return f"{prompt} (ref {self.run_id}-{n})" if self.unique else prompt
+
+
+def run_closed_loop(send, prompts, concurrency, total, duration):
+    """``concurrency`` workers send requests back to back until total/duration is reached"""
+    results = []
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                if (total and issued[0] >= total) or (deadline and time.perf_counter() >= deadline):
+                    return
+                issued[0] += 1
+            result = send(session, prompts.next())
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def run_open_loop(send, prompts, rate, total, duration, max_workers, seed=None):
+    """Poisson arrivals at ``rate`` per second; late responses do not slow the arrival clock"""
+    rng = random.Random(seed)
+    local = threading.local()
+
+    def task(prompt, scheduled):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        result = send(local.session, prompt)
+        result["dispatch_lag"] = time.perf_counter() - scheduled - result["latency"]
+        return result
+
+    futures = []
+    start = time.perf_counter()
+    next_arrival = start
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            if total and len(futures) >= total:
+                break
+            if duration and next_arrival - start >= duration:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(task, prompts.next(), next_arrival))
+            next_arrival += rng.expovariate(rate)
+    return [f.result() for f in futures]
+
+
+def summarize(results, elapsed, config):
+    ok = [r for r in results if r["outcome"] in ("success", "fallback")]
+    outcomes = {}
+    status_codes = {}
+    for r in results:
+        outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+        code = str(r["status_code"]) if r["status_code"] is not None else "none"
+        status_codes[code] = status_codes.get(code, 0) + 1
+    total = len(results) or 1
+    errors = outcomes.get("error", 0) + outcomes.get("timeout", 0)
+
+    summary = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": config,
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "outcomes": outcomes,
+        "status_codes": status_codes,
+        "fallback_rate": round(outcomes.get("fallback", 0) / total, 4),
+        "busy_rate": round(outcomes.get("busy", 0) / total, 4),
+        "error_rate": round(errors / total, 4),
+        "cache_hits": sum(1 for r in results if r.get("cache") == "HIT"),
+        "coalesced": sum(1 for r in results if r.get("coalesced")),
+        "latency": distribution([r["latency"] for r in ok]),
+        "ttfb": distribution([r["ttfb"] for r in ok if r["ttfb"] is not None])
+    }
+    lags = [r["dispatch_lag"] for r in results if "dispatch_lag" in r]
+    if lags:
+        summary["dispatch_lag"] = distribution(lags)
+    return summary
+
+
+def lookup(summary, dotted):
+    value = summary
+    for part in dotted.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(summary, baseline):
+    """Per-metric baseline/current/change for the headline numbers"""
+    diff = {}
+    for key in COMPARE_KEYS:
+        before, after = lookup(baseline, key), lookup(summary, key)
+        if before is None or after is None:
+            continue
+        change = round((after - before) / before * 100, 1) if before else None
+        diff[key] = {"baseline": before, "current": after, "change_pct": change}
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the TravelMate API")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="itinerary")
+    parser.add_argument("--stream", action="store_true", help="use the /stream variant of the endpoint")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=4, help="closed-loop clients (default)")
+    mode.add_argument("--rate", type=float, help="open-loop arrivals per second")
+    parser.add_argument("--requests", type=int, default=50, help="stop after this many requests (0 = no limit)")
+    parser.add_argument("--duration", type=float, default=0, help="stop issuing requests after this many seconds")
+    parser.add_argument("--max-workers", type=int, default=256, help="open-loop in-flight request cap")
+    parser.add_argument("--prompts", help="text file with one prompt per line")
+    parser.add_argument("--unique", action="store_true", help="make every prompt unique to bypass cache and coalescing")
+    parser.add_argument("--max-queue-wait", type=float, help="send X-Max-Queue-Wait with each request")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--compare", help="earlier report to diff against")
+    args = parser.parse_args()
+
+    if not args.requests and not args.duration:
+        parser.error("set --requests or --duration")
+
+    if args.prompts:
+        with open(args.prompts, encoding="utf-8") as f:
+            prompt_list = [line.strip() for line in f if line.strip()]
+    else:
+        prompt_list = DEFAULT_PROMPTS
+    prompts = PromptSource(prompt_list, unique=args.unique)
+
+    url = f"{args.url.rstrip('/')}{ENDPOINTS[args.endpoint]}{'/stream' if args.stream else ''}"
+
+    def send(session, prompt):
+        return send_request(session, url, prompt, args.stream, args.timeout, args.max_queue_wait)
+
+    config = {
+        "url": url,
+        "mode": "open" if args.rate else "closed",
+        "rate": args.rate,
+        "concurrency": None if args.rate else args.concurrency,
+        "requests": args.requests,
+        "duration": args.duration,
+        "unique_prompts": args.unique,
+        "prompts": len(prompt_list)
+    }
+    print(f"Benchmarking {url} ({config['mode']} loop)...")
+
+    start = time.perf_counter()
+    if args.rate:
+        results = run_open_loop(send, prompts, args.rate, args.requests, args.duration, args.max_workers, args.seed)
+    else:
+        results = run_closed_loop(send, prompts, args.concurrency, args.requests, args.duration)
+    summary = summarize(results, time.perf_counter() - start, config)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            summary["comparison"] = compare(summary, json.load(f))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(json.dumps(summary, indent=2))
+    print(f"\n✓ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "0"
+CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", str(24 * 3600)))
+CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def normalize_prompt(prompt):
+    """Collapse case and whitespace so trivially different prompts share an entry"""
+    return " ".join(prompt.lower().split())
+
+
+def make_cache_key(template, prompt, model, options):
+    """Content address for a generation: prompt, template, model and options"""
+    material = json.dumps({
+        "template": hashlib.sha256(template.encode()).hexdigest(),
+        "prompt": normalize_prompt(prompt),
+        "model": model,
+        "options": options
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU with per-entry TTL and a total size cap in bytes"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, size, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.current_bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key, payload, ttl):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (payload, size, time.time() + ttl)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._entries), "bytes": self.current_bytes, "max_bytes": self.max_bytes}
+
+
+class SQLiteCacheBackend:
+    """On-disk LRU/TTL cache that survives restarts"""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_access ON response_cache(last_access)")
+        self.current_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, size, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, size, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.current_bytes -= size
+                return None
+            self._conn.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key))
+            return bytes(payload)
+
+    def set(self, key, payload, ttl):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM response_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.current_bytes -= row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, payload, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now + ttl, now)
+            )
+            self.current_bytes += size
+            if self.current_bytes > self.max_bytes:
+                self._evict(now)
+
+    def _evict(self, now):
+        expired_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM response_cache WHERE expires_at <= ?", (now,)
+        ).fetchone()[0]
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        self.current_bytes -= expired_bytes
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM response_cache ORDER BY last_access ASC"
+        ).fetchall():
+            if self.current_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self.current_bytes -= size
+
+    def delete(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM response_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.current_bytes -= row[0]
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+            return {"backend": "sqlite", "path": self.path, "entries": entries, "bytes": self.current_bytes, "max_bytes": self.max_bytes}
+
+
+class ResponseCache:
+    """JSON-valued response cache with hit/miss accounting over a pluggable backend"""
+
+    def __init__(self, backend, ttl=CACHE_TTL, enabled=True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        payload = self.backend.get(key)
+        if payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(payload)
+
+    def set(self, key, value, ttl=None):
+        if not self.enabled:
+            return
+        self.backend.set(key, json.dumps(value).encode(), self.ttl if ttl is None else ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_response_cache():
+    """Build the cache configured through RESPONSE_CACHE_* environment variables"""
+    if CACHE_BACKEND == "sqlite":
+        backend = SQLiteCacheBackend(CACHE_PATH, CACHE_MAX_BYTES)
+    else:
+        backend = MemoryCacheBackend(CACHE_MAX_BYTES)
+    logger.info(f"Response cache: {CACHE_BACKEND} backend, {CACHE_MAX_BYTES} bytes, ttl {CACHE_TTL:.0f}s, enabled={CACHE_ENABLED}")
+    return ResponseCache(backend, CACHE_TTL, CACHE_ENABLED)
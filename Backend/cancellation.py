@@ -0,0 +1,156 @@
+"""Cancellation of abandoned generations and the partial output they leave behind.
+
+A generation nobody is waiting for still holds a model slot until Ollama
+has produced every token. ``CancelToken`` is passed from the HTTP layer
+down to the Ollama call. It fires when the last client attached to a
+generation disconnects, or when the generation's deadline passes. The
+generation loop checks the token between chunks. Once it fires, the loop
+closes the upstream response, which makes Ollama stop generating, and
+frees the admission slot for the next request in the queue.
+
+Whatever text was produced before the abort is kept in a
+``PartialStore`` under the generation's cache key. A later request for
+the same key resumes from it: the partial text is replayed at once and
+the model continues from where it stopped (a raw-mode prompt that
+pre-fills the assistant turn). Partials are discarded when they expire
+after ``PARTIAL_TTL`` seconds, when the store is full, or when the new
+generation cannot continue them (different model, or a model family
+whose chat template is not known here).
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from health import normalize_model_name
+from metrics import GENERATIONS_CANCELLED, PARTIAL_GENERATIONS
+
+logger = logging.getLogger(__name__)
+
+GENERATION_RESUME = os.environ.get("GENERATION_RESUME", "1") == "1"
+PARTIAL_TTL = float(os.environ.get("PARTIAL_TTL", "600"))
+PARTIAL_MAX_ENTRIES = int(os.environ.get("PARTIAL_MAX_ENTRIES", "256"))
+# Shorter partials are cheaper to regenerate than to resume with a second prompt evaluation
+PARTIAL_MIN_CHARACTERS = int(os.environ.get("PARTIAL_MIN_CHARACTERS", "200"))
+# How often a request queued for a model slot checks whether its client is still there
+CANCEL_POLL_SECONDS = 0.5
+
+# Prompt that re-opens the assistant turn after the partial answer, per model family (raw mode)
+CONTINUATION_TEMPLATES = {
+    "llama3": ("<|start_header_id|>user<|end_header_id|>\n\n{prompt}<|eot_id|>"
+               "<|start_header_id|>assistant<|end_header_id|>\n\n{partial}")
+}
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation once its CancelToken has fired"""
+
+    def __init__(self, reason):
+        super().__init__(f"Generation cancelled: {reason}")
+        self.reason = reason
+
+
+class CancelToken:
+    """Cancellation flag for one generation: fired explicitly, by a deadline, or by a parent token"""
+
+    def __init__(self, deadline=None, parent=None):
+        self.deadline = deadline
+        self.parent = parent
+        self.reason = None
+
+    def cancel(self, reason):
+        if self.reason is None:
+            self.reason = reason
+
+    @property
+    def cancelled(self):
+        if self.reason is None:
+            if self.parent is not None and self.parent.cancelled:
+                self.reason = self.parent.reason
+            elif self.deadline is not None and time.time() >= self.deadline:
+                self.reason = "deadline"
+        return self.reason is not None
+
+    def check(self, stage="generating"):
+        """Raise GenerationCancelled (and count it) once the token has fired"""
+        if self.cancelled:
+            GENERATIONS_CANCELLED.inc(reason=self.reason, stage=stage)
+            raise GenerationCancelled(self.reason)
+
+
+def continuation_prompt(model, prompt, partial):
+    """Raw-mode prompt that makes ``model`` continue ``partial``, or None for unknown model families"""
+    name = normalize_model_name(model)
+    for family, template in CONTINUATION_TEMPLATES.items():
+        if name.startswith(family):
+            return template.format(prompt=prompt, partial=partial)
+    return None
+
+
+class PartialStore:
+    """Bounded, expiring map of cache key -> partial output of an aborted generation"""
+
+    def __init__(self, ttl=PARTIAL_TTL, max_entries=PARTIAL_MAX_ENTRIES, min_characters=PARTIAL_MIN_CHARACTERS,
+                 enabled=GENERATION_RESUME):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_characters = min_characters
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.counts = {"kept": 0, "resumed": 0, "discarded": 0, "expired": 0}
+
+    def _count(self, outcome):
+        self.counts[outcome] += 1
+        PARTIAL_GENERATIONS.inc(outcome=outcome)
+
+    def keep(self, key, text, model, prompt):
+        """Store the partial output of an aborted generation; too-short partials are dropped"""
+        if not self.enabled or key is None or len(text) < self.min_characters:
+            return False
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {"text": text, "model": model, "prompt": prompt, "kept_at": time.time()}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count("discarded")
+            self._count("kept")
+        logger.info(f"Kept {len(text)} characters of aborted generation {key[:12]}")
+        return True
+
+    def take(self, key, model, prompt):
+        """Remove and return the partial text for ``key`` if it can continue this exact generation"""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        if time.time() - entry["kept_at"] > self.ttl:
+            self._count("expired")
+            return None
+        if entry["model"] != model or entry["prompt"] != prompt or continuation_prompt(model, prompt, "") is None:
+            self._count("discarded")
+            return None
+        self._count("resumed")
+        return entry["text"]
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._count("discarded")
+
+    def stats(self):
+        with self._lock:
+            stored = len(self._entries)
+            characters = sum(len(e["text"]) for e in self._entries.values())
+        return {
+            "enabled": self.enabled,
+            "stored": stored,
+            "stored_characters": characters,
+            "ttl": self.ttl,
+            **self.counts
+        }
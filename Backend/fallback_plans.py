@@ -0,0 +1,304 @@
+"""Fallback itineraries and budgets built from the destination cost table.
+
+Fallbacks are served exactly when the model is overloaded or down, so
+they must be cheap and specific enough that users do not retry. Both are
+derived from ``data/destinations.json`` (see knowledge.py):
+
+- budgets are priced from a cost table with one row per destination:
+  stay and meals per budget tier, local transport, activities, and the
+  round-trip fare range parsed from the ``arrival`` text. Stay and fares
+  are scaled up in the destination's best months and down outside them
+  when the trip has a start date. Destinations missing from the file use
+  the median row of the known domestic or international destinations.
+  Each line item is described by the matching destination note, e.g.
+  the ``local_transport`` summary for the Local Transport line;
+- itineraries walk the destination's attractions, ranked by the trip's
+  interests, two per day with a local dish each evening.
+
+``CostTable.estimate`` prices a whole list of trips in one numpy pass,
+so batch callers can price many requests at once; a single request
+takes a few tens of microseconds.
+"""
+import logging
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from knowledge import TIERS, get_knowledge_base
+from trip_parser import parse_amounts
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_PEAK_FACTOR = float(os.environ.get("FALLBACK_PEAK_FACTOR", "1.2"))
+FALLBACK_OFF_PEAK_FACTOR = float(os.environ.get("FALLBACK_OFF_PEAK_FACTOR", "0.85"))
+
+# The fallbacks assume a week for two when the request does not say
+DEFAULT_DURATION = 7
+DEFAULT_TRAVELERS = 2
+DEFAULT_TIER = "mid"
+TIER_LABELS = {"budget": "budget", "mid": "mid-range", "luxury": "luxury"}
+
+# Cost table columns: stay and meals per tier, local transport, activities, fare low/mid/high
+STAY, MEALS, LOCAL_TRANSPORT, ACTIVITIES, FARE = 0, 3, 6, 7, 8
+COLUMNS = 11
+# Used only when no destination of that currency is known (missing or empty knowledge file)
+BASELINE_PRICES = {
+    "₹": [1500, 4000, 11000, 500, 1200, 3000, 500, 800, 3000, 9000, 15000],
+    "$": [50, 150, 400, 15, 40, 120, 10, 35, 400, 800, 1200]
+}
+ROUNDING = {"₹": 100, "$": 10}
+COST_ITEMS = ("Travel to and from", "Accommodation", "Food & Meals", "Local Transport", "Activities & Entry Fees")
+# Ground transport is the cheap end of the fare range, flying the expensive end
+FARE_BY_TRANSPORT = {"bus": 0, "train": 0, "car": 0, "flight": 2}
+
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+MONTH_RANGE_PATTERN = re.compile(r"\b(" + "|".join(MONTHS) + r")[a-z]*(?:\s*-\s*(" + "|".join(MONTHS) + r")[a-z]*)?",
+                                 re.IGNORECASE)
+PEAK, UNKNOWN, OFF_PEAK = 1, 0, -1
+SEASON_FACTORS = np.array([FALLBACK_OFF_PEAK_FACTOR, 1.0, FALLBACK_PEAK_FACTOR])
+# Prices stay out of the budget's detail lines so that they do not parse as extra line items
+PRICE_NOTE = re.compile(r"\s*\([^)]*[₹$][^)]*\)")
+PRICE_TAIL = re.compile(r"[,\s]*(?:about|around)?\s*[₹$].*$")
+
+
+def _without_prices(text):
+    """First clause of a knowledge-base note, cut before any price"""
+    return PRICE_TAIL.sub("", PRICE_NOTE.sub("", text).split(";")[0]).strip()
+
+
+def season_codes(best_months):
+    """PEAK for each month inside a "Nov-Feb, Apr" style range list, OFF_PEAK for the rest"""
+    codes = np.full(12, OFF_PEAK, dtype=np.int8)
+    ranges = MONTH_RANGE_PATTERN.findall(best_months or "")
+    if not ranges:
+        codes[:] = UNKNOWN
+    for first, last in ranges:
+        start = MONTHS.index(first.lower())
+        end = MONTHS.index(last.lower()) if last else start
+        codes[(start + np.arange((end - start) % 12 + 1)) % 12] = PEAK
+    return codes
+
+
+class CostTable:
+    """Per-destination prices as one numpy matrix, plus a default row per currency"""
+
+    def __init__(self, knowledge):
+        self.knowledge = knowledge
+        entries = knowledge.entries()
+        self.names = [entry["name"] for entry in entries]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.defaults = {currency: len(entries) + i for i, currency in enumerate(BASELINE_PRICES)}
+        self.currencies = [entry["currency"] for entry in entries] + list(BASELINE_PRICES)
+
+        rows = len(self.currencies)
+        self.prices = np.full((rows, COLUMNS), np.nan)
+        self.seasons = np.zeros((rows, 12), dtype=np.int8)
+        for i, entry in enumerate(entries):
+            prices = entry["prices"]
+            self.prices[i, :FARE] = [*prices["stay"], *prices["meals"], prices["local_transport"], prices["activities"]]
+            fares = parse_amounts(entry.get("arrival", ""))
+            if fares:
+                low, high = fares[0]["amount"], fares[0].get("max", fares[0]["amount"])
+                self.prices[i, FARE:] = [low, (low + high) / 2, high]
+            self.seasons[i] = season_codes(entry.get("best_months"))
+
+        known = np.array(self.currencies[:len(entries)], dtype=object)
+        for currency, row in self.defaults.items():
+            self.prices[row] = BASELINE_PRICES[currency]
+            same = self.prices[:len(entries)][known == currency]
+            if len(same):
+                median = np.nanmedian(same, axis=0)
+                self.prices[row] = np.where(np.isnan(median), self.prices[row], median)
+        # Destinations without a parsable fare use their currency's default fares
+        for i in np.flatnonzero(np.isnan(self.prices[:, FARE])):
+            self.prices[i, FARE:] = self.prices[self.defaults.get(self.currencies[i], self.defaults["₹"]), FARE:]
+        self.steps = np.array([ROUNDING.get(c, 10) for c in self.currencies], dtype=float)
+
+    def __len__(self):
+        return len(self.index)
+
+    def row(self, trip):
+        """Cost table row for a trip: its destination's, else the domestic or international default"""
+        name = self.knowledge.find(trip)
+        if name is not None:
+            return self.index[name]
+        return self.defaults["$" if trip.international else "₹"]
+
+    def estimate(self, trips):
+        """Price every trip at once: (rows, season codes, costs) with costs shaped (trips, COST_ITEMS)"""
+        count = len(trips)
+        rows = np.fromiter((self.row(t) for t in trips), np.intp, count)
+        tiers = np.fromiter((TIERS.index(t.budget_tier if t.budget_tier in TIERS else DEFAULT_TIER) for t in trips),
+                            np.intp, count)
+        fares = np.fromiter((FARE_BY_TRANSPORT.get(t.transport, tier) for t, tier in zip(trips, tiers)),
+                            np.intp, count)
+        months = np.fromiter((int(t.start_date[5:7]) - 1 if t.start_date else -1 for t in trips), np.intp, count)
+        days = np.fromiter((t.duration or DEFAULT_DURATION for t in trips), float, count)
+        travelers = np.fromiter((t.travelers or DEFAULT_TRAVELERS for t in trips), float, count)
+
+        seasons = np.where(months >= 0, self.seasons[rows, np.maximum(months, 0)], UNKNOWN)
+        factor = SEASON_FACTORS[seasons + 1]
+        prices = self.prices[rows]
+        each = np.arange(count)
+        costs = np.column_stack([
+            prices[each, FARE + fares] * travelers * factor,
+            prices[each, STAY + tiers] * np.maximum(days - 1, 1) * np.ceil(travelers / 2) * factor,
+            prices[each, MEALS + tiers] * days * travelers,
+            prices[:, LOCAL_TRANSPORT] * days * np.ceil(travelers / 4),
+            prices[:, ACTIVITIES] * days * travelers
+        ])
+        steps = self.steps[rows][:, None]
+        return rows, seasons, (np.round(costs / steps) * steps).astype(np.int64)
+
+
+_cost_table = None
+
+
+def get_cost_table():
+    """Return the process-wide CostTable, building it on first use"""
+    global _cost_table
+    if _cost_table is None:
+        _cost_table = CostTable(get_knowledge_base())
+        logger.info(f"Fallback cost table: {len(_cost_table)} destinations")
+    return _cost_table
+
+
+def _budget_text(table, trip, row, season, costs):
+    duration = trip.duration or DEFAULT_DURATION
+    travelers = trip.travelers or DEFAULT_TRAVELERS
+    tier = trip.budget_tier if trip.budget_tier in TIERS else DEFAULT_TIER
+    currency = table.currencies[row]
+    name = table.names[row] if row < len(table.names) else None
+    entry = table.knowledge.entry(name) if name else None
+    place = name or trip.destination or "your destination"
+    rooms = -(-travelers // 2)
+    nights = max(duration - 1, 1)
+    when = {PEAK: ", peak season", OFF_PEAK: ", off season"}.get(int(season), "")
+
+    if entry:
+        details = [
+            _without_prices(entry["arrival"]) or "Round trip",
+            f"{TIER_LABELS[tier].capitalize()} stays, {nights} night{'s' * (nights > 1)}, "
+            f"{rooms} room{'s' * (rooms > 1)}",
+            f"Local favourites: {', '.join(entry['food'][:3])}",
+            entry.get("local_transport") or "Local cabs and buses",
+            ", ".join(s["name"] for s in table.knowledge.ranked_sights(entry, trip.interests) if s["fee"])
+            or "Most sights are free to visit"
+        ]
+    else:
+        details = ["Round trip flights/transport",
+                   f"{TIER_LABELS[tier].capitalize()} hotels/stays, {nights} night{'s' * (nights > 1)}",
+                   "Local restaurants and dining", "Cabs, buses and day passes", "Attractions and tours"]
+
+    lines = [f"Estimated Budget for {place} ({duration} day{'s' * (duration != 1)}, {travelers} "
+             f"traveler{'s' * (travelers != 1)}, {TIER_LABELS[tier]}{when}):", ""]
+    for label, amount, detail in zip(COST_ITEMS, costs, details):
+        if label == COST_ITEMS[0]:
+            label = f"Travel to and from {place}"
+        lines += [f"**{label}**: {currency}{int(amount):,}", f"- {detail}", ""]
+    lines.append(f"**Total Estimated Cost**: {currency}{int(costs.sum()):,}")
+    lines.append("")
+    lines.append("*Note: Estimated from typical local prices while the AI planner is busy. Actual costs vary "
+                 "with dates, bookings and choices; please try again later for a detailed plan.*")
+    return "\n".join(lines) + "\n"
+
+
+def fallback_budgets(trips):
+    """Budget text for each trip, priced in a single pass over the cost table"""
+    table = get_cost_table()
+    rows, seasons, costs = table.estimate(trips)
+    return [_budget_text(table, trip, row, season, cost)
+            for trip, row, season, cost in zip(trips, rows, seasons, costs)]
+
+
+def fallback_budget(trip):
+    return fallback_budgets([trip])[0]
+
+
+def _day_plan(sights, foods, day):
+    """Morning and afternoon sights for one day, keeping both in the same area when possible"""
+    first = sights.pop(0)
+    second = next((s for s in sights if s["area"] == first["area"]), sights[0] if sights else None)
+    if second is not None:
+        sights.remove(second)
+    lines = [f"- Morning: {first['name']} ({first['area']})"]
+    if second is not None:
+        lines.append(f"- Afternoon: {second['name']} ({second['area']})")
+    lines.append(f"- Evening: Dinner with {foods[day % len(foods)]}" if foods
+                 else "- Evening: Local cuisine and leisure")
+    return first["name"], lines
+
+
+@lru_cache(maxsize=512)
+def _destination_itinerary(knowledge, name, interests, duration):
+    entry = knowledge.entry(name)
+    sights = list(knowledge.ranked_sights(entry, interests))
+    foods = entry["food"]
+    lines = [f"{duration}-day itinerary for {name} (best months: {entry['best_months']}):", ""]
+
+    if duration == 1:
+        _, plan = _day_plan(sights, foods, 0)
+        lines += ["Day 1: Highlights", *plan[:2], "- Evening: Departure and journey home", ""]
+    else:
+        lines += ["Day 1: Arrival",
+                  "- Morning: Arrive and check into accommodation"]
+        if sights:
+            sight = sights.pop(0)
+            lines.append(f"- Afternoon: {sight['name']} ({sight['area']})")
+        lines += [f"- Evening: Dinner with {foods[0]}" if foods else "- Evening: Welcome dinner and rest", ""]
+
+        day = 2
+        while day < duration and sights:
+            title, plan = _day_plan(sights, foods, day)
+            lines += [f"Day {day}: {title}", *plan, ""]
+            day += 1
+        if day < duration:
+            span = f"Day {day}" if day == duration - 1 else f"Days {day}-{duration - 1}"
+            lines += [f"{span}: Day trips, favourite spots again, shopping and relaxation", ""]
+        lines += [f"Day {duration}: Departure",
+                  "- Morning: Last souvenirs and a relaxed breakfast",
+                  "- Afternoon: Departure and journey home", ""]
+
+    lines.append("Tips:")
+    lines += [f"- {tip}" for tip in entry["tips"]]
+    lines.append(f"- Getting around: {entry['getting_around']}")
+    lines += ["", "Note: Built from local highlights while the AI planner is busy. Please try again later "
+                  "for a detailed, personalised plan."]
+    return "\n".join(lines)
+
+
+def _generic_itinerary(destination, duration):
+    fallback = f"""Basic {duration}-day itinerary for {destination}:
+
+Day 1: Arrival
+- Morning: Arrive and check into accommodation
+- Afternoon: Local orientation walk and nearby attractions
+- Evening: Welcome dinner and rest
+
+"""
+    for day in range(2, min(duration, 6)):
+        fallback += f"""Day {day}: Exploration
+- Morning: Visit major attractions in {destination}
+- Afternoon: Local experiences and cultural sites
+- Evening: Local cuisine and leisure time
+
+"""
+    if duration > 5:
+        fallback += f"""Days 6-{duration}: Extended exploration with day trips, shopping, and relaxation
+
+"""
+    fallback += ("Final Day: Departure and journey home\n\nNote: This is a basic structure. For detailed "
+                 "recommendations, please try again or consult local travel guides.")
+    return fallback
+
+
+def fallback_itinerary(trip):
+    """Itinerary from the destination's attractions, or a generic outline for unknown destinations"""
+    knowledge = get_knowledge_base()
+    duration = trip.duration or DEFAULT_DURATION
+    name = knowledge.find(trip)
+    if name is None or not knowledge.entry(name)["attractions"]:
+        return _generic_itinerary(trip.destination or "your destination", duration)
+    return _destination_itinerary(knowledge, name, trip.interests, duration)
@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.environ.get("HEALTH_CHECK_INTERVAL", "15"))
+HEALTH_CHECK_TIMEOUT = float(os.environ.get("HEALTH_CHECK_TIMEOUT", "2"))
+
+
+def normalize_model_name(name):
+    """Ollama lists untagged models as ``name:latest``"""
+    return name if ":" in name else f"{name}:latest"
+
+
+class ReadinessMonitor:
+    """Background poller that caches whether Ollama is up and has the model.
+
+    Only Ollama's metadata endpoint (``/api/tags``) is queried, so a probe
+    never schedules inference and stays fast while the model is busy
+    generating. Route handlers read the cached result together with its age.
+    """
+
+    def __init__(self, client_factory, model_name, interval=HEALTH_CHECK_INTERVAL,
+                 timeout=HEALTH_CHECK_TIMEOUT):
+        self.client_factory = client_factory
+        self.model_name = normalize_model_name(model_name)
+        self.interval = interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._status = None
+
+    def check_now(self):
+        """Query Ollama's model list once and store the result"""
+        started = time.time()
+        status = {
+            "ollama_connected": False,
+            "model_available": False,
+            "error": None
+        }
+        try:
+            response = self.client_factory().get("/api/tags", timeout=self.timeout)
+            if response.status_code == 200:
+                status["ollama_connected"] = True
+                models = {normalize_model_name(m.get("name", "")) for m in response.json().get("models", [])}
+                status["model_available"] = self.model_name in models
+                if not status["model_available"]:
+                    status["error"] = f"Model {self.model_name} is not pulled"
+            else:
+                status["error"] = f"Ollama responded with status: {response.status_code}"
+        except Exception as e:
+            status["error"] = str(e)
+
+        status["checked_at"] = time.time()
+        status["check_duration"] = round(status["checked_at"] - started, 3)
+
+        with self._lock:
+            previous = self._status
+            self._status = status
+
+        ready = status["model_available"]
+        if previous is None or previous["model_available"] != ready:
+            if ready:
+                logger.info(f" Ollama ready with {self.model_name}")
+            else:
+                logger.error(f" Ollama not ready: {status['error']}")
+        return status
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_now()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background poller once per process"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ollama-readiness", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """Return the cached status plus its age, checking synchronously only before the first poll"""
+        self.start()
+        with self._lock:
+            status = self._status
+        if status is None:
+            status = self.check_now()
+
+        age = time.time() - status["checked_at"]
+        stale = age > self.interval * 3
+        return {
+            **status,
+            "ready": status["model_available"] and not stale,
+            "stale": stale,
+            "age_seconds": round(age, 3)
+        }
@@ -0,0 +1,311 @@
+"""Durable asynchronous generation jobs.
+
+``POST /api/jobs`` stores the request in a SQLite queue and returns a job
+id straight away. Worker threads claim jobs in priority order and run the
+regular warehouse/cache/generation path. Each result is written back to
+the same row, so a finished generation survives the client going away, a
+proxy timeout, or a restart of this process.
+
+- Deduplication: a job whose generation key matches an unexpired queued,
+  running or finished job returns that job instead of adding a new one.
+  A higher priority on the duplicate raises the priority of the queued
+  original.
+- Leases: a claimed job is leased for ``JOB_LEASE_SECONDS``. If the
+  process dies mid-generation, the job is picked up again once the lease
+  lapses. The lapsed run counts as an attempt, so a job that keeps
+  crashing its worker is failed after ``JOB_MAX_ATTEMPTS``.
+- Retries: ``RetryJob`` (e.g. admission control is full) puts the job
+  back without using up an attempt. Other failures back off exponentially
+  until ``JOB_MAX_ATTEMPTS`` is reached, then the job stores its fallback
+  result and is marked failed.
+- Expiry: finished and failed jobs are deleted ``JOB_RESULT_TTL`` seconds
+  after they end.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_PATH = os.environ.get("JOB_QUEUE_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", os.environ.get("MAX_CONCURRENT_GENERATIONS", "2")))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", str(24 * 3600)))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1"))
+JOB_RETRY_BACKOFF = 5.0
+JOB_MAX_PRIORITY = 10
+
+JOB_FIELDS = ("id", "kind", "status", "priority", "attempts", "created_at", "started_at", "finished_at",
+              "expires_at", "result", "error")
+
+
+class RetryJob(Exception):
+    """Raised by a job handler to requeue the job without counting a failed attempt"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Job deferred: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """SQLite-backed priority queue of generation jobs plus the worker threads that drain it"""
+
+    def __init__(self, path=JOB_QUEUE_PATH, workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL,
+                 lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS, poll_interval=JOB_POLL_INTERVAL):
+        self.path = path
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._threads = []
+        self._stop = threading.Event()
+        self._handler = None
+        self._fallback = None
+        self._last_purge = 0.0
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.deferred = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                dedup_key TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                not_before REAL NOT NULL,
+                started_at REAL,
+                lease_until REAL,
+                finished_at REAL,
+                expires_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, priority DESC, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs(dedup_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_expiry ON jobs(expires_at)")
+
+    def configure(self, handler, fallback):
+        """Register handler(kind, request) -> result dict and fallback(kind, request) -> result dict"""
+        self._handler = handler
+        self._fallback = fallback
+
+    def _row(self, row):
+        job = dict(zip(JOB_FIELDS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, kind, request, dedup_key, priority=0):
+        """Queue a job, or return the live job with the same dedup key; returns (job, created)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status, priority FROM jobs WHERE dedup_key = ? AND status != 'failed' "
+                    "AND (expires_at IS NULL OR expires_at > ?) ORDER BY created_at DESC LIMIT 1",
+                    (dedup_key, now)
+                ).fetchone()
+                if row is not None:
+                    job_id, status, current = row
+                    if status == "queued" and priority > current:
+                        self._conn.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, job_id))
+                    created = False
+                else:
+                    job_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, kind, dedup_key, priority, status, request, created_at, not_before) "
+                        "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                        (job_id, kind, dedup_key, priority, json.dumps(request), now, now)
+                    )
+                    created = True
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if created:
+            self.submitted += 1
+            with self._wake:
+                self._wake.notify()
+        else:
+            self.deduplicated += 1
+        return self.get(job_id), created
+
+    def get(self, job_id):
+        """Job status and result, or None for unknown or expired ids"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        job = self._row(row)
+        if job["status"] == "queued":
+            job["queue_position"] = self.queue_position(job_id)
+        return job
+
+    def queue_position(self, job_id):
+        """Number of queued jobs that will be claimed before this one"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs j, jobs me WHERE me.id = ? AND j.status = 'queued' AND j.id != me.id "
+                "AND (j.priority > me.priority OR (j.priority = me.priority AND j.created_at < me.created_at))",
+                (job_id,)
+            ).fetchone()
+        return row[0]
+
+    def claim(self):
+        """Lease the next ready job (highest priority, oldest first); returns (id, kind, request, attempts) or None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, request, attempts, status FROM jobs "
+                    "WHERE (status = 'queued' AND not_before <= ?) OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY priority DESC, created_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is not None:
+                    # A lapsed lease means the worker running it died, which uses up that attempt
+                    attempts = row[3] + (row[4] == "running")
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, lease_until = ?, attempts = ? "
+                        "WHERE id = ?",
+                        (now, now + self.lease_seconds, attempts, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2]), attempts
+
+    def _finish(self, job_id, status, result=None, error=None, attempts=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, attempts = COALESCE(?, attempts), "
+                "finished_at = ?, lease_until = NULL, expires_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, attempts, now,
+                 now + self.result_ttl, job_id)
+            )
+
+    def _requeue(self, job_id, delay, error=None, attempts=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', not_before = ?, lease_until = NULL, error = ?, "
+                "attempts = COALESCE(?, attempts) WHERE id = ?",
+                (time.time() + delay, error, attempts, job_id)
+            )
+
+    def run_one(self):
+        """Claim and run one job; returns False when nothing was ready"""
+        claimed = self.claim()
+        if claimed is None:
+            return False
+        job_id, kind, request, attempts = claimed
+        if attempts >= self.max_attempts:
+            # Only reachable when the lease of its last attempt lapsed, so the job keeps killing workers
+            logger.error(f"Job {job_id} lease expired on all {attempts} attempts")
+            self.failed += 1
+            self._finish(job_id, "failed", result=self._fallback(kind, request), error="Lease expired",
+                         attempts=attempts)
+            return True
+        try:
+            result = self._handler(kind, request)
+        except RetryJob as e:
+            self.deferred += 1
+            self._requeue(job_id, e.retry_after, error=str(e))
+            return True
+        except Exception as e:
+            attempts += 1
+            if attempts < self.max_attempts:
+                logger.warning(f"Job {job_id} attempt {attempts} failed ({e}); retrying")
+                self._requeue(job_id, JOB_RETRY_BACKOFF * 2 ** (attempts - 1), error=str(e), attempts=attempts)
+                return True
+            logger.error(f"Job {job_id} failed after {attempts} attempts: {e}")
+            self.failed += 1
+            self._finish(job_id, "failed", result=self._fallback(kind, request), error=str(e), attempts=attempts)
+            return True
+        self.completed += 1
+        self._finish(job_id, "done", result=result, attempts=attempts + 1)
+        return True
+
+    def purge_expired(self):
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),)).rowcount
+        if deleted:
+            logger.info(f"Purged {deleted} expired job(s)")
+        return deleted
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if time.time() - self._last_purge > 60:
+                    self._last_purge = time.time()
+                    self.purge_expired()
+                if self.run_one():
+                    continue
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+            with self._wake:
+                self._wake.wait(self.poll_interval)
+
+    def start(self):
+        """Start the worker threads once per process"""
+        if self._handler is None:
+            return
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "workers": self.workers,
+            "running_workers": sum(t.is_alive() for t in self._threads),
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed_stored": counts.get("failed", 0),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "deferred": self.deferred
+        }
@@ -0,0 +1,168 @@
+"""Local destination knowledge used to ground generation prompts.
+
+``data/destinations.json`` holds compact, pre-summarized facts for each
+destination: top sights with interest tags and entry fees, typical
+prices per budget tier, food, getting around and tips. The file is
+indexed in memory by destination name and alias.
+
+The prompt builders request a fact block sized to a token budget. The
+model then fills in a short skeleton with grounded names and prices
+instead of writing everything from scratch.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_PATH = os.environ.get(
+    "KNOWLEDGE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "destinations.json")
+)
+
+# Rough English average for Llama-family tokenizers; only used for budgeting
+CHARS_PER_TOKEN = 4
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+DESTINATION_SEPARATORS = re.compile(r",|/|&|\band\b|\bfor\b|\bwith\b")
+TIERS = ("budget", "mid", "luxury")
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _money(currency, amount):
+    return f"{currency}{amount:,}"
+
+
+def _fit(lines, max_tokens):
+    """Keep lines in priority order while they fit in the token budget"""
+    kept = []
+    remaining = max_tokens * CHARS_PER_TOKEN
+    for line in lines:
+        if len(line) + 1 <= remaining:
+            kept.append(line)
+            remaining -= len(line) + 1
+    return "\n".join(kept)
+
+
+class KnowledgeBase:
+    """Destination facts indexed by name/alias, rendered as budgeted prompt blocks"""
+
+    def __init__(self, path=KNOWLEDGE_PATH):
+        self.path = path
+        self.version = ""
+        self._entries = {}
+        self._aliases = {}
+        self._max_alias_words = 1
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError as e:
+            logger.warning(f"No destination knowledge at {path} ({e}); prompts will not be grounded")
+            return
+        self.version = hashlib.sha256(raw).hexdigest()[:12]
+        for entry in json.loads(raw)["destinations"]:
+            self._entries[entry["name"]] = entry
+            for alias in [entry["name"], *entry.get("aliases", ())]:
+                words = tuple(WORD_PATTERN.findall(alias.lower()))
+                self._aliases.setdefault(words, entry["name"])
+                self._max_alias_words = max(self._max_alias_words, len(words))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _match_words(self, words):
+        """First alias found in a word sequence, longest alias first at each position"""
+        for i in range(len(words)):
+            for n in range(min(self._max_alias_words, len(words) - i), 0, -1):
+                name = self._aliases.get(tuple(words[i:i + n]))
+                if name:
+                    return name
+        return None
+
+    def entries(self):
+        """Every destination entry, in file order"""
+        return list(self._entries.values())
+
+    def entry(self, name):
+        return self._entries[name]
+
+    def find(self, trip):
+        """Name of the known destination a trip refers to, or None"""
+        if not self._entries:
+            return None
+        if trip.destination:
+            for part in DESTINATION_SEPARATORS.split(trip.destination.lower()):
+                name = self._aliases.get(tuple(WORD_PATTERN.findall(part)))
+                if name:
+                    return name
+        return self._match_words(WORD_PATTERN.findall(trip.prompt.lower()))
+
+    def itinerary_facts(self, trip, max_tokens):
+        """Sights (ranked by the trip's interests), food, transport and tips within max_tokens"""
+        name = self.find(trip)
+        return self._itinerary_block(name, tuple(trip.interests), max_tokens) if name and max_tokens > 0 else ""
+
+    def budget_facts(self, trip, max_tokens):
+        """Typical prices (narrowed to the trip's budget tier when known) within max_tokens"""
+        name = self.find(trip)
+        if not name or max_tokens <= 0:
+            return ""
+        return self._budget_block(name, tuple(trip.interests), trip.budget_tier, max_tokens)
+
+    def ranked_sights(self, entry, interests):
+        """Attractions ordered by how many of ``interests`` they match (stable for ties)"""
+        wanted = set(interests)
+        return sorted(entry["attractions"], key=lambda a: -len(wanted.intersection(a["tags"])))
+
+    @lru_cache(maxsize=512)
+    def _itinerary_block(self, name, interests, max_tokens):
+        entry = self._entries[name]
+        currency = entry["currency"]
+        lines = [f"Local facts for {name} (best months: {entry['best_months']}):"]
+        for sight in self.ranked_sights(entry, interests):
+            fee = _money(currency, sight["fee"]) if sight["fee"] else "free"
+            lines.append(f"- {sight['name']} ({sight['area']}; {fee})")
+        lines.append(f"- Food: {', '.join(entry['food'])}")
+        lines.append(f"- Getting around: {entry['getting_around']}")
+        lines.extend(f"- Tip: {tip}" for tip in entry["tips"])
+        return _fit(lines, max_tokens)
+
+    @lru_cache(maxsize=512)
+    def _budget_block(self, name, interests, tier, max_tokens):
+        entry = self._entries[name]
+        currency = entry["currency"]
+        prices = entry["prices"]
+
+        def tiered(values):
+            if tier in TIERS:
+                return _money(currency, values[TIERS.index(tier)])
+            return " / ".join(f"{t} {_money(currency, v)}" for t, v in zip(TIERS, values))
+
+        fees = ", ".join(f"{s['name']} {_money(currency, s['fee'])}"
+                         for s in self.ranked_sights(entry, interests) if s["fee"])
+        lines = [
+            f"Typical prices in {name}:",
+            f"- Stay per room per night: {tiered(prices['stay'])}",
+            f"- Food per person per day: {tiered(prices['meals'])}",
+            f"- Local transport per day: {_money(currency, prices['local_transport'])}; "
+            f"activities per person per day: {_money(currency, prices['activities'])}",
+            f"- Getting there: {entry['arrival']}",
+            f"- Entry fees: {fees}" if fees else ""
+        ]
+        return _fit([line for line in lines if line], max_tokens)
+
+
+_knowledge = None
+
+
+def get_knowledge_base():
+    """Return the process-wide KnowledgeBase, loading it on first use"""
+    global _knowledge
+    if _knowledge is None:
+        _knowledge = KnowledgeBase()
+        logger.info(f"Destination knowledge: {len(_knowledge)} destinations from {_knowledge.path}")
+    return _knowledge
@@ -0,0 +1,333 @@
+"""Minimal Prometheus text-format metrics for the TravelMate API.
+
+Counters, gauges and histograms with labels, plus scrape-time collectors
+for components that already keep their own counters (admission, cache,
+Ollama pool). No client library is required; ``render()`` produces the
+exposition format served at ``/metrics``.
+"""
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 180, 300)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150, 200)
+PROMPT_BUILD_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+SIMILARITY_BUCKETS = (0.3, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 0.98, 1.0)
+MODEL_LOAD_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+# A warm model reports a load_duration of milliseconds; anything above this was a real load
+COLD_START_LOAD_SECONDS = 0.5
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = ("le", "+Inf" if bound == float("inf") else repr(float(bound)))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, name, collector):
+        """Add (or replace) a scrape-time callback returning [(name, type, help, [(labels, value), ...]), ...]"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics):
+            samples = metric.samples()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        for collector in list(self._collectors.values()):
+            try:
+                families = collector()
+            except Exception:
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = Counter(
+    "travelmate_http_requests_total", "HTTP requests by route, method and status code",
+    ("route", "method", "status")
+)
+HTTP_LATENCY = Histogram(
+    "travelmate_http_request_duration_seconds",
+    "Time until the response headers were ready (streaming bodies continue afterwards)",
+    ("route",)
+)
+HTTP_IN_FLIGHT = Gauge("travelmate_http_requests_in_flight", "HTTP requests currently being handled")
+
+OLLAMA_REQUESTS = Counter(
+    "travelmate_ollama_requests_total", "Ollama generation calls by mode and outcome (success, timeout, cancelled, error)",
+    ("mode", "outcome")
+)
+OLLAMA_IN_FLIGHT = Gauge("travelmate_ollama_requests_in_flight", "Ollama generation calls currently running")
+OLLAMA_TTFT = Histogram(
+    "travelmate_ollama_time_to_first_token_seconds",
+    "Time to first token; measured for streams, load + prompt-eval time for blocking calls",
+    ("mode",)
+)
+OLLAMA_DURATION = Histogram(
+    "travelmate_ollama_generation_duration_seconds", "Wall-clock duration of Ollama generation calls", ("mode",)
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "travelmate_ollama_tokens_per_second", "Generation speed from Ollama eval_count / eval_duration", ("mode",),
+    buckets=TOKEN_RATE_BUCKETS
+)
+OLLAMA_TOKENS = Counter(
+    "travelmate_ollama_tokens_total", "Tokens processed by Ollama (prompt or generated)", ("type",)
+)
+FALLBACKS = Counter(
+    "travelmate_fallbacks_total", "Fallback responses served instead of a model generation", ("kind", "reason")
+)
+ADMISSION_WAIT = Histogram(
+    "travelmate_admission_wait_seconds", "Time admitted generations spent queued for a model slot"
+)
+PROMPT_BUILD_SECONDS = Histogram(
+    "travelmate_prompt_build_seconds", "Time spent building the model prompt from the user request",
+    buckets=PROMPT_BUILD_BUCKETS
+)
+
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    "travelmate_semantic_cache_lookups_total",
+    "Semantic cache lookups after an exact-cache miss, by outcome (hit, shadow_hit, miss)", ("outcome",)
+)
+SEMANTIC_CACHE_SIMILARITY = Histogram(
+    "travelmate_semantic_cache_similarity", "Cosine similarity of the closest eligible stored request",
+    buckets=SIMILARITY_BUCKETS
+)
+
+MODEL_COLD_STARTS = Counter(
+    "travelmate_model_cold_starts_total",
+    "Model loads by reason (startup, rewarm: done by the lifecycle manager; request: paid by a user generation)",
+    ("reason",)
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "travelmate_model_load_seconds", "Ollama load_duration of model loads", ("reason",), buckets=MODEL_LOAD_BUCKETS
+)
+
+GENERATION_PLANS = Counter(
+    "travelmate_generation_plans_total",
+    "Cache-missed generations sized by the SLO controller, by adjustment (none, num_predict, small_model)",
+    ("adjustment",)
+)
+GENERATION_PREDICTED_SECONDS = Histogram(
+    "travelmate_generation_predicted_seconds", "SLO controller's predicted latency for planned generations"
+)
+
+GENERATIONS_CANCELLED = Counter(
+    "travelmate_generations_cancelled_total",
+    "Generations abandoned by reason (disconnect, deadline) and stage (queued: left the admission queue; "
+    "generating: upstream Ollama call aborted)", ("reason", "stage")
+)
+PARTIAL_GENERATIONS = Counter(
+    "travelmate_partial_generations_total",
+    "Partial output of aborted generations by outcome (kept, resumed, discarded, expired)", ("outcome",)
+)
+
+
+def record_ollama_result(result, elapsed, mode, time_to_first_token=None):
+    """Record duration, time-to-first-token, token counters and model loads from an Ollama final response"""
+    OLLAMA_DURATION.observe(elapsed, mode=mode)
+
+    load_seconds = result.get("load_duration", 0) / 1e9
+    if load_seconds >= COLD_START_LOAD_SECONDS:
+        MODEL_COLD_STARTS.inc(reason="request")
+        MODEL_LOAD_SECONDS.observe(load_seconds, reason="request")
+
+    if time_to_first_token is None:
+        time_to_first_token = (result.get("load_duration", 0) + result.get("prompt_eval_duration", 0)) / 1e9
+    if time_to_first_token:
+        OLLAMA_TTFT.observe(time_to_first_token, mode=mode)
+
+    eval_count = result.get("eval_count", 0)
+    eval_duration = result.get("eval_duration", 0)
+    OLLAMA_TOKENS.inc(result.get("prompt_eval_count", 0), type="prompt")
+    OLLAMA_TOKENS.inc(eval_count, type="generated")
+    if eval_count and eval_duration:
+        OLLAMA_TOKENS_PER_SECOND.observe(eval_count / (eval_duration / 1e9), mode=mode)
+
+
+def component_collector(admission_stats, cache_stats, singleflight_stats, pool_stats):
+    """Scrape-time gauges/counters read from the stats() of admission, cache, coalescing and the Ollama pool"""
+    def collect():
+        admission = admission_stats()
+        cache = cache_stats()
+        flights = singleflight_stats()
+        pool = pool_stats()
+        backends = pool["backends"]
+        return [
+            ("travelmate_admission_queue_depth", "gauge", "Requests waiting for a generation slot",
+             [({}, admission["queue_depth"])]),
+            ("travelmate_admission_in_flight", "gauge", "Generations currently holding a slot",
+             [({}, admission["in_flight"])]),
+            ("travelmate_admission_admitted_total", "counter", "Generations admitted to the model server",
+             [({}, admission["admitted"])]),
+            ("travelmate_admission_rejected_total", "counter", "Generations rejected by admission control",
+             [({"reason": reason}, n) for reason, n in admission["rejected"].items()]),
+            ("travelmate_cache_hits_total", "counter", "Response cache hits", [({}, cache["hits"])]),
+            ("travelmate_cache_misses_total", "counter", "Response cache misses", [({}, cache["misses"])]),
+            ("travelmate_cache_entries", "gauge", "Entries in the response cache", [({}, cache["entries"])]),
+            ("travelmate_cache_bytes", "gauge", "Bytes held by the response cache", [({}, cache["bytes"])]),
+            ("travelmate_singleflight_coalesced_total", "counter", "Requests that joined an in-flight generation",
+             [({}, flights["coalesced"])]),
+            ("travelmate_ollama_backend_outstanding", "gauge", "Requests in progress per Ollama backend",
+             [({"backend": b["url"]}, b["outstanding"]) for b in backends]),
+            ("travelmate_ollama_backend_requests_total", "counter", "Requests routed to each Ollama backend",
+             [({"backend": b["url"]}, b["requests"]) for b in backends]),
+            ("travelmate_ollama_backend_failures_total", "counter", "Failed or timed-out requests per Ollama backend",
+             [({"backend": b["url"]}, b["failures"]) for b in backends]),
+            ("travelmate_ollama_backend_ejected", "gauge", "1 while a backend is ejected from rotation",
+             [({"backend": b["url"]}, int(b["ejected"])) for b in backends]),
+            ("travelmate_ollama_backend_latency_seconds", "gauge", "EWMA request latency per Ollama backend",
+             [({"backend": b["url"]}, b["ewma_latency_seconds"]) for b in backends if b["ewma_latency_seconds"] is not None])
+        ]
+    return collect
+
+
+def warehouse_collector(warehouse_stats):
+    """Scrape-time hit/miss counters and size of the precomputed plan warehouse"""
+    def collect():
+        stats = warehouse_stats()
+        if not stats["enabled"]:
+            return []
+        return [
+            ("travelmate_warehouse_hits_total", "counter", "Requests answered from precomputed plans",
+             [({}, stats["hits"])]),
+            ("travelmate_warehouse_misses_total", "counter", "Grid requests with no usable precomputed plan",
+             [({}, stats["misses"])]),
+            ("travelmate_warehouse_entries", "gauge", "Precomputed plans stored", [({}, stats["entries"])]),
+            ("travelmate_warehouse_due", "gauge", "Grid entries missing or past their refresh age",
+             [({}, stats["due"])]),
+            ("travelmate_warehouse_refreshed_total", "counter", "Plans generated by the warehouse refresher",
+             [({}, stats["refreshed"])])
+        ]
+    return collect
+
+
+def model_lifecycle_collector(lifecycle_stats):
+    """Scrape-time residency of the model on each Ollama backend"""
+    def collect():
+        stats = lifecycle_stats()
+        if not stats["enabled"]:
+            return []
+        return [
+            ("travelmate_model_resident", "gauge", "1 while the model is loaded on the backend",
+             [({"backend": b["url"]}, int(b["resident"])) for b in stats["backends"]]),
+            ("travelmate_model_warmups_total", "counter", "Preload requests sent by the lifecycle manager",
+             [({}, stats["warmups"])])
+        ]
+    return collect
+
+
+def render():
+    return REGISTRY.render()
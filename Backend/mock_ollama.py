@@ -0,0 +1,261 @@
+"""Stand-in Ollama server for load tests and benchmarks.
+
+Speaks enough of the Ollama HTTP API (``/api/tags``, ``/api/ps``,
+``/api/show`` and ``/api/generate``, streaming or not) for the TravelMate
+backend to run against it without a model. Token rate, load latency,
+GPU slots and failure injection are all configurable, so server-side
+changes can be measured in seconds instead of hours. With ``--load-time``
+the model starts unloaded: the first request (or an empty-prompt preload)
+pays the load, and ``/api/ps`` lists the model only after that.
+
+Usage:
+    python mock_ollama.py --port 11434 --tokens-per-second 40 --latency 0.3 --failure-rate 0.02
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+ITINERARY_TEXT = """Day {day}:
+- Morning: Breakfast near the hotel, then visit the old fort and market in {destination}
+- Afternoon: Local lunch and a guided walk through the heritage quarter (auto/taxi ₹300)
+- Evening: Sunset at the lake or beach, dinner at a popular restaurant ₹800
+"""
+
+BUDGET_TEXT = """1. Transportation (round trip): ₹{transport:,}
+2. Accommodation ({nights} nights): ₹{stay:,}
+3. Food & Dining: ₹{food:,}
+4. Activities & Entry Fees: ₹{activities:,}
+5. Local Transport: ₹{local:,}
+6. Miscellaneous: ₹{misc:,}
+Total: ₹{total:,}
+"""
+
+DURATION_PATTERN = re.compile(r'(\d+)[-\s]*day', re.IGNORECASE)
+DESTINATION_PATTERN = re.compile(r'trip to ([A-Z][\w ]+?)(?: for|\.|,|\n)|itinerary for ([A-Z][\w ]+?)(?:\.|,|\n)')
+
+
+class MockConfig:
+    """Behaviour knobs for the mock server; see the command-line flags for meaning"""
+
+    def __init__(self, model="llama3.2", tokens_per_second=30.0, latency=0.2, latency_jitter=0.5,
+                 failure_rate=0.0, hang_rate=0.0, drop_rate=0.0, slots=1, seed=None, load_time=0.0):
+        self.model = model
+        self.tokens_per_second = tokens_per_second
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.drop_rate = drop_rate
+        self.slots = threading.BoundedSemaphore(max(1, slots))
+        self.load_time = load_time
+        self.loaded = load_time <= 0
+        self._load_lock = threading.Lock()
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def roll(self):
+        with self._random_lock:
+            return self.random.random()
+
+    def ensure_loaded(self):
+        """Seconds spent loading the model for this request (0 once it is resident)"""
+        with self._load_lock:
+            if self.loaded:
+                return 0.0
+            time.sleep(self.load_time)
+            self.loaded = True
+            return self.load_time
+
+    def first_token_delay(self):
+        """Log-normal load/prompt-eval latency with the configured median"""
+        if self.latency <= 0:
+            return 0.0
+        with self._random_lock:
+            return self.latency * self.random.lognormvariate(0, self.latency_jitter)
+
+
+def canned_response(prompt):
+    """Plausible itinerary/budget text shaped like the prompt that asked for it"""
+    match = DURATION_PATTERN.search(prompt)
+    days = min(int(match.group(1)), 14) if match else 3
+    match = DESTINATION_PATTERN.search(prompt)
+    destination = (match.group(1) or match.group(2)).strip() if match else "the city"
+
+    base = 1500 * days
+    budget = {
+        "transport": 4000, "nights": max(days - 1, 1), "stay": 2500 * max(days - 1, 1),
+        "food": 1000 * days, "activities": 800 * days, "local": 500 * days, "misc": base // 5
+    }
+    budget["total"] = sum(v for k, v in budget.items() if k != "nights")
+
+    itinerary = "".join(ITINERARY_TEXT.format(day=d, destination=destination) for d in range(1, days + 1))
+    if "=== BUDGET ===" in prompt:
+        return f"=== ITINERARY ===\n{itinerary}\n=== BUDGET ===\n{BUDGET_TEXT.format(**budget)}"
+    if "budget breakdown" in prompt.lower():
+        return BUDGET_TEXT.format(**budget)
+    return itinerary
+
+
+def tokenize(text):
+    return re.findall(r'\S+\s*|\s+', text)
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = MockConfig()
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _json(self, obj, status=200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        model = {"name": f"{self.config.model}:latest", "model": f"{self.config.model}:latest", "size": 2019393189}
+        if self.path == "/api/tags":
+            return self._json({"models": [model]})
+        if self.path == "/api/ps":
+            return self._json({"models": [model] if self.config.loaded else []})
+        self._json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._json({"error": "invalid JSON"}, status=400)
+
+        if self.path == "/api/show":
+            return self._json({"details": {"family": "llama", "parameter_size": "3.2B"}, "model_info": {}})
+        if self.path != "/api/generate":
+            return self._json({"error": "not found"}, status=404)
+        self.generate(body)
+
+    def generate(self, body):
+        config = self.config
+        roll = config.roll()
+        if roll < config.failure_rate:
+            return self._json({"error": "injected failure"}, status=500)
+        if roll < config.failure_rate + config.hang_rate:
+            # Never answer; the client's read timeout decides what happens
+            time.sleep(3600)
+            return
+
+        if not body.get("prompt"):
+            # An empty prompt only loads the model, like Ollama's preload request
+            load = config.ensure_loaded()
+            return self._json({"model": body.get("model", config.model), "response": "", "done": True,
+                               "done_reason": "load", "load_duration": int(load * 1e9)})
+
+        tokens = tokenize(canned_response(body.get("prompt", "")))
+        num_predict = (body.get("options") or {}).get("num_predict")
+        if num_predict and num_predict > 0:
+            tokens = tokens[:num_predict]
+        drop_at = len(tokens) // 2 if config.roll() < config.drop_rate else None
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        with config.slots:
+            started = time.time()
+            load = config.ensure_loaded() + config.first_token_delay()
+            time.sleep(load)
+            stats = {
+                "model": body.get("model", config.model),
+                "done": True,
+                "total_duration": 0,
+                "load_duration": int(load * 1e9),
+                "prompt_eval_count": len(tokenize(body.get("prompt", ""))),
+                "prompt_eval_duration": 0,
+                "eval_count": len(tokens),
+                "eval_duration": int(len(tokens) * interval * 1e9)
+            }
+
+            if not body.get("stream", True):
+                time.sleep(len(tokens) * interval)
+                stats["total_duration"] = int((time.time() - started) * 1e9)
+                return self._json({**stats, "response": "".join(tokens)})
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for i, token in enumerate(tokens):
+                    if i == drop_at:
+                        # Cut the connection mid-stream without a terminating chunk
+                        self.close_connection = True
+                        return
+                    time.sleep(interval)
+                    self._chunk({"model": stats["model"], "response": token, "done": False})
+                stats["total_duration"] = int((time.time() - started) * 1e9)
+                self._chunk({**stats, "response": ""})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                logger.debug("Client went away mid-stream")
+
+
+def make_server(host="127.0.0.1", port=11434, config=None):
+    """Build (but do not start) a mock server; handy for running it on a thread"""
+    handler = type("ConfiguredMockOllamaHandler", (MockOllamaHandler,), {"config": config or MockConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama server for TravelMate load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="llama3.2")
+    parser.add_argument("--tokens-per-second", type=float, default=30.0,
+                        help="generation speed per request (0 = instant)")
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="median seconds before the first token (model load + prompt eval)")
+    parser.add_argument("--latency-jitter", type=float, default=0.5,
+                        help="sigma of the log-normal first-token latency; 0 = fixed")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that never answer")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="fraction of streams cut off halfway through")
+    parser.add_argument("--slots", type=int, default=1,
+                        help="generations served in parallel; others queue like on a single GPU")
+    parser.add_argument("--load-time", type=float, default=0.0,
+                        help="seconds the first request (or preload) spends loading the model; 0 = already loaded")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = MockConfig(
+        model=args.model, tokens_per_second=args.tokens_per_second, latency=args.latency,
+        latency_jitter=args.latency_jitter, failure_rate=args.failure_rate, hang_rate=args.hang_rate,
+        drop_rate=args.drop_rate, slots=args.slots, seed=args.seed, load_time=args.load_time
+    )
+    server = make_server(args.host, args.port, config)
+    logger.info(f"Mock Ollama listening on http://{args.host}:{args.port} "
+                f"({args.tokens_per_second} tok/s, {args.slots} slot(s), failure rate {args.failure_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Model residency management: preload, keep-alive and re-warm.
+
+By default Ollama unloads a model after five idle minutes. It also
+unloads on restart, and it reloads the runner whenever a request asks
+for a different ``num_ctx``. In each case the next user request pays the
+full model load, and those loads are the worst p99 outliers.
+
+``ModelLifecycle`` preloads the model on every backend in the pool, using
+the production context size. It then polls ``/api/ps``. When a backend
+has lost the model (restart, eviction, idle expiry), the manager loads it
+again before a user request has to. Every generation also sends
+``OLLAMA_KEEP_ALIVE``, so Ollama holds the model between requests even
+when the poller is off.
+
+Loads show up as ``travelmate_model_cold_starts_total``. The ``reason``
+label is ``startup`` or ``rewarm`` for loads done here, and ``request``
+when a user generation reported a load (see ``metrics.record_ollama_result``).
+"""
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from health import HEALTH_CHECK_TIMEOUT, normalize_model_name
+from metrics import COLD_START_LOAD_SECONDS, MODEL_COLD_STARTS, MODEL_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def parse_keep_alive(value):
+    """Ollama takes a duration string ("30m", "24h") or seconds as a number (negative: never unload)"""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+OLLAMA_KEEP_ALIVE = parse_keep_alive(os.environ.get("OLLAMA_KEEP_ALIVE", "30m"))
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "1") == "1"
+# Seconds between /api/ps residency checks; 0 preloads at startup only
+MODEL_RESIDENCY_INTERVAL = float(os.environ.get("MODEL_RESIDENCY_INTERVAL", "30"))
+MODEL_WARMUP_TIMEOUT = float(os.environ.get("MODEL_WARMUP_TIMEOUT", "300"))
+
+
+class ModelLifecycle:
+    """Background preloader that keeps the model resident on every Ollama backend"""
+
+    def __init__(self, pool_factory, model_name, num_ctx, keep_alive=OLLAMA_KEEP_ALIVE, enabled=MODEL_WARMUP,
+                 interval=MODEL_RESIDENCY_INTERVAL, timeout=MODEL_WARMUP_TIMEOUT):
+        self.pool_factory = pool_factory
+        self.model_name = normalize_model_name(model_name)
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        self.enabled = enabled
+        self.interval = interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._backends = {}
+
+        self.warmups = 0
+        self.loads = 0
+
+    def _state(self, backend):
+        with self._lock:
+            return self._backends.setdefault(backend.base_url, {
+                "resident": False,
+                "expires_at": None,
+                "last_load_seconds": None,
+                "last_warmed_at": None,
+                "error": None
+            })
+
+    def resident_model(self, backend):
+        """This model's /api/ps entry on a backend, or None when it is not loaded"""
+        response = backend.client.get("/api/ps", timeout=HEALTH_CHECK_TIMEOUT)
+        response.raise_for_status()
+        for model in response.json().get("models", []):
+            if normalize_model_name(model.get("name") or model.get("model", "")) == self.model_name:
+                return model
+        return None
+
+    def warm(self, backend, reason):
+        """Load the model on one backend with the production context size; returns the load time in seconds"""
+        payload = {
+            "model": self.model_name,
+            "prompt": "",
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": {"num_ctx": self.num_ctx}
+        }
+        started = time.time()
+        response = backend.client.post("/api/generate", payload, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        # Older servers omit timings for a bare load; the round trip is then the best estimate
+        load_seconds = result["load_duration"] / 1e9 if "load_duration" in result else time.time() - started
+
+        self.warmups += 1
+        state = self._state(backend)
+        state["last_load_seconds"] = round(load_seconds, 3)
+        state["last_warmed_at"] = time.time()
+        if load_seconds >= COLD_START_LOAD_SECONDS:
+            self.loads += 1
+            MODEL_COLD_STARTS.inc(reason=reason)
+            MODEL_LOAD_SECONDS.observe(load_seconds, reason=reason)
+            logger.info(f"Loaded {self.model_name} on {backend.base_url} ({reason}, {load_seconds:.1f}s, "
+                        f"num_ctx={self.num_ctx}, keep_alive={self.keep_alive})")
+        return load_seconds
+
+    def check_now(self, reason="rewarm"):
+        """Make sure every backend has the model loaded, warming the ones that do not"""
+        for backend in self.pool_factory().backends:
+            state = self._state(backend)
+            try:
+                model = self.resident_model(backend)
+                if model is None:
+                    if state["resident"]:
+                        logger.warning(f"{self.model_name} is no longer loaded on {backend.base_url}; re-warming")
+                    self.warm(backend, reason)
+                    model = self.resident_model(backend) or {}
+                state["resident"] = True
+                state["expires_at"] = model.get("expires_at")
+                state["error"] = None
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if state["error"] is None:
+                    logger.error(f"Model warm-up on {backend.base_url} failed: {e}")
+                state["resident"] = False
+                state["error"] = str(e)
+
+    def _run(self):
+        self.check_now(reason="startup")
+        while self.interval > 0 and not self._stop.wait(self.interval):
+            self.check_now()
+
+    def start(self):
+        """Start the preloader once per process"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-lifecycle", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            backends = [{"url": url, **state} for url, state in self._backends.items()]
+        return {
+            "enabled": self.enabled,
+            "model": self.model_name,
+            "num_ctx": self.num_ctx,
+            "keep_alive": self.keep_alive,
+            "interval": self.interval,
+            "warmups": self.warmups,
+            "loads": self.loads,
+            "backends": backends
+        }
@@ -0,0 +1,79 @@
+import logging
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+
+POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", "16"))
+CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "180"))
+CONNECT_RETRIES = int(os.environ.get("OLLAMA_CONNECT_RETRIES", "3"))
+RETRY_BACKOFF = float(os.environ.get("OLLAMA_RETRY_BACKOFF", "0.5"))
+
+
+class OllamaClient:
+    """Keep-alive, connection-pooled HTTP client for a single Ollama server.
+
+    One ``requests.Session`` is shared by every thread; its ``HTTPAdapter``
+    owns a bounded urllib3 pool, so concurrent generations reuse open sockets
+    instead of opening a new TCP connection per call. Only connection
+    failures are retried (with exponential backoff) because a POST that
+    reached the server may already be generating.
+    """
+
+    def __init__(self, base_url=OLLAMA_HOST, pool_size=POOL_SIZE,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=CONNECT_RETRIES, backoff_factor=RETRY_BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=0,
+            other=0,
+            allowed_methods=None,
+            backoff_factor=backoff_factor,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+            pool_block=True
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def timeout(self, read_timeout=None):
+        """Return a (connect, read) timeout tuple for requests"""
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def post(self, path, payload, timeout=None, stream=False):
+        return self.session.post(
+            self.url(path),
+            json=payload,
+            timeout=self.timeout(timeout),
+            stream=stream
+        )
+
+    def get(self, path, timeout=None):
+        return self.session.get(self.url(path), timeout=self.timeout(timeout))
+
+    def close(self):
+        self.session.close()
+
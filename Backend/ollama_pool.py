@@ -0,0 +1,223 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from ollama_client import OLLAMA_HOST, OllamaClient
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_HOSTS = [h.strip() for h in os.environ.get("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if h.strip()]
+ROUTING_STRATEGY = os.environ.get("OLLAMA_ROUTING", "least_outstanding")
+CACHE_AFFINITY = os.environ.get("OLLAMA_CACHE_AFFINITY", "0") == "1"
+EJECT_AFTER_FAILURES = int(os.environ.get("OLLAMA_EJECT_AFTER_FAILURES", "3"))
+EJECT_SECONDS = float(os.environ.get("OLLAMA_EJECT_SECONDS", "30"))
+
+
+class Backend:
+    """One Ollama server in the pool plus its passive health and load counters"""
+
+    def __init__(self, base_url, client=None):
+        self.base_url = base_url.rstrip("/")
+        self.client = client or OllamaClient(self.base_url)
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.probing = False
+        self.ewma_latency = None
+
+    def available(self, now):
+        return self.ejected_until <= now and not self.probing
+
+    def load_score(self):
+        latency = self.ewma_latency if self.ewma_latency is not None else 1.0
+        return (self.outstanding + 1) * latency
+
+    def stats(self, now):
+        return {
+            "url": self.base_url,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected": self.ejected_until > now,
+            "probing": self.probing,
+            "ejected_for_seconds": round(max(0.0, self.ejected_until - now), 1),
+            "ewma_latency_seconds": round(self.ewma_latency, 3) if self.ewma_latency is not None else None
+        }
+
+
+class OllamaPool:
+    """Client-side load balancer across several Ollama servers.
+
+    Routing is least-outstanding-requests by default, or latency-weighted
+    (``outstanding x EWMA latency``). With cache affinity on, a request key
+    is rendezvous-hashed onto the healthy backends, so repeats of a prompt
+    land on the same box. A backend that fails ``eject_after`` times in a
+    row is taken out of rotation for ``eject_seconds``. After that it gets
+    one trial request, and no other traffic until that request finishes;
+    success restores it and failure ejects it again.
+    """
+
+    def __init__(self, hosts=OLLAMA_HOSTS, strategy=ROUTING_STRATEGY, affinity=CACHE_AFFINITY,
+                 eject_after=EJECT_AFTER_FAILURES, eject_seconds=EJECT_SECONDS, backends=None):
+        self.backends = backends or [Backend(h) for h in hosts]
+        self.strategy = strategy
+        self.affinity = affinity
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+
+    def _candidates(self, now, exclude=()):
+        candidates = [b for b in self.backends if b.available(now) and b not in exclude]
+        if candidates:
+            return candidates
+        remaining = [b for b in self.backends if b not in exclude]
+        if not remaining:
+            return []
+        # Everything is ejected: try the backend that has been out the longest
+        return [min(remaining, key=lambda b: b.ejected_until)]
+
+    def _pick(self, candidates, affinity_key):
+        if affinity_key is not None and self.affinity:
+            return max(candidates, key=lambda b: hashlib.md5(f"{b.base_url}|{affinity_key}".encode()).digest())
+        if self.strategy == "latency":
+            return min(candidates, key=lambda b: b.load_score())
+        return min(candidates, key=lambda b: (b.outstanding, b.ewma_latency or 0.0))
+
+    def acquire(self, affinity_key=None, exclude=()):
+        """Choose a backend and count the request against it; pair with release()"""
+        with self._lock:
+            candidates = self._candidates(time.time(), exclude)
+            if not candidates:
+                return None
+            backend = self._pick(candidates, affinity_key)
+            if backend.ejected_until:
+                # Cooldown is over: this request is the single trial that decides whether it comes back
+                backend.probing = True
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend, latency=None, failed=False, timed_out=False):
+        with self._lock:
+            backend.outstanding -= 1
+            backend.probing = False
+            if failed or timed_out:
+                backend.failures += 1
+                backend.timeouts += int(timed_out)
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= self.eject_after:
+                    backend.ejected_until = time.time() + self.eject_seconds
+                    logger.warning(
+                        f"Ejecting Ollama backend {backend.base_url} for {self.eject_seconds:.0f}s "
+                        f"after {backend.consecutive_failures} consecutive failures"
+                    )
+                return
+            if backend.consecutive_failures or backend.ejected_until:
+                logger.info(f"Ollama backend {backend.base_url} recovered")
+            backend.consecutive_failures = 0
+            backend.ejected_until = 0.0
+            if latency is not None:
+                backend.ewma_latency = latency if backend.ewma_latency is None else 0.8 * backend.ewma_latency + 0.2 * latency
+
+    def post(self, path, payload, timeout=None, affinity_key=None):
+        """POST to the best backend, failing over to another one on connection errors"""
+        tried = []
+        while True:
+            backend = self.acquire(affinity_key, exclude=tried)
+            if backend is None:
+                raise requests.exceptions.ConnectionError("No Ollama backend reachable")
+            tried.append(backend)
+            start = time.time()
+            try:
+                response = backend.client.post(path, payload, timeout=timeout)
+            except requests.exceptions.Timeout:
+                self.release(backend, timed_out=True)
+                raise
+            except requests.exceptions.ConnectionError:
+                self.release(backend, failed=True)
+                if len(tried) < len(self.backends):
+                    logger.warning(f"Ollama backend {backend.base_url} unreachable, failing over")
+                    continue
+                raise
+            self.release(backend, time.time() - start, failed=response.status_code >= 500)
+            return response
+
+    @contextmanager
+    def stream(self, path, payload, timeout=None, affinity_key=None):
+        """Open a streaming POST; the backend counts as busy until the block exits"""
+        tried = []
+        while True:
+            backend = self.acquire(affinity_key, exclude=tried)
+            if backend is None:
+                raise requests.exceptions.ConnectionError("No Ollama backend reachable")
+            tried.append(backend)
+            start = time.time()
+            try:
+                response = backend.client.post(path, payload, timeout=timeout, stream=True)
+                break
+            except requests.exceptions.Timeout:
+                self.release(backend, timed_out=True)
+                raise
+            except requests.exceptions.ConnectionError:
+                self.release(backend, failed=True)
+                if len(tried) < len(self.backends):
+                    logger.warning(f"Ollama backend {backend.base_url} unreachable, failing over")
+                    continue
+                raise
+
+        outcome = {"failed": response.status_code >= 500, "timed_out": False}
+        try:
+            with response:
+                yield response
+        except requests.exceptions.Timeout:
+            outcome["timed_out"] = True
+            raise
+        except requests.exceptions.ConnectionError:
+            outcome["failed"] = True
+            raise
+        finally:
+            self.release(backend, time.time() - start, **outcome)
+
+    def get(self, path, timeout=None):
+        """GET from the first healthy backend that answers (used for metadata endpoints)"""
+        last_error = None
+        for backend in self._candidates(time.time()):
+            try:
+                return backend.client.get(path, timeout=timeout)
+            except requests.exceptions.RequestException as e:
+                last_error = e
+        raise last_error or requests.exceptions.ConnectionError("No Ollama backend reachable")
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "affinity": self.affinity,
+                "backends": [b.stats(now) for b in self.backends]
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ollama_pool():
+    """Return the process-wide shared OllamaPool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OllamaPool()
+                logger.info(f"Ollama pool: {len(_pool.backends)} backend(s), {_pool.strategy} routing, affinity={_pool.affinity}")
+    return _pool
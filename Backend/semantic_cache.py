@@ -0,0 +1,204 @@
+"""Semantic response cache for near-duplicate trip requests.
+
+The exact-match cache misses requests like "3-day trip visiting Goa,
+beaches" vs "3-day Goa trip for beaches". This stage runs after an exact
+miss. It embeds the request's content words (stopwords and numbers
+dropped, order ignored) and looks for the closest stored generation in a
+local ``VectorStore``.
+
+A hit requires the same prompt template/options namespace and an exact
+match on duration, travelers and the structured preferences (budget
+tier, travel season of the start date, transport, accommodation and
+meals), since those change the answer. Each side's parsed destination must
+appear in the other's words, since free-form prompts do not always yield
+a destination. Its cosine similarity must also reach
+``SEMANTIC_CACHE_THRESHOLD``.
+
+``SEMANTIC_CACHE_MODE``:
+    serve   return hits instead of generating
+    shadow  count would-be hits (metrics, stats, logs) but always generate
+    off     no lookups and no writes
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from cache import CACHE_TTL
+from metrics import SEMANTIC_CACHE_LOOKUPS, SEMANTIC_CACHE_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_MODE = os.environ.get("SEMANTIC_CACHE_MODE", "serve")
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_PATH = os.environ.get("SEMANTIC_CACHE_PATH", os.path.join("vector_store", "semantic_cache"))
+SEMANTIC_CACHE_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", str(CACHE_TTL)))
+SEMANTIC_CACHE_CANDIDATES = 5
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+MATCH_FIELDS = ("namespace", "duration", "travelers", "preferences")
+# Start dates only need to agree on the season, which is what changes prices and plans
+SEASONS = {12: "winter", 1: "winter", 2: "winter", 3: "summer", 4: "summer", 5: "summer", 6: "monsoon",
+           7: "monsoon", 8: "monsoon", 9: "monsoon", 10: "autumn", 11: "autumn"}
+
+# Words that every trip prompt shares (or that only restate the exactly-matched fields)
+STOPWORDS = frozenset("""
+a about an and are at be can day days for from give i in include including is it me my need of on our
+please plan planning s some the their this to traveler travelers travelling trip us visit visiting want we
+with would
+""".split())
+
+
+def content_words(text):
+    return {w for w in WORD_PATTERN.findall(text.lower()) if w not in STOPWORDS and not w.isdigit()}
+
+
+def preference_key(trip):
+    """Structured preferences a near-duplicate must share exactly, as one string"""
+    season = SEASONS[int(trip.start_date[5:7])] if trip.start_date else ""
+    return "|".join([trip.budget_tier or "", season, trip.transport or "", trip.accommodation or "",
+                     ",".join(trip.meals)])
+
+
+def entry_id(fields, text):
+    """Id of the entry stored for ``text`` under the exact-match ``fields``"""
+    return hashlib.sha1("|".join([*(str(v) for v in fields.values()), text]).encode()).hexdigest()
+
+
+def normalize_request(trip):
+    """Sorted, de-duplicated content words of the prompt; the text that gets embedded"""
+    return " ".join(sorted(content_words(trip.prompt)))
+
+
+class SemanticCache:
+    """Nearest-neighbour lookup of past generations, gated by exact trip fields and a similarity threshold"""
+
+    def __init__(self, path=SEMANTIC_CACHE_PATH, mode=SEMANTIC_CACHE_MODE, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 ttl=SEMANTIC_CACHE_TTL):
+        self.path = path
+        self.mode = mode
+        self.threshold = threshold
+        self.ttl = ttl
+        self._store = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.shadow_hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    @property
+    def enabled(self):
+        return self.mode in ("serve", "shadow")
+
+    def store(self):
+        """The backing VectorStore, opened on first use"""
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    from vector_store import HashingEmbedder, VECTOR_DIM, VectorStore
+                    self._store = VectorStore(self.path, embedder=HashingEmbedder(VECTOR_DIM, bigrams=False),
+                                              fields=MATCH_FIELDS)
+        return self._store
+
+    def _fields(self, namespace, trip):
+        return {"namespace": namespace, "duration": trip.duration, "travelers": trip.travelers,
+                "preferences": preference_key(trip)}
+
+    def _verified(self, candidate, fields, text):
+        """Similarity recomputed from the stored entry, or None when the entry is not for these fields.
+
+        Guards against a vector row and its stored entry disagreeing, so a hit can never serve
+        another request's plan.
+        """
+        metadata = candidate["metadata"]
+        if any(metadata.get(name) != value for name, value in fields.items()):
+            return None
+        if candidate["id"] != entry_id(fields, candidate["content"]):
+            return None
+        query, stored = self.store().embedder.embed([text, candidate["content"]])
+        return float(query @ stored)
+
+    def lookup(self, namespace, trip):
+        """Stored response text for a near-duplicate request, or None (always None in shadow mode)"""
+        if not self.enabled:
+            return None
+        text = normalize_request(trip)
+        fields = self._fields(namespace, trip)
+        match = None
+        best = None
+        try:
+            candidates = self.store().search(text, limit=SEMANTIC_CACHE_CANDIDATES, where=fields) if text else []
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {e}")
+            candidates = []
+        words = set(text.split())
+        destination = content_words(trip.destination or "")
+        for candidate in candidates:
+            if time.time() - candidate["metadata"]["created_at"] > self.ttl:
+                continue
+            if not (set(candidate["metadata"]["destination_words"]) <= words
+                    and destination <= set(candidate["content"].split())):
+                continue
+            score = self._verified(candidate, fields, text)
+            if score is None:
+                logger.warning(f"Semantic cache entry {candidate['id']} does not match its vector row; skipped")
+                continue
+            best = {**candidate, "relevance_score": score}
+            if score >= self.threshold:
+                match = best
+            break
+        if best is not None:
+            SEMANTIC_CACHE_SIMILARITY.observe(best["relevance_score"])
+
+        if match is None:
+            self.misses += 1
+            SEMANTIC_CACHE_LOOKUPS.inc(outcome="miss")
+            return None
+        if self.mode == "shadow":
+            self.shadow_hits += 1
+            SEMANTIC_CACHE_LOOKUPS.inc(outcome="shadow_hit")
+            logger.info(f"Semantic cache shadow hit ({match['relevance_score']:.3f}): "
+                        f"{trip.prompt[:60]!r} ~ {match['metadata']['prompt'][:60]!r}")
+            return None
+        self.hits += 1
+        SEMANTIC_CACHE_LOOKUPS.inc(outcome="hit")
+        return match["metadata"]["response"]
+
+    def remember(self, namespace, trip, response):
+        """Store a successful generation under its normalized request"""
+        if not self.enabled:
+            return
+        text = normalize_request(trip)
+        if not text:
+            return
+        fields = self._fields(namespace, trip)
+        doc_id = entry_id(fields, text)
+        try:
+            self.store().add([text], [{
+                **fields,
+                "destination_words": sorted(content_words(trip.destination or "")),
+                "prompt": trip.prompt[:500],
+                "response": response,
+                "created_at": time.time()
+            }], ids=[doc_id])
+            self.stored += 1
+        except Exception as e:
+            logger.error(f"Semantic cache store failed: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.shadow_hits + self.misses
+        stats = {
+            "mode": self.mode,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "shadow_hits": self.shadow_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shadow_hits) / lookups, 4) if lookups else None,
+            "stored": self.stored
+        }
+        if self._store is not None:
+            stats["entries"] = self._store.count
+        return stats
@@ -0,0 +1,179 @@
+import logging
+import threading
+
+from cancellation import CancelToken
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """One in-flight generation shared by every request with the same key.
+
+    Blocking callers wait for ``result``; streaming callers subscribe and
+    receive every frame published so far followed by the live tail. A
+    subscriber counts from the moment it is handed out, whether or not it
+    has started reading. When the last one goes away before the flight is
+    done, ``cancel`` fires so the producer can abort the upstream generation.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.frames = []
+        self.done = False
+        self.result = None
+        self.error = None
+        self.followers = 0
+        self.subscribers = 0
+        self.cancel = CancelToken()
+        self._cond = threading.Condition()
+
+    def publish(self, frame):
+        with self._cond:
+            self.frames.append(frame)
+            self._cond.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self._cond:
+            self.result = result
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def wait(self):
+        with self._cond:
+            while not self.done:
+                self._cond.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def subscribe(self):
+        """A Subscription to buffered and future frames, counted until it is closed or exhausted"""
+        with self._cond:
+            self.subscribers += 1
+        return Subscription(self)
+
+    def _unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+            abandoned = self.subscribers == 0 and not self.done
+        if abandoned:
+            logger.info(f"Last client left stream {self.key[:12]}; cancelling it")
+            self.cancel.cancel("disconnect")
+
+
+class Subscription:
+    """Iterator over one subscriber's frames of a Flight, until the flight ends.
+
+    ``close`` (called by the WSGI server when the client goes away, or on
+    garbage collection for a subscriber that never started reading)
+    releases the subscriber.
+    """
+
+    def __init__(self, flight):
+        self.flight = flight
+        self.index = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        flight = self.flight
+        if not self.closed:
+            with flight._cond:
+                while self.index >= len(flight.frames) and not flight.done:
+                    flight._cond.wait()
+                if self.index < len(flight.frames):
+                    self.index += 1
+                    return flight.frames[self.index - 1]
+            self.close()
+        raise StopIteration
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flight._unsubscribe()
+
+    def __del__(self):
+        self.close()
+
+
+class SingleFlight:
+    """Coalesce concurrent identical generations into a single upstream call"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key, subscribe=False):
+        """(flight, leader, subscription); a streaming caller's subscription is counted under the lock"""
+        with self._lock:
+            flight = self._flights.get(key)
+            # A cancelled flight is only winding down; newcomers start a fresh one
+            if flight is not None and not flight.cancel.cancelled:
+                flight.followers += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = Flight(key)
+                self._flights[key] = flight
+                self.leaders += 1
+                leader = True
+            return flight, leader, flight.subscribe() if subscribe else None
+
+    def _leave(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def do(self, key, fn):
+        """Run ``fn`` once per key; concurrent callers share its result. Returns (result, shared)"""
+        flight, leader, _ = self._join(key)
+        if not leader:
+            logger.info(f"Joined in-flight generation {key[:12]} ({flight.followers} waiting)")
+            return flight.wait(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._leave(key, flight)
+            flight.finish(error=e)
+            raise
+        self._leave(key, flight)
+        flight.finish(result=result)
+        return result, False
+
+    def stream(self, key, producer):
+        """Attach to the frame stream for ``key``, starting ``producer`` if nobody else has.
+
+        The producer runs on its own thread so that one subscriber going away
+        does not stall the others. It is called with the flight's CancelToken,
+        which fires once every subscriber has gone. Returns (frame iterator, shared).
+        """
+        flight, leader, subscription = self._join(key, subscribe=True)
+        if leader:
+            threading.Thread(
+                target=self._pump, args=(key, flight, producer),
+                name=f"singleflight-{key[:12]}", daemon=True
+            ).start()
+        else:
+            logger.info(f"Attached to in-flight stream {key[:12]} ({flight.followers} attached)")
+        return subscription, not leader
+
+    def _pump(self, key, flight, producer):
+        try:
+            for frame in producer(flight.cancel):
+                flight.publish(frame)
+        except Exception as e:
+            logger.error(f"Shared stream {key[:12]} failed: {e}")
+        finally:
+            self._leave(key, flight)
+            flight.finish()
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._flights)
+        return {"in_flight": in_flight, "leaders": self.leaders, "coalesced": self.coalesced}
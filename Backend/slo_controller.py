@@ -0,0 +1,163 @@
+"""Per-request generation sizing against a latency SLO.
+
+With fixed options, a 2-day trip reserves as many tokens as a 14-day one,
+and full-length answers keep coming while requests queue behind them.
+``SLOController`` predicts how long a cache-missed generation will take
+before it starts:
+
+    queue wait + prompt tokens / prompt rate + num_predict / decode rate
+
+The rates are EWMAs of what Ollama reported for recent generations with
+the same model. Queue wait is estimated the same way as in
+``AdmissionController.estimated_wait``. When the prediction misses
+``GENERATION_SLO_SECONDS``, the controller:
+
+1. lowers ``num_predict``, but never below ``SLO_MIN_OUTPUT_FRACTION`` of
+   the sized budget, and drops ``num_ctx`` to the preloaded context when
+   the shorter request fits there;
+2. switches to ``SLO_SMALL_MODEL`` (if set) when even the shortest
+   answer would miss the SLO. That model is loaded on first use and then
+   kept by ``OLLAMA_KEEP_ALIVE``.
+
+The plan is a plain dict, returned with the response so every answer
+records how it was sized.
+"""
+import logging
+import os
+import threading
+
+from admission import EXPECTED_GENERATION_SECONDS
+from health import normalize_model_name
+from metrics import GENERATION_PLANS, GENERATION_PREDICTED_SECONDS
+
+logger = logging.getLogger(__name__)
+
+SLO_CONTROL = os.environ.get("SLO_CONTROL", "1") == "1"
+GENERATION_SLO_SECONDS = float(os.environ.get("GENERATION_SLO_SECONDS", "60"))
+SLO_SMALL_MODEL = os.environ.get("SLO_SMALL_MODEL", "")
+SLO_MIN_OUTPUT_FRACTION = float(os.environ.get("SLO_MIN_OUTPUT_FRACTION", "0.4"))
+# Shortened answers are cached only briefly so full-length ones return once load drops
+SLO_DEGRADED_CACHE_TTL = float(os.environ.get("SLO_DEGRADED_CACHE_TTL", "600"))
+
+# Priors used until a model has reported its own speed
+DEFAULT_DECODE_RATE = float(os.environ.get("SLO_DEFAULT_TOKENS_PER_SECOND", "20"))
+DEFAULT_PROMPT_RATE = 200.0
+SMALL_MODEL_SPEEDUP = 2.0
+MIN_NUM_PREDICT = 128
+EWMA_WEIGHT = 0.2
+
+
+def _ewma(previous, value):
+    return value if previous is None else (1 - EWMA_WEIGHT) * previous + EWMA_WEIGHT * value
+
+
+class SLOController:
+    """Chooses num_predict, num_ctx and model per generation from observed speed and queue depth"""
+
+    def __init__(self, model_name, slo=GENERATION_SLO_SECONDS, small_model=SLO_SMALL_MODEL, enabled=SLO_CONTROL,
+                 min_output_fraction=SLO_MIN_OUTPUT_FRACTION, expected_service_time=EXPECTED_GENERATION_SECONDS):
+        self.model_name = model_name
+        self.slo = slo
+        self.small_model = small_model
+        self.enabled = enabled
+        self.min_output_fraction = min_output_fraction
+        self.avg_service_time = expected_service_time
+        self._rates = {}
+        self._lock = threading.Lock()
+
+        self.plans = 0
+        self.adjusted = {"num_predict": 0, "small_model": 0}
+        self.over_slo = 0
+
+    def observe(self, result, elapsed, model=None):
+        """Fold one finished generation's Ollama timings into the per-model rate estimates"""
+        model = normalize_model_name(model or result.get("model") or self.model_name)
+        with self._lock:
+            rates = self._rates.setdefault(model, {"decode": None, "prompt": None})
+            if result.get("eval_count") and result.get("eval_duration"):
+                rates["decode"] = _ewma(rates["decode"], result["eval_count"] / (result["eval_duration"] / 1e9))
+            if result.get("prompt_eval_count") and result.get("prompt_eval_duration"):
+                rates["prompt"] = _ewma(rates["prompt"],
+                                        result["prompt_eval_count"] / (result["prompt_eval_duration"] / 1e9))
+            self.avg_service_time = _ewma(self.avg_service_time, elapsed)
+
+    def rates(self, model):
+        """(decode, prompt-eval) tokens per second for a model, falling back to priors"""
+        rates = self._rates.get(normalize_model_name(model), {})
+        decode = rates.get("decode")
+        if decode is None:
+            primary = self._rates.get(normalize_model_name(self.model_name), {}).get("decode") or DEFAULT_DECODE_RATE
+            decode = primary if model == self.model_name else primary * SMALL_MODEL_SPEEDUP
+        return decode, rates.get("prompt") or DEFAULT_PROMPT_RATE
+
+    def expected_wait(self, load):
+        """Seconds a new request should expect to queue, given an admission controller's counters"""
+        if load.in_flight < load.max_concurrent and load.queue_depth == 0:
+            return 0.0
+        return (load.queue_depth // load.max_concurrent + 1) * self.avg_service_time
+
+    def plan(self, options, prompt_tokens, load, resident_ctx=None):
+        """Sizing decision for one generation, or None when the controller is off"""
+        if not self.enabled:
+            return None
+        wait = self.expected_wait(load)
+        nominal = options["num_predict"]
+        floor = min(nominal, max(MIN_NUM_PREDICT, int(nominal * self.min_output_fraction)))
+
+        def affordable(model):
+            decode, prompt = self.rates(model)
+            return int((self.slo - wait - prompt_tokens / prompt) * decode), decode, prompt
+
+        model = self.model_name
+        budget, decode, prompt_rate = affordable(model)
+        num_predict = nominal
+        adjustment = None
+        if budget < nominal:
+            adjustment = "num_predict"
+            num_predict = max(floor, budget)
+            if budget < floor and self.small_model:
+                model = self.small_model
+                budget, decode, prompt_rate = affordable(model)
+                num_predict = min(nominal, max(floor, budget))
+                adjustment = "small_model"
+
+        num_ctx = options["num_ctx"]
+        if adjustment and resident_ctx and num_ctx > resident_ctx and prompt_tokens + num_predict <= resident_ctx:
+            num_ctx = resident_ctx
+
+        predicted = wait + prompt_tokens / prompt_rate + num_predict / decode
+        self.plans += 1
+        if adjustment:
+            self.adjusted[adjustment] += 1
+        if predicted > self.slo:
+            self.over_slo += 1
+        GENERATION_PLANS.inc(adjustment=adjustment or "none")
+        GENERATION_PREDICTED_SECONDS.observe(predicted)
+        if adjustment:
+            logger.info(f"SLO plan: {adjustment} -> {model}, num_predict {nominal} -> {num_predict}, "
+                        f"num_ctx {num_ctx}, predicted {predicted:.1f}s (wait {wait:.1f}s)")
+        return {
+            "model": model,
+            "num_predict": num_predict,
+            "num_ctx": num_ctx,
+            "adjustment": adjustment,
+            "slo_seconds": self.slo,
+            "predicted_seconds": round(predicted, 2),
+            "queue_wait_seconds": round(wait, 2),
+            "tokens_per_second": round(decode, 1)
+        }
+
+    def stats(self):
+        with self._lock:
+            rates = {model: {k: round(v, 1) if v is not None else None for k, v in r.items()}
+                     for model, r in self._rates.items()}
+        return {
+            "enabled": self.enabled,
+            "slo_seconds": self.slo,
+            "small_model": self.small_model or None,
+            "plans": self.plans,
+            "adjusted": dict(self.adjusted),
+            "over_slo": self.over_slo,
+            "avg_service_seconds": round(self.avg_service_time, 2),
+            "tokens_per_second": rates
+        }
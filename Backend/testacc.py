@@ -1,8 +1,30 @@
-import requests
+"""Accuracy evaluation for the TravelMate API.
+
+Cases come from a JSONL (or YAML) corpus and are evaluated concurrently.
+Each case gets an itinerary score (keywords + structure) and a budget
+score (total within the expected range). Every finished case is appended
+to the run's checkpoint, so an interrupted run continues with ``--resume``.
+Each run's summary is appended to a history file, and the report lists
+regressions against the previous run (or ``--baseline``).
+
+    python testacc.py --cases eval_cases.jsonl --workers 8
+    python testacc.py --resume 20260101-120000
+"""
+import argparse
+import hashlib
 import json
+import os
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
 
 API_URL = "http://localhost:5000"
+EVAL_DIR = "eval_runs"
+HISTORY_FILE = "history.jsonl"
+REGRESSION_THRESHOLD = 10.0
 
 INDIAN_TEST_CASES = [
     {
@@ -31,134 +53,260 @@ INDIAN_TEST_CASES = [
     }
 ]
 
-def test_itinerary_accuracy(test_case):
-    print(f"\n{'='*60}")
-    print(f"Testing: {test_case['destination']}")
-    print(f"{'='*60}")
-    
+PRICE_PATTERN = re.compile(r'₹\s*(\d+[,\d]*)')
+TOTAL_PATTERN = re.compile(r'total[^\n₹]*₹\s*(\d+[,\d]*)', re.IGNORECASE)
+DURATION_PATTERN = re.compile(r'(\d+)[-\s]*day', re.IGNORECASE)
+
+TIME_SLOTS = ["morning", "afternoon", "evening"]
+FOOD_WORDS = ["food", "cuisine", "restaurant", "eat", "lunch", "dinner"]
+TRANSPORT_WORDS = ["taxi", "bus", "auto", "train", "walk", "cab"]
+
+_print_lock = threading.Lock()
+
+
+def log(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def case_id(test_case):
+    """Stable id for a case: its ``id`` field, else a hash of destination + prompt"""
+    if test_case.get("id"):
+        return str(test_case["id"])
+    digest = hashlib.sha1(f"{test_case['destination']}|{test_case['prompt']}".encode()).hexdigest()[:10]
+    return f"{test_case['destination'].lower().replace(' ', '-')}-{digest}"
+
+
+def load_cases(path=None):
+    """Read cases from a .jsonl or .yaml file; the built-in Indian cases when no path is given"""
+    if not path:
+        cases = [dict(c) for c in INDIAN_TEST_CASES]
+    elif path.endswith((".yaml", ".yml")):
+        import yaml  # optional: only needed for YAML corpora
+        with open(path, encoding="utf-8") as f:
+            cases = yaml.safe_load(f) or []
+    else:
+        with open(path, encoding="utf-8") as f:
+            cases = [json.loads(line) for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+    for case in cases:
+        case["id"] = case_id(case)
+        if "expected_budget_range" in case:
+            case["expected_budget_range"] = tuple(case["expected_budget_range"])
+        if "duration" not in case:
+            match = DURATION_PATTERN.search(case["prompt"])
+            case["duration"] = int(match.group(1)) if match else 2
+    return cases
+
+
+def score_itinerary(generated_text, test_case, structured=None):
+    """Keyword coverage (60%) plus day/time-slot/food/transport structure (40%).
+
+    Day and time-slot structure come from the API's parsed form when it is returned.
+    """
+    text = generated_text.lower()
+    found_keywords = [k for k in test_case['expected_keywords'] if k.lower() in text]
+    missing_keywords = [k for k in test_case['expected_keywords'] if k.lower() not in text]
+    keyword_accuracy = (len(found_keywords) / len(test_case['expected_keywords'])) * 100 if test_case['expected_keywords'] else 100.0
+
+    duration = test_case.get("duration", 2)
+    if structured and structured.get("days"):
+        covered = set()
+        for day in structured["days"]:
+            covered.update(range(day["day"], day.get("last_day", day["day"]) + 1))
+        has_day_structure = all(n in covered for n in range(1, duration + 1))
+        has_time_slots = any(slot["slot"] in TIME_SLOTS for day in structured["days"] for slot in day["slots"])
+    else:
+        has_day_structure = all(f"day {n}" in text for n in range(1, duration + 1))
+        has_time_slots = any(slot in text for slot in TIME_SLOTS)
+    has_food_mention = any(word in text for word in FOOD_WORDS)
+    has_transport = any(word in text for word in TRANSPORT_WORDS)
+
+    structure_score = sum([has_day_structure, has_time_slots, has_food_mention, has_transport]) / 4 * 100
+    overall_accuracy = (keyword_accuracy * 0.6) + (structure_score * 0.4)
+
+    return {
+        "keyword_accuracy": round(keyword_accuracy, 1),
+        "structure_score": round(structure_score, 1),
+        "overall_accuracy": round(overall_accuracy, 1),
+        "found_keywords": found_keywords,
+        "missing_keywords": missing_keywords,
+        "response_length": len(text),
+        "has_proper_structure": has_day_structure
+    }
+
+
+def score_budget(generated_text, test_case, structured=None):
+    """Compare the stated total (or the largest amount) with the expected range"""
+    match = TOTAL_PATTERN.search(generated_text)
+    if structured and structured.get("total_stated"):
+        total_budget = structured["total"]
+    elif match:
+        total_budget = int(match.group(1).replace(',', ''))
+    else:
+        prices = [int(p.replace(',', '')) for p in PRICE_PATTERN.findall(generated_text) if p.replace(',', '')]
+        if not prices:
+            return None
+        total_budget = max(prices)
+
+    min_expected, max_expected = test_case['expected_budget_range']
+    if min_expected <= total_budget <= max_expected:
+        budget_accuracy = 100
+    elif total_budget < min_expected:
+        budget_accuracy = (total_budget / min_expected) * 100
+    else:
+        budget_accuracy = (max_expected / total_budget) * 100
+
+    return {
+        "budget_accuracy": round(budget_accuracy, 1),
+        "estimated_budget": total_budget,
+        "expected_range": list(test_case['expected_budget_range'])
+    }
+
+
+def post_prompt(session, endpoint, prompt, timeout):
+    response = session.post(f"{API_URL}{endpoint}", json={"prompt": prompt}, params={"structured": 1},
+                            timeout=timeout)
+    if response.status_code != 200:
+        raise RuntimeError(f"API returned {response.status_code}")
+    return response.json()
+
+
+def test_itinerary_accuracy(test_case, session=None):
+    session = session or requests
+    base = {"id": test_case["id"], "destination": test_case['destination']}
     try:
-        response = requests.post(
-            f"{API_URL}/api/generate-itinerary",
-            json={"prompt": test_case['prompt']},
-            timeout=200
-        )
-        
-        if response.status_code != 200:
-            return {
-                "destination": test_case['destination'],
-                "status": "failed",
-                "error": f"API returned {response.status_code}"
-            }
-        
-        result = response.json()
-        generated_text = result.get('response', '').lower()
-        
-        if not generated_text:
-            return {
-                "destination": test_case['destination'],
-                "status": "failed",
-                "error": "Empty response"
-            }
-        
-        found_keywords = []
-        missing_keywords = []
-        
-        for keyword in test_case['expected_keywords']:
-            if keyword.lower() in generated_text:
-                found_keywords.append(keyword)
-            else:
-                missing_keywords.append(keyword)
-        
-        keyword_accuracy = (len(found_keywords) / len(test_case['expected_keywords'])) * 100
-        
-        has_day_structure = "day 1" in generated_text and "day 2" in generated_text
-        has_time_slots = any(slot in generated_text for slot in ["morning", "afternoon", "evening"])
-        has_food_mention = any(word in generated_text for word in ["food", "cuisine", "restaurant", "eat", "lunch", "dinner"])
-        has_transport = any(word in generated_text for word in ["taxi", "bus", "auto", "train", "walk", "cab"])
-        
-        structure_score = sum([has_day_structure, has_time_slots, has_food_mention, has_transport]) / 4 * 100
-        
-        overall_accuracy = (keyword_accuracy * 0.6) + (structure_score * 0.4)
-        
-        print(f"✓ Response Length: {len(generated_text)} characters")
-        print(f"✓ Keyword Accuracy: {keyword_accuracy:.1f}%")
-        print(f"✓ Structure Score: {structure_score:.1f}%")
-        print(f"✓ Overall Accuracy: {overall_accuracy:.1f}%")
-        print(f"\nFound Keywords ({len(found_keywords)}/{len(test_case['expected_keywords'])}): {', '.join(found_keywords)}")
-        if missing_keywords:
-            print(f"Missing Keywords: {', '.join(missing_keywords)}")
-        
-        return {
-            "destination": test_case['destination'],
-            "status": "success",
-            "keyword_accuracy": round(keyword_accuracy, 1),
-            "structure_score": round(structure_score, 1),
-            "overall_accuracy": round(overall_accuracy, 1),
-            "found_keywords": found_keywords,
-            "missing_keywords": missing_keywords,
-            "response_length": len(generated_text),
-            "has_proper_structure": has_day_structure
-        }
-        
+        result = post_prompt(session, "/api/generate-itinerary", test_case['prompt'], timeout=200)
     except requests.exceptions.Timeout:
-        return {
-            "destination": test_case['destination'],
-            "status": "timeout",
-            "error": "Request timed out"
-        }
+        return {**base, "status": "timeout", "error": "Request timed out"}
+    except RuntimeError as e:
+        return {**base, "status": "failed", "error": str(e)}
     except Exception as e:
-        return {
-            "destination": test_case['destination'],
-            "status": "error",
-            "error": str(e)
-        }
+        return {**base, "status": "error", "error": str(e)}
 
-def test_budget_accuracy(test_case):
+    generated_text = result.get('response', '')
+    if not generated_text:
+        return {**base, "status": "failed", "error": "Empty response"}
+
+    return {**base, "status": "success", "generation_status": result.get("status"),
+            **score_itinerary(generated_text, test_case, result.get("structured"))}
+
+
+def test_budget_accuracy(test_case, session=None):
+    session = session or requests
     try:
-        response = requests.post(
-            f"{API_URL}/api/generate-budget",
-            json={"prompt": test_case['prompt']},
-            timeout=150
-        )
-        
-        if response.status_code != 200:
-            return None
-        
-        result = response.json()
-        generated_text = result.get('response', '')
-        
-        import re
-        prices = re.findall(r'₹\s*(\d+[,\d]*)', generated_text)
-        
-        if prices:
-            prices = [int(p.replace(',', '')) for p in prices]
-            total_budget = max(prices)
-            
-            min_expected, max_expected = test_case['expected_budget_range']
-            
-            if min_expected <= total_budget <= max_expected:
-                budget_accuracy = 100
-            elif total_budget < min_expected:
-                budget_accuracy = (total_budget / min_expected) * 100
-            else:
-                budget_accuracy = (max_expected / total_budget) * 100
-            
-            return {
-                "budget_accuracy": round(budget_accuracy, 1),
-                "estimated_budget": total_budget,
-                "expected_range": test_case['expected_budget_range']
-            }
-        
+        result = post_prompt(session, "/api/generate-budget", test_case['prompt'], timeout=150)
+    except Exception:
         return None
-        
-    except Exception as e:
+    return score_budget(result.get('response', ''), test_case, result.get('structured'))
+
+
+def evaluate_case(test_case, session=None):
+    """Score one case's itinerary and budget; returns a single result record"""
+    start = time.time()
+    result = test_itinerary_accuracy(test_case, session)
+    if "expected_budget_range" in test_case:
+        result["budget"] = test_budget_accuracy(test_case, session)
+
+    if result["status"] == "success":
+        budget = result.get("budget")
+        if budget:
+            result["combined_score"] = round(result["overall_accuracy"] * 0.7 + budget["budget_accuracy"] * 0.3, 1)
+        else:
+            result["combined_score"] = result["overall_accuracy"]
+    result["elapsed_seconds"] = round(time.time() - start, 2)
+    return result
+
+
+class Checkpoint:
+    """Append-only JSONL of finished case results for one run"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        results = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from an interrupted write
+                    results[record["id"]] = record
+        return results
+
+    def append(self, result):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def average(values):
+    return round(sum(values) / len(values), 1) if values else None
+
+
+def summarize(results, total_cases):
+    successful = [r for r in results if r['status'] == 'success']
+    budgets = [r["budget"]["budget_accuracy"] for r in results if r.get("budget")]
+    avg_overall = average([r['overall_accuracy'] for r in successful])
+    return {
+        "avg_keyword_accuracy": average([r['keyword_accuracy'] for r in successful]),
+        "avg_structure_score": average([r['structure_score'] for r in successful]),
+        "avg_overall_accuracy": avg_overall,
+        "avg_budget_accuracy": average(budgets),
+        "avg_combined_score": average([r['combined_score'] for r in successful]),
+        "grade": grade(avg_overall),
+        "total_tests": total_cases,
+        "successful_tests": len(successful),
+        "fallback_responses": sum(1 for r in successful if r.get("generation_status") == "fallback"),
+        "failed_tests": len(results) - len(successful)
+    }
+
+
+def grade(score):
+    if score is None:
+        return "No Results"
+    return "Excellent" if score >= 80 else "Good" if score >= 60 else "Needs Improvement"
+
+
+def regression_diff(results, baseline_results, threshold=REGRESSION_THRESHOLD):
+    """Cases whose combined score moved by at least ``threshold`` points, plus new failures"""
+    regressions, improvements = [], []
+    for result in results:
+        before = baseline_results.get(result["id"])
+        if not before:
+            continue
+        if before["status"] == "success" and result["status"] != "success":
+            regressions.append({"id": result["id"], "baseline": before.get("combined_score"), "current": result["status"]})
+            continue
+        if "combined_score" not in result or "combined_score" not in before:
+            continue
+        delta = round(result["combined_score"] - before["combined_score"], 1)
+        entry = {"id": result["id"], "baseline": before["combined_score"], "current": result["combined_score"], "delta": delta}
+        if delta <= -threshold:
+            regressions.append(entry)
+        elif delta >= threshold:
+            improvements.append(entry)
+    return {"threshold": threshold, "regressions": regressions, "improvements": improvements}
+
+
+def previous_run(history_path, exclude_run):
+    if not os.path.exists(history_path):
         return None
+    with open(history_path, encoding="utf-8") as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    runs = [r for r in runs if r["run_id"] != exclude_run]
+    return runs[-1]["run_id"] if runs else None
 
-def run_all_tests():
+
+def run_all_tests(cases_path=None, workers=4, resume=None, baseline=None, eval_dir=EVAL_DIR, limit=None):
     print("\n" + "="*60)
-    print("INDIAN DESTINATIONS ACCURACY TEST")
+    print("TRAVELMATE ACCURACY EVALUATION")
     print("="*60)
-    
+
     print("\nChecking API connection...")
     try:
         health = requests.get(f"{API_URL}/health", timeout=5)
@@ -167,65 +315,102 @@ def run_all_tests():
         else:
             print("✗ API returned error")
             return
-    except:
+    except requests.exceptions.RequestException:
         print("✗ Cannot connect to API. Make sure Flask app is running on port 5000")
         return
-    
-    results = []
-    
-    for i, test_case in enumerate(INDIAN_TEST_CASES, 1):
-        print(f"\n[Test {i}/{len(INDIAN_TEST_CASES)}]")
-        
-        itinerary_result = test_itinerary_accuracy(test_case)
-        results.append(itinerary_result)
-        
-        time.sleep(2)
-    
+
+    cases = load_cases(cases_path)
+    if limit:
+        cases = cases[:limit]
+
+    run_id = resume or time.strftime("%Y%m%d-%H%M%S")
+    run_dir = os.path.join(eval_dir, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(run_dir, "checkpoint.jsonl"))
+    done = checkpoint.load()
+    pending = [c for c in cases if c["id"] not in done]
+    print(f"Run {run_id}: {len(cases)} cases, {len(done)} already done, {len(pending)} to evaluate with {workers} workers")
+
+    local = threading.local()
+
+    def evaluate(test_case):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return evaluate_case(test_case, local.session)
+
+    started = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(evaluate, c): c for c in pending}
+            for n, future in enumerate(as_completed(futures), len(done) + 1):
+                result = future.result()
+                checkpoint.append(result)
+                done[result["id"]] = result
+                if result["status"] == "success":
+                    log(f"[{n}/{len(cases)}] {result['destination']}: {result['combined_score']:.1f}% "
+                        f"(itinerary {result['overall_accuracy']:.1f}%, "
+                        f"budget {result['budget']['budget_accuracy'] if result.get('budget') else 'n/a'})")
+                else:
+                    log(f"[{n}/{len(cases)}] {result['destination']}: {result['status'].upper()} - {result.get('error', 'Unknown error')}")
+    except KeyboardInterrupt:
+        print(f"\n✗ Interrupted. Resume with: python testacc.py --resume {run_id}")
+        raise
+
+    results = [done[c["id"]] for c in cases if c["id"] in done]
+    summary = summarize(results, len(cases))
+
     print("\n\n" + "="*60)
     print("FINAL ACCURACY REPORT")
     print("="*60)
-    
-    successful_tests = [r for r in results if r['status'] == 'success']
-    
-    if successful_tests:
-        avg_keyword_accuracy = sum(r['keyword_accuracy'] for r in successful_tests) / len(successful_tests)
-        avg_structure_score = sum(r['structure_score'] for r in successful_tests) / len(successful_tests)
-        avg_overall_accuracy = sum(r['overall_accuracy'] for r in successful_tests) / len(successful_tests)
-        
-        print(f"\nTests Completed: {len(successful_tests)}/{len(INDIAN_TEST_CASES)}")
-        print(f"Average Keyword Accuracy: {avg_keyword_accuracy:.1f}%")
-        print(f"Average Structure Score: {avg_structure_score:.1f}%")
-        print(f"Average Overall Accuracy: {avg_overall_accuracy:.1f}%")
-        
-        print("\n\nDetailed Results:")
-        print("-" * 60)
-        for r in results:
-            if r['status'] == 'success':
-                print(f"\n{r['destination']}: {r['overall_accuracy']:.1f}% accuracy")
-                print(f"  Keywords: {r['keyword_accuracy']:.1f}% | Structure: {r['structure_score']:.1f}%")
-            else:
-                print(f"\n{r['destination']}: {r['status'].upper()} - {r.get('error', 'Unknown error')}")
-        
-        accuracy_grade = "Excellent" if avg_overall_accuracy >= 80 else "Good" if avg_overall_accuracy >= 60 else "Needs Improvement"
-        print(f"\n\nFinal Grade: {accuracy_grade}")
-        print("="*60)
-        
-        with open('accuracy_report.json', 'w') as f:
-            json.dump({
-                "summary": {
-                    "avg_keyword_accuracy": round(avg_keyword_accuracy, 1),
-                    "avg_structure_score": round(avg_structure_score, 1),
-                    "avg_overall_accuracy": round(avg_overall_accuracy, 1),
-                    "grade": accuracy_grade,
-                    "total_tests": len(INDIAN_TEST_CASES),
-                    "successful_tests": len(successful_tests)
-                },
-                "detailed_results": results
-            }, f, indent=2)
-        
-        print("\n✓ Report saved to accuracy_report.json")
-    else:
-        print("\n✗ No successful tests completed")
+    print(f"\nTests Completed: {summary['successful_tests']}/{summary['total_tests']} in {time.time() - started:.1f}s")
+    if summary["successful_tests"]:
+        print(f"Average Keyword Accuracy: {summary['avg_keyword_accuracy']:.1f}%")
+        print(f"Average Structure Score: {summary['avg_structure_score']:.1f}%")
+        print(f"Average Overall Accuracy: {summary['avg_overall_accuracy']:.1f}%")
+        if summary["avg_budget_accuracy"] is not None:
+            print(f"Average Budget Accuracy: {summary['avg_budget_accuracy']:.1f}%")
+        print(f"Average Combined Score: {summary['avg_combined_score']:.1f}%")
+        print(f"\n\nFinal Grade: {summary['grade']}")
+
+    history_path = os.path.join(eval_dir, HISTORY_FILE)
+    baseline = baseline or previous_run(history_path, run_id)
+    comparison = None
+    if baseline:
+        baseline_results = Checkpoint(os.path.join(eval_dir, baseline, "checkpoint.jsonl")).load()
+        comparison = {"baseline_run": baseline, **regression_diff(results, baseline_results)}
+        print(f"\nVs run {baseline}: {len(comparison['regressions'])} regressions, "
+              f"{len(comparison['improvements'])} improvements (±{comparison['threshold']:.0f} points)")
+        for r in comparison["regressions"]:
+            print(f"  ✗ {r['id']}: {r['baseline']} → {r['current']}")
+    print("="*60)
+
+    report = {"run_id": run_id, "summary": summary, "comparison": comparison, "detailed_results": results}
+    with open(os.path.join(run_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open('accuracy_report.json', 'w', encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open(history_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"run_id": run_id, "cases": cases_path, "timestamp": time.time(), **summary}) + "\n")
+
+    print(f"\n✓ Report saved to accuracy_report.json and {run_dir}/report.json")
+    return report
+
+
+def main():
+    global API_URL
+    parser = argparse.ArgumentParser(description="Evaluate TravelMate itinerary and budget accuracy")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--cases", help="JSONL or YAML corpus (default: built-in Indian destinations)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--limit", type=int, help="only evaluate the first N cases")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue an interrupted run")
+    parser.add_argument("--baseline", metavar="RUN_ID", help="run to diff against (default: previous run)")
+    parser.add_argument("--eval-dir", default=EVAL_DIR)
+    args = parser.parse_args()
+
+    API_URL = args.url.rstrip("/")
+    run_all_tests(args.cases, args.workers, args.resume, args.baseline, args.eval_dir, args.limit)
+
 
 if __name__ == "__main__":
-    run_all_tests()
\ No newline at end of file
+    main()
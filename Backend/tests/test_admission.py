@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+from asgi_app import AsyncAdmission
+from cancellation import CancelToken, GenerationCancelled
+
+
+def test_free_slot_is_admitted_without_waiting():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, max_wait=1)
+    assert admission.acquire() == 0.0
+    assert admission.in_flight == 1
+
+
+def test_full_queue_is_rejected_with_429():
+    admission = AdmissionController(max_concurrent=1, max_queue=0, max_wait=1)
+    admission.acquire()
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire()
+    assert (rejected.value.reason, rejected.value.status_code) == ("queue_full", 429)
+
+
+def test_estimated_wait_over_deadline_is_rejected_before_queueing():
+    admission = AdmissionController(max_concurrent=1, max_queue=4, max_wait=10, expected_service_time=30)
+    admission.acquire()
+    start = time.time()
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire(max_wait=5)
+    assert time.time() - start < 0.5
+    assert (rejected.value.reason, rejected.value.status_code, rejected.value.retry_after) == ("deadline", 503, 30)
+    assert admission.queue_depth == 0
+
+
+def test_queued_request_gets_the_released_slot():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, max_wait=5, expected_service_time=1)
+    admission.acquire()
+    threading.Timer(0.1, admission.release).start()
+    assert admission.acquire() >= 0.05
+    assert admission.stats()["admitted"] == 2
+
+
+def test_queued_request_times_out():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, max_wait=0.2, expected_service_time=0.1)
+    admission.acquire()
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire()
+    assert rejected.value.reason == "deadline_exceeded"
+    assert admission.queue_depth == 0
+
+
+def test_cancelled_request_leaves_the_queue():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, max_wait=5, expected_service_time=1)
+    admission.acquire()
+    cancel = CancelToken()
+    threading.Timer(0.1, cancel.cancel, args=("disconnect",)).start()
+    with pytest.raises(GenerationCancelled):
+        admission.acquire(cancel=cancel)
+    assert admission.queue_depth == 0
+
+
+def run_async(admission, holders, *, max_wait=None, hold=0.2):
+    """Hold ``holders`` slots, then try one more; returns the AdmissionRejected reason or None"""
+    async def hold_slot():
+        async with admission.slot():
+            await asyncio.sleep(hold)
+
+    async def run():
+        tasks = [asyncio.ensure_future(hold_slot()) for _ in range(holders)]
+        await asyncio.sleep(0.01)
+        try:
+            async with admission.slot(max_wait):
+                return None
+        except AdmissionRejected as e:
+            return e
+        finally:
+            await asyncio.gather(*tasks)
+
+    return asyncio.run(run())
+
+
+def test_async_queued_request_gets_the_released_slot():
+    admission = AsyncAdmission(max_concurrent=1, max_queue=1, max_wait=5, expected_service_time=1)
+    assert run_async(admission, 1) is None
+    assert (admission.admitted, admission.in_flight, admission.queue_depth) == (2, 0, 0)
+
+
+def test_async_full_queue_is_rejected():
+    admission = AsyncAdmission(max_concurrent=1, max_queue=0, max_wait=5, expected_service_time=1)
+    assert run_async(admission, 1).reason == "queue_full"
+
+
+def test_async_estimated_wait_over_deadline_is_rejected_before_queueing():
+    admission = AsyncAdmission(max_concurrent=1, max_queue=4, max_wait=10, expected_service_time=30)
+    rejected = run_async(admission, 1, max_wait=5)
+    assert (rejected.reason, rejected.retry_after) == ("deadline", 30)
+    assert admission.stats()["rejected"] == {"queue_full": 0, "deadline": 1, "deadline_exceeded": 0}
+
+
+def test_async_queued_request_times_out():
+    admission = AsyncAdmission(max_concurrent=1, max_queue=1, max_wait=0.1, expected_service_time=0.05)
+    assert run_async(admission, 1, hold=0.5).reason == "deadline_exceeded"
+    assert admission.queue_depth == 0
+
+
+def test_async_service_time_average_follows_generations():
+    admission = AsyncAdmission(max_concurrent=1, max_queue=1, max_wait=5, expected_service_time=30)
+    run_async(admission, 1)
+    assert admission.avg_service_time < 30
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import asgi_app
+from cancellation import GenerationCancelled
+
+
+class Client:
+    def __init__(self, gone=False):
+        self.gone = gone
+
+    async def is_disconnected(self):
+        return self.gone
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = asgi_app.AsyncGenerationService()
+    calls = []
+
+    async def generate_with_ollama(prompt, **kwargs):
+        calls.append(prompt)
+        await asyncio.sleep(0.2)
+        return f"plan {len(calls)}"
+
+    monkeypatch.setattr(service, "generate_with_ollama", generate_with_ollama)
+    monkeypatch.setattr(asgi_app, "cache_generation", lambda *args: None)
+    monkeypatch.setattr(asgi_app, "CANCEL_POLL_SECONDS", 0.01)
+    service.calls = calls
+    return service
+
+
+def test_identical_requests_share_one_generation(service):
+    async def run():
+        return await asyncio.gather(*(service.generate_shared("k", "prompt", 10) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert {result for result, _ in results} == {"plan 1"}
+    assert len(service.calls) == 1
+
+
+def test_request_after_a_cancelled_generation_is_still_coalesced(service):
+    async def run():
+        with pytest.raises(GenerationCancelled):
+            await service.generate_shared("k", "prompt", 10, request=Client(gone=True))
+        # The cancelled task's done callback runs after the replacement has been registered
+        first = asyncio.ensure_future(service.generate_shared("k", "prompt", 10))
+        await asyncio.sleep(0.05)
+        second = await service.generate_shared("k", "prompt", 10)
+        return await first, second
+
+    (first, first_shared), (second, second_shared) = asyncio.run(run())
+    assert (first_shared, second_shared) == (False, True)
+    assert first == second
+    assert len(service.calls) == 2
+    assert service.tasks == {}
@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import httpx
+
+from asgi_app import AsyncGenerationService
+from ollama_pool import Backend, OllamaPool
+
+
+def chunk(text):
+    return (json.dumps({"response": text, "done": False}) + "\n").encode()
+
+
+def stalling_ollama(pieces):
+    """Stub Ollama that streams ``pieces`` and then stops answering until the read timeout"""
+    async def body():
+        for piece in pieces:
+            yield chunk(piece)
+        raise httpx.ReadTimeout("stalled")
+
+    return httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+
+
+def stream_frames(transport):
+    async def run():
+        service = AsyncGenerationService()
+        service.pool = OllamaPool(backends=[Backend("http://ollama-a")])
+        service.client = httpx.AsyncClient(transport=transport)
+        try:
+            return [json.loads(frame) async for frame in service.stream_generation_frames(
+                "prompt", None, lambda trip: "canned plan", timeout=5)]
+        finally:
+            await service.client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_stall_after_tokens_ends_with_timeout_frame():
+    frames = stream_frames(stalling_ollama(["Day 1: ", "Beach"]))
+    assert [frame["response"] for frame in frames[:-1]] == ["Day 1: ", "Beach"]
+    assert frames[-1] == {"done": True, "status": "timeout", "message": "AI stopped responding mid-stream"}
+
+
+def test_stall_before_any_token_falls_back():
+    frames = stream_frames(stalling_ollama([]))
+    assert len(frames) == 1
+    assert (frames[0]["status"], frames[0]["response"]) == ("fallback", "canned plan")
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+import app
+import asgi_app
+from jobs import RetryJob
+
+
+def busy(*args):
+    raise RetryJob("queue_full", retry_after=3)
+
+
+def test_busy_batch_item_sleeps_only_between_attempts(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(app, "generate_prepared", busy)
+    monkeypatch.setattr(app.time, "sleep", sleeps.append)
+    with pytest.raises(RuntimeError):
+        app.batch_generate("trip", None, None)
+    assert sleeps == [3] * (app.BATCH_BUSY_RETRIES - 1)
+
+
+def test_async_busy_batch_item_sleeps_only_between_attempts(monkeypatch):
+    sleeps = []
+
+    async def generate_prepared(*args):
+        busy()
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(asgi_app, "generate_prepared", generate_prepared)
+    monkeypatch.setattr(asgi_app.asyncio, "sleep", sleep)
+    with pytest.raises(RuntimeError):
+        asyncio.run(asgi_app.batch_generate("trip", None, None))
+    assert sleeps == [3] * (app.BATCH_BUSY_RETRIES - 1)
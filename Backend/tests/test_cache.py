@@ -0,0 +1,94 @@
+import pytest
+
+import cache
+from cache import MemoryCacheBackend, ResponseCache, SQLiteCacheBackend, make_cache_key
+
+OPTIONS = {"temperature": 0.7, "num_predict": 800}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, clock):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_bytes=30)
+    return SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_bytes=30)
+
+
+def test_key_ignores_case_and_whitespace():
+    assert make_cache_key("T", "Plan  a trip to\nGoa", "llama3.2", OPTIONS) == \
+        make_cache_key("T", "plan a trip to goa", "llama3.2", OPTIONS)
+
+
+@pytest.mark.parametrize("change", [
+    {"template": "Other template"},
+    {"prompt": "Plan a trip to Kerala"},
+    {"model": "llama3.1"},
+    {"options": {**OPTIONS, "temperature": 0.2}},
+])
+def test_key_changes_with_template_prompt_model_and_options(change):
+    base = {"template": "T", "prompt": "Plan a trip to Goa", "model": "llama3.2", "options": OPTIONS}
+    assert make_cache_key(**base) != make_cache_key(**{**base, **change})
+
+
+def test_round_trip_and_hit_accounting(backend):
+    responses = ResponseCache(backend, ttl=60)
+    assert responses.get("k") is None
+    responses.set("k", {"response": "plan"})
+    assert responses.get("k") == {"response": "plan"}
+    assert {k: responses.stats()[k] for k in ("hits", "misses", "hit_rate")} == \
+        {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_entries_expire_after_their_ttl(backend, clock):
+    backend.set("k", b"value", ttl=10)
+    clock.now += 5
+    assert backend.get("k") == b"value"
+    clock.now += 10
+    assert backend.get("k") is None
+    assert backend.stats()["bytes"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_past_max_bytes(backend):
+    for key in ("a", "b", "c"):
+        backend.set(key, b"x" * 10, ttl=60)
+    backend.get("a")
+    backend.set("d", b"x" * 10, ttl=60)
+    assert backend.get("b") is None
+    assert [backend.get(key) is not None for key in ("a", "c", "d")] == [True, True, True]
+    assert backend.stats()["bytes"] == 30
+
+
+def test_oversized_payload_is_not_stored(backend):
+    backend.set("big", b"x" * 31, ttl=60)
+    assert backend.get("big") is None
+
+
+def test_replacing_a_key_keeps_the_byte_count(backend):
+    backend.set("k", b"x" * 10, ttl=60)
+    backend.set("k", b"x" * 5, ttl=60)
+    backend.delete("missing")
+    assert backend.stats()["bytes"] == 5
+    backend.delete("k")
+    assert (backend.stats()["entries"], backend.stats()["bytes"]) == (0, 0)
+
+
+def test_disabled_cache_stores_nothing():
+    responses = ResponseCache(MemoryCacheBackend(), enabled=False)
+    responses.set("k", {"response": "plan"})
+    assert responses.get("k") is None
+    assert responses.backend.stats()["entries"] == 0
@@ -0,0 +1,61 @@
+from fallback_plans import fallback_budget, fallback_budgets, fallback_itinerary
+from trip_parser import parse_budget, parse_itinerary
+from trip_request import trip_request_from_json
+
+
+def trip(**fields):
+    return trip_request_from_json({"duration": 4, "travelers": 2, "budget_tier": "mid", **fields})
+
+
+def items(budget):
+    return {item["label"]: item for item in parse_budget(budget)["items"]}
+
+
+def test_budget_parses_into_its_five_line_items():
+    budget = parse_budget(fallback_budget(trip(destination="Goa")))
+    assert [item["label"] for item in budget["items"]] == [
+        "Travel to and from Goa", "Accommodation", "Food & Meals", "Local Transport", "Activities & Entry Fees"]
+    assert budget["currency"] == "INR"
+    assert budget["total_stated"]
+    assert budget["total"] == sum(item["amount"] for item in budget["items"])
+
+
+def detail(text, label):
+    lines = text.splitlines()
+    return next(lines[i + 1] for i, line in enumerate(lines) if line.startswith(f"**{label}**"))
+
+
+def test_local_transport_line_describes_transport():
+    assert detail(fallback_budget(trip(destination="Jaipur")), "Local Transport") == \
+        "- App cabs and autos between monuments"
+    assert detail(fallback_budget(trip(destination="Kerala")), "Local Transport") == \
+        "- KSRTC buses and a hired taxi for the backwaters"
+
+
+def test_budget_scales_with_tier_and_travelers():
+    budget, luxury, group = (items(text) for text in fallback_budgets(
+        [trip(destination="Goa", budget_tier="budget"), trip(destination="Goa", budget_tier="luxury"),
+         trip(destination="Goa", budget_tier="budget", travelers=4)]))
+    assert budget["Accommodation"]["amount"] < luxury["Accommodation"]["amount"]
+    assert group["Food & Meals"]["amount"] == 2 * budget["Food & Meals"]["amount"]
+
+
+def test_peak_season_costs_more_than_off_season():
+    peak, off = (items(fallback_budget(trip(destination="Goa", start_date=date))) for date in ("2026-12-10",
+                                                                                            "2026-07-10"))
+    assert peak["Accommodation"]["amount"] > off["Accommodation"]["amount"]
+
+
+def test_unknown_destination_uses_generic_budget_and_itinerary():
+    budget = parse_budget(fallback_budget(trip(destination="Atlantis")))
+    assert len(budget["items"]) == 5 and budget["total"] > 0
+    itinerary = fallback_itinerary(trip(destination="Atlantis"))
+    assert itinerary.startswith("Basic 4-day itinerary for Atlantis")
+
+
+def test_itinerary_walks_the_destination_attractions():
+    parsed = parse_itinerary(fallback_itinerary(trip(destination="Goa", interests=["beach"])))
+    assert [day["day"] for day in parsed["days"]] == [1, 2, 3, 4]
+    activities = " ".join(a for day in parsed["days"] for slot in day["slots"] for a in slot["activities"])
+    assert "beach" in activities.lower()
+    assert any(tip.startswith("Getting around:") for tip in parsed["tips"])
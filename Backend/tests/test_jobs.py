@@ -0,0 +1,98 @@
+import pytest
+
+from jobs import JobQueue, RetryJob
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"), workers=1, lease_seconds=60, max_attempts=3)
+    queue.configure(lambda kind, request: {"plan": request["destination"]},
+                    lambda kind, request: {"plan": "fallback"})
+    return queue
+
+
+def expire_leases(queue):
+    with queue._lock:
+        queue._conn.execute("UPDATE jobs SET lease_until = 0 WHERE status = 'running'")
+
+
+def submit(queue, destination="Goa", priority=0):
+    job, created = queue.submit("plan", {"destination": destination}, destination, priority=priority)
+    return job["id"], created
+
+
+def test_duplicate_submit_returns_the_same_job(queue):
+    first, created = submit(queue)
+    second, duplicate = submit(queue)
+    assert (created, duplicate) == (True, False)
+    assert first == second
+
+
+def test_claim_orders_by_priority_then_age(queue):
+    low, _ = submit(queue, "Goa")
+    high, _ = submit(queue, "Kerala", priority=5)
+    assert queue.get(low)["queue_position"] == 1
+    assert queue.claim()[0] == high
+    assert queue.claim()[0] == low
+    assert queue.claim() is None
+
+
+def test_run_one_stores_the_result(queue):
+    job_id, _ = submit(queue)
+    assert queue.run_one()
+    job = queue.get(job_id)
+    assert (job["status"], job["result"], job["attempts"]) == ("done", {"plan": "Goa"}, 1)
+
+
+def test_leased_job_is_not_claimed_twice(queue):
+    submit(queue)
+    assert queue.claim() is not None
+    assert queue.claim() is None
+
+
+def test_expired_lease_counts_as_an_attempt(queue):
+    job_id, _ = submit(queue)
+    queue.claim()
+    expire_leases(queue)
+    assert queue.claim() == (job_id, "plan", {"destination": "Goa"}, 1)
+
+
+def test_job_whose_lease_keeps_expiring_fails_with_fallback(queue):
+    job_id, _ = submit(queue)
+    for _ in range(queue.max_attempts):
+        queue.claim()
+        expire_leases(queue)
+    assert queue.run_one()
+    job = queue.get(job_id)
+    assert (job["status"], job["result"], job["attempts"]) == ("failed", {"plan": "fallback"}, 3)
+    assert queue.claim() is None
+
+
+def test_failures_back_off_then_fail_with_fallback(queue):
+    def broken(kind, request):
+        raise RuntimeError("model crashed")
+
+    queue.configure(broken, lambda kind, request: {"plan": "fallback"})
+    job_id, _ = submit(queue)
+    for attempt in range(1, queue.max_attempts):
+        assert queue.run_one()
+        job = queue.get(job_id)
+        assert (job["status"], job["attempts"]) == ("queued", attempt)
+        assert queue.claim() is None
+        with queue._lock:
+            queue._conn.execute("UPDATE jobs SET not_before = 0")
+    assert queue.run_one()
+    job = queue.get(job_id)
+    assert (job["status"], job["result"], job["attempts"]) == ("failed", {"plan": "fallback"}, 3)
+
+
+def test_retry_job_does_not_use_an_attempt(queue):
+    def busy(kind, request):
+        raise RetryJob("queue full", retry_after=0)
+
+    queue.configure(busy, lambda kind, request: {"plan": "fallback"})
+    job_id, _ = submit(queue)
+    assert queue.run_one()
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"]) == ("queued", 0)
+    assert queue.deferred == 1
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import requests
+
+import ollama_pool
+from asgi_app import AsyncGenerationService
+from ollama_pool import Backend, OllamaPool
+
+
+class StubClient:
+    """Stands in for an OllamaClient; ``down`` makes every request fail to connect"""
+
+    def __init__(self, down=False):
+        self.down = down
+        self.calls = 0
+
+    def post(self, path, payload, timeout=None, stream=False):
+        self.calls += 1
+        if self.down:
+            raise requests.exceptions.ConnectionError("connection refused")
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ollama_pool.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def pool(clock):
+    backends = [Backend("http://ollama-a", StubClient(down=True)), Backend("http://ollama-b", StubClient())]
+    return OllamaPool(backends=backends, eject_after=2, eject_seconds=30)
+
+
+def clients(pool):
+    return [backend.client for backend in pool.backends]
+
+
+def test_post_fails_over_to_the_next_backend(pool):
+    down, up = clients(pool)
+    assert pool.post("/api/generate", {}).status_code == 200
+    assert (down.calls, up.calls) == (1, 1)
+
+
+def test_backend_is_ejected_after_consecutive_failures(pool):
+    down, up = clients(pool)
+    for _ in range(4):
+        pool.post("/api/generate", {})
+    assert (down.calls, up.calls) == (2, 4)
+    assert pool.stats()["backends"][0]["ejected"]
+
+
+def test_post_raises_when_every_backend_is_down(pool):
+    pool.backends[1].client.down = True
+    with pytest.raises(requests.exceptions.ConnectionError):
+        pool.post("/api/generate", {})
+
+
+def test_single_trial_request_after_the_cooldown(pool, clock):
+    ejected, healthy = pool.backends
+    for _ in range(2):
+        pool.post("/api/generate", {})
+    clock.now += 31
+
+    trial = pool.acquire()
+    assert trial is ejected and ejected.probing
+    # Concurrent requests stay off the backend until its trial finishes
+    assert [pool.acquire() for _ in range(3)] == [healthy] * 3
+    pool.release(trial, latency=0.1)
+    assert not ejected.probing and ejected.ejected_until == 0.0
+    assert pool.acquire() is ejected
+
+
+def test_failed_trial_ejects_the_backend_again(pool, clock):
+    ejected, _ = pool.backends
+    for _ in range(2):
+        pool.post("/api/generate", {})
+    clock.now += 31
+    pool.release(pool.acquire(), failed=True)
+    assert ejected.ejected_until == clock.now + 30
+    assert pool.acquire() is not ejected
+
+
+def stream_lines(handler, backends=("http://ollama-a", "http://ollama-b")):
+    async def run():
+        service = AsyncGenerationService()
+        service.pool = OllamaPool(backends=[Backend(url) for url in backends], eject_after=1)
+        service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        lines = []
+        try:
+            async for line in service.stream_with_ollama("prompt", timeout=5):
+                lines.append(json.loads(line)["response"])
+        except httpx.TransportError as e:
+            lines.append(type(e).__name__)
+        finally:
+            await service.client.aclose()
+        return lines, service.pool.stats()["backends"]
+
+    return asyncio.run(run())
+
+
+def test_async_stream_fails_over_before_the_first_byte():
+    def handler(request):
+        if request.url.host == "ollama-a":
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, content=b'{"response": "Day 1", "done": false}\n')
+
+    lines, backends = stream_lines(handler)
+    assert lines == ["Day 1"]
+    assert [(b["failures"], b["ejected"], b["outstanding"]) for b in backends] == [(1, True, 0), (0, False, 0)]
+
+
+def test_async_stream_does_not_fail_over_after_streaming():
+    async def broken():
+        yield b'{"response": "Day 1", "done": false}\n'
+        raise httpx.ReadError("connection reset")
+
+    lines, backends = stream_lines(lambda request: httpx.Response(200, content=broken()))
+    assert lines == ["Day 1", "ReadError"]
+    assert [b["requests"] for b in backends] == [1, 0]
@@ -0,0 +1,81 @@
+import pytest
+
+from semantic_cache import SemanticCache, preference_key
+from trip_request import trip_request_from_json
+
+GOA = {"destination": "Goa", "duration": 3, "travelers": 2, "budget_tier": "budget"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SemanticCache(path=str(tmp_path / "semantic"), mode="serve", threshold=0.5)
+    cache.remember("ns", trip_request_from_json(GOA), "stored answer")
+    return cache
+
+
+def lookup(cache, **changes):
+    return cache.lookup("ns", trip_request_from_json({**GOA, **changes}))
+
+
+def test_same_request_hits(cache):
+    assert lookup(cache) == "stored answer"
+
+
+def test_reworded_prompt_hits(cache):
+    trip = trip_request_from_json({"prompt": "3-day Goa trip for 2 travelers on a budget"})
+    cache.remember("ns", trip, "free text answer")
+    assert cache.lookup("ns", trip_request_from_json({"prompt": "Goa 3-day trip for 2 travelers, budget"})) == \
+        "free text answer"
+
+
+@pytest.mark.parametrize("changes", [
+    {"budget_tier": "luxury"},
+    {"start_date": "2026-06-10", "end_date": "2026-06-12"},
+    {"transport": "flight"},
+    {"accommodation": "5star"},
+    {"duration": 4},
+    {"travelers": 3},
+    {"destination": "Jaipur"},
+])
+def test_different_trip_fields_miss(cache, changes):
+    assert lookup(cache, **changes) is None
+
+
+def test_other_namespace_misses(cache):
+    assert cache.lookup("other", trip_request_from_json(GOA)) is None
+
+
+def test_start_dates_in_the_same_season_hit(tmp_path):
+    cache = SemanticCache(path=str(tmp_path / "semantic"), mode="serve", threshold=0.5)
+    cache.remember("ns", trip_request_from_json({**GOA, "start_date": "2026-12-20", "end_date": "2026-12-22"}), "winter")
+    assert lookup(cache, start_date="2027-01-05", end_date="2027-01-07") == "winter"
+    assert lookup(cache, start_date="2027-06-05", end_date="2027-06-07") is None
+
+
+def test_shadow_mode_never_serves(tmp_path):
+    cache = SemanticCache(path=str(tmp_path / "semantic"), mode="shadow", threshold=0.5)
+    cache.remember("ns", trip_request_from_json(GOA), "stored answer")
+    assert lookup(cache) is None
+    assert cache.shadow_hits == 1
+
+
+def test_caches_sharing_a_path_serve_their_own_entries(tmp_path):
+    path = str(tmp_path / "shared")
+    first = SemanticCache(path=path, mode="serve", threshold=0.5)
+    second = SemanticCache(path=path, mode="serve", threshold=0.5)
+    first.store(), second.store()
+    kerala = {**GOA, "destination": "Kerala"}
+    first.remember("ns", trip_request_from_json(GOA), "goa plan")
+    second.remember("ns", trip_request_from_json(kerala), "kerala plan")
+    for cache in (first, second):
+        assert cache.lookup("ns", trip_request_from_json(GOA)) == "goa plan"
+        assert cache.lookup("ns", trip_request_from_json(kerala)) == "kerala plan"
+
+
+def test_entry_whose_vector_row_was_overwritten_is_not_served(cache):
+    luxury = trip_request_from_json({**GOA, "budget_tier": "luxury"})
+    store = cache.store()
+    # The row now indexes as a luxury request while its stored entry is the budget one
+    codes = store._codes["preferences"]
+    store._columns["preferences"][0] = codes.setdefault(preference_key(luxury), len(codes))
+    assert cache.lookup("ns", luxury) is None
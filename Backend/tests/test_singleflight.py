@@ -0,0 +1,106 @@
+import gc
+import threading
+import time
+
+from singleflight import SingleFlight
+
+
+def gated_producer(gate, frames=("a", "b")):
+    """Producer that waits for ``gate`` and stops early once cancelled, like the Ollama stream"""
+    seen = {}
+
+    def producer(cancel):
+        seen["cancel"] = cancel
+        yield frames[0]
+        while not gate.wait(0.01):
+            if cancel.cancelled:
+                yield "cancelled"
+                return
+        yield from frames[1:]
+    return producer, seen
+
+
+def test_identical_calls_share_one_result():
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", work)))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(flights.do("k", work)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(1)
+    follower.join(1)
+    assert len(calls) == 1
+    assert sorted(results) == [("result", False), ("result", True)]
+
+
+def test_follower_that_has_not_started_reading_keeps_the_stream_alive():
+    flights = SingleFlight()
+    gate = threading.Event()
+    producer, seen = gated_producer(gate)
+    leader, shared = flights.stream("k", producer)
+    follower, follower_shared = flights.stream("k", producer)
+    assert (shared, follower_shared) == (False, True)
+
+    assert next(leader) == "a"
+    leader.close()
+    time.sleep(0.05)
+    assert not seen["cancel"].cancelled
+
+    gate.set()
+    assert list(follower) == ["a", "b"]
+
+
+def test_last_subscriber_leaving_cancels_the_producer():
+    flights = SingleFlight()
+    producer, seen = gated_producer(threading.Event())
+    first, _ = flights.stream("k", producer)
+    second, _ = flights.stream("k", producer)
+    assert next(first) == "a"
+    first.close()
+    second.close()
+    assert seen["cancel"].cancelled
+    assert seen["cancel"].reason == "disconnect"
+
+
+def test_unread_subscription_is_released_when_collected():
+    flights = SingleFlight()
+    producer, seen = gated_producer(threading.Event())
+    subscription, _ = flights.stream("k", producer)
+    time.sleep(0.05)
+    del subscription
+    gc.collect()
+    assert seen["cancel"].cancelled
+
+
+def test_cancelled_stream_is_not_joined():
+    flights = SingleFlight()
+    producer, seen = gated_producer(threading.Event())
+    subscription, _ = flights.stream("k", producer)
+    subscription.close()
+    fresh, shared = flights.stream("k", gated_producer(threading.Event())[0])
+    assert shared is False
+    fresh.close()
+
+
+def test_subscriber_sees_the_producers_terminal_frame():
+    flights = SingleFlight()
+    gate = threading.Event()
+    producer, seen = gated_producer(gate)
+    subscription, _ = flights.stream("k", producer)
+    assert next(subscription) == "a"
+    # Cancelled from elsewhere (a deadline): the subscriber still gets the last frame and the end of the stream
+    seen["cancel"].cancel("deadline")
+    assert list(subscription) == ["cancelled"]
@@ -0,0 +1,101 @@
+import pytest
+
+from trip_parser import PARSER_VERSION, parse_amounts, parse_budget, parse_generation, parse_itinerary
+
+ITINERARY = """3-day itinerary for Goa:
+
+**Day 1: Arrival & North Goa**
+- Morning: Check in; walk Calangute beach
+- Afternoon: Fort Aguada (₹50)
+- Dinner: Fish curry at a shack
+
+Day 2 - South Goa
+* Morning: Palolem beach, then kayaking
+Relax by the pool
+
+Final Day: Departure
+- Morning: Souvenir shopping
+
+Travel Tips:
+- Rent a scooter
+- Carry sunscreen
+"""
+
+BUDGET = """Estimated Budget for Goa:
+
+**Travel to and from Goa**: ₹6,000-8,000
+- Train round trip
+**Accommodation**: ₹9,000
+Food & Meals: 4.5k INR
+Local Transport (₹1,500)
+**Total Estimated Cost**: ₹20,500-22,500
+
+Money-saving tips:
+- Travel off season
+"""
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("₹3,000", [{"amount": 3000, "currency": "INR"}]),
+    ("Rs. 2,500 - 4,000", [{"amount": 2500, "currency": "INR", "max": 4000}]),
+    ("$40-50/day", [{"amount": 40, "currency": "USD", "max": 50}]),
+    ("5k INR", [{"amount": 5000, "currency": "INR"}]),
+    ("₹1.5 lakh", [{"amount": 150000, "currency": "INR"}]),
+    ("€12.50 and £3", [{"amount": 12.5, "currency": "EUR"}, {"amount": 3, "currency": "GBP"}]),
+    ("Day 2 at 10am, ₹0 entry", []),
+])
+def test_parse_amounts(text, expected):
+    assert parse_amounts(text) == expected
+
+
+def test_itinerary_days_slots_and_tips():
+    parsed = parse_itinerary(ITINERARY)
+    assert [(day["day"], day["title"]) for day in parsed["days"]] == [
+        (1, "Arrival & North Goa"), (2, "South Goa"), (3, "Departure")]
+    first = parsed["days"][0]["slots"]
+    assert [slot["slot"] for slot in first] == ["morning", "afternoon", "food"]
+    assert first[0]["activities"] == ["Check in", "walk Calangute beach"]
+    assert first[1]["costs"] == [{"amount": 50, "currency": "INR"}]
+    second = parsed["days"][1]
+    assert second["slots"][0]["activities"] == ["Palolem beach", "kayaking"]
+    assert second["notes"] == ["Relax by the pool"]
+    assert parsed["tips"] == ["Rent a scooter", "Carry sunscreen"]
+
+
+def test_itinerary_day_ranges_continue_numbering():
+    parsed = parse_itinerary("Day 1: Arrive\nDays 2-4: Explore\nLast day: Leave\n")
+    assert [day["day"] for day in parsed["days"]] == [1, 2, 5]
+    assert parsed["days"][1]["last_day"] == 4
+
+
+def test_budget_items_total_and_tips():
+    parsed = parse_budget(BUDGET)
+    assert [(item["label"], item["amount"]) for item in parsed["items"]] == [
+        ("Travel to and from Goa", 6000), ("Accommodation", 9000), ("Food & Meals", 4500),
+        ("Local Transport", 1500)]
+    assert parsed["items"][0]["max"] == 8000
+    assert (parsed["currency"], parsed["total"], parsed["total_max"], parsed["total_stated"]) == \
+        ("INR", 20500, 22500, True)
+    assert parsed["tips"] == ["Travel off season"]
+
+
+def test_budget_without_total_sums_its_items():
+    parsed = parse_budget("Stay: $300\nFood: $150\nTours: ₹2,000\n")
+    assert (parsed["currency"], parsed["total"], parsed["total_stated"]) == ("USD", 450, False)
+
+
+def test_trip_generation_is_split_into_sections():
+    parsed = parse_generation("trip", f"=== ITINERARY ===\n{ITINERARY}\n=== BUDGET ===\n{BUDGET}")
+    assert parsed["version"] == PARSER_VERSION
+    assert len(parsed["itinerary"]["days"]) == 3
+    assert parsed["budget"]["total"] == 20500
+
+
+def test_budget_lines_use_the_computed_amount():
+    parsed = parse_budget("Accommodation: 2 nights x ₹3,000 = ₹6,000\n"
+                          "Food & Meals: ₹500/day per person for 2 people, ₹3,000\n"
+                          "Entry fees: 4 x $10=$40\n"
+                          "Total: 2 travelers x ₹4,500 = ₹9,000\n")
+    assert [(item["label"], item["amount"]) for item in parsed["items"]] == [
+        ("Accommodation", 6000), ("Food & Meals", 3000), ("Entry fees", 40)]
+    assert parsed["total"] == 9000
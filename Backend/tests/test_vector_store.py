@@ -0,0 +1,53 @@
+from vector_store import VectorStore
+
+TRIPS = {
+    "goa": "beaches seafood nightlife in goa",
+    "jaipur": "forts palaces and bazaars of jaipur",
+    "kerala": "backwaters houseboat and tea gardens in kerala",
+    "ladakh": "high passes monasteries and lakes of ladakh",
+}
+
+
+def store(path):
+    return VectorStore(str(path), dim=256, fields=("destination",))
+
+
+def test_search_filters_by_metadata(tmp_path):
+    vectors = store(tmp_path)
+    vectors.add(list(TRIPS.values()), [{"destination": name} for name in TRIPS], ids=list(TRIPS))
+    hits = vectors.search("houseboat backwaters", limit=2)
+    assert hits[0]["id"] == "kerala"
+    assert vectors.search("houseboat backwaters", where={"destination": "goa"})[0]["id"] == "goa"
+    assert vectors.search("houseboat backwaters", where={"destination": "paris"}) == []
+
+
+def test_upsert_keeps_the_row(tmp_path):
+    vectors = store(tmp_path)
+    vectors.add([TRIPS["goa"]], [{"destination": "goa"}], ids=["goa"])
+    vectors.add([TRIPS["jaipur"]], [{"destination": "goa"}], ids=["goa"])
+    assert vectors.count == 1
+    assert vectors.search("forts palaces")[0]["content"] == TRIPS["jaipur"]
+
+
+def test_stores_sharing_a_path_do_not_overwrite_each_other(tmp_path):
+    first, second = store(tmp_path), store(tmp_path)
+    for i, (name, text) in enumerate(TRIPS.items()):
+        (first if i % 2 else second).add([text], [{"destination": name}], ids=[name])
+
+    reopened = store(tmp_path)
+    for vectors in (first, second, reopened):
+        for name, text in TRIPS.items():
+            hit = vectors.search(text, limit=1)[0]
+            assert (hit["id"], hit["content"]) == (name, text)
+            assert hit["relevance_score"] > 0.99
+        assert vectors.count == len(TRIPS)
+
+
+def test_stores_sharing_a_path_grow_the_matrix_together(tmp_path, monkeypatch):
+    monkeypatch.setattr("vector_store.INITIAL_CAPACITY", 2)
+    first, second = store(tmp_path), store(tmp_path)
+    names = list(TRIPS)
+    first.add([TRIPS[n] for n in names[:3]], [{"destination": n} for n in names[:3]], ids=names[:3])
+    second.add([TRIPS[names[3]]], [{"destination": names[3]}], ids=[names[3]])
+    assert first.search(TRIPS["ladakh"], limit=1)[0]["id"] == "ladakh"
+    assert second.search(TRIPS["goa"], limit=1)[0]["id"] == "goa"
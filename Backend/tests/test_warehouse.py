@@ -0,0 +1,103 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+import asgi_app
+from trip_request import trip_request_from_json
+from warehouse import TripWarehouse, plan_request, season_of
+
+PLAN = {"itinerary": "Day 1: Beaches", "budget": "Total: ₹20,000"}
+# The body frontend/tours.html builds in createTripRequest()
+TOURS_FORM = {"destination": "Goa", "start_date": "2026-12-10", "duration": 3, "travelers": 2, "transport": "train",
+              "accommodation": "4star", "meals": ["breakfast", "dinner"]}
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    warehouse = TripWarehouse(path=str(tmp_path / "warehouse.sqlite3"), destinations=["Goa"], durations=[3],
+                              travelers=[2], enabled=True)
+    warehouse.store(("Goa", 3, 2, "mid", "winter"), PLAN, "llama3.2")
+    return warehouse
+
+
+def lookup(warehouse, **changes):
+    return warehouse.lookup(trip_request_from_json({**TOURS_FORM, **changes}))
+
+
+def test_trip_form_request_hits(warehouse):
+    assert lookup(warehouse) == PLAN
+
+
+def test_transport_meals_and_date_within_the_season_still_hit(warehouse):
+    assert lookup(warehouse, transport="flight", meals=[], start_date="2027-01-20") == PLAN
+
+
+@pytest.mark.parametrize("changes", [
+    {"accommodation": "5star"},
+    {"start_date": "2026-07-10"},
+    {"interests": ["nightlife"]},
+    {"travelers": 3},
+    {"destination": "Kerala"},
+])
+def test_other_tier_season_or_content_misses(warehouse, changes):
+    assert lookup(warehouse, **changes) is None
+
+
+def test_core_match_serves_requests_with_interests(tmp_path):
+    warehouse = TripWarehouse(path=str(tmp_path / "warehouse.sqlite3"), destinations=["Goa"], durations=[3],
+                              travelers=[2], match="core", enabled=True)
+    warehouse.store(("Goa", 3, 2, "mid", "winter"), PLAN, "llama3.2")
+    assert lookup(warehouse, interests=["nightlife"]) == PLAN
+
+
+def test_bare_request_uses_mid_tier_and_current_season(warehouse):
+    key = warehouse.key_for(trip_request_from_json({"destination": "goa", "duration": 3, "travelers": 2}))
+    assert key == ("Goa", 3, 2, "mid", season_of(None))
+
+
+def test_due_lists_every_tier_and_season_with_the_current_season_first(warehouse):
+    due = warehouse.due()
+    assert len(due) == len(warehouse.grid()) - 1 == 11
+    assert ("Goa", 3, 2, "mid", "winter") not in due
+    assert due[0][4] == season_of(None)
+
+
+def test_plan_request_describes_the_key():
+    trip = trip_request_from_json(plan_request(("Goa", 3, 2, "luxury", "monsoon")))
+    assert (trip.destination, trip.duration, trip.travelers, trip.budget_tier) == ("Goa", 3, 2, "luxury")
+    assert "monsoon" in trip.prompt
+
+
+def test_plans_from_the_old_schema_are_dropped(tmp_path):
+    path = str(tmp_path / "warehouse.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE trip_plans (destination TEXT, duration INTEGER, travelers INTEGER, itinerary BLOB, "
+                 "budget BLOB, model TEXT, generated_at REAL)")
+    conn.commit()
+    conn.close()
+    warehouse = TripWarehouse(path=path, destinations=["Goa"], durations=[3], travelers=[2], enabled=True)
+    warehouse.store(("Goa", 3, 2, "mid", "winter"), PLAN, "llama3.2")
+    assert lookup(warehouse) == PLAN
+
+
+def test_asgi_refresh_runs_through_the_async_admission(monkeypatch):
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    service = asgi_app.service
+    in_flight = []
+
+    async def generate_with_ollama(prompt, **kwargs):
+        in_flight.append(service.admission.in_flight)
+        return "=== ITINERARY ===\nDay 1: Beaches\n=== BUDGET ===\nTotal: ₹20,000\n"
+
+    monkeypatch.setattr(service, "loop", loop)
+    monkeypatch.setattr(service, "generate_with_ollama", generate_with_ollama)
+    try:
+        sections, _ = asgi_app.refresh_warehouse_plan(("Goa", 3, 2, "mid", "winter"))
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+    assert sections == {"itinerary": "Day 1: Beaches", "budget": "Total: ₹20,000"}
+    assert in_flight == [1]
+    assert service.admission.in_flight == 0
@@ -0,0 +1,203 @@
+"""Structured form of generated itineraries and budgets.
+
+Generated text is parsed once, when it is cached, into a compact model:
+
+- itinerary: ``{"days": [{"day", "title", "slots": [{"slot", "activities", "costs"?}], "notes"?}], "tips"}``
+  where ``slot`` is morning, afternoon, evening, night or food;
+- budget: ``{"currency", "items": [{"label", "amount", "max"?, "currency"}], "total", "total_max"?,
+  "total_stated", "tips"}``;
+- trip: ``{"itinerary": ..., "budget": ...}`` from the ``=== SECTION ===`` layout.
+
+The parser is tolerant of the usual model drift (markdown emphasis,
+bullets, "Days 6-7", ranges such as "₹3,000-4,000", "5k", amounts after
+or before a colon). Lines it cannot place are dropped from the
+structured form; the raw text is always returned alongside it.
+``PARSER_VERSION`` is stored with each result, so a parser change
+re-parses old cache entries instead of serving a stale shape.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+from trip_sections import split_trip_sections
+
+PARSER_VERSION = 2
+
+SLOT_NAMES = ("morning", "afternoon", "evening", "night", "food")
+SLOT_ALIASES = {"breakfast": "food", "lunch": "food", "dinner": "food", "meals": "food", "eat": "food"}
+
+CURRENCIES = {"₹": "INR", "rs": "INR", "rs.": "INR", "inr": "INR", "rupees": "INR", "$": "USD", "us$": "USD",
+              "usd": "USD", "dollars": "USD", "€": "EUR", "eur": "EUR", "£": "GBP", "gbp": "GBP"}
+MULTIPLIERS = {"k": 1000, "lakh": 100000, "lakhs": 100000}
+
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_MULTIPLIER = r"(?:\s*(?:k|lakhs?)\b)?"
+_PREFIX = r"₹|Rs\.?|INR|US\$|\$|USD|€|EUR|£|GBP"
+AMOUNT_PATTERN = re.compile(
+    rf"(?P<cur>{_PREFIX})\s*(?P<low>{_NUMBER})(?P<lm>{_MULTIPLIER})"
+    rf"(?:\s*(?:-|–|to)\s*(?:{_PREFIX})?\s*(?P<high>{_NUMBER})(?P<hm>{_MULTIPLIER}))?"
+    rf"|(?P<num>{_NUMBER})(?P<nm>{_MULTIPLIER})\s*(?P<suffix>INR|USD|EUR|GBP|rupees|dollars)\b",
+    re.IGNORECASE
+)
+DAY_PATTERN = re.compile(r"^(?:days?\s+(\d+)(?:\s*(?:-|–|to)\s*(\d+))?|(final|last)\s+day)\b\s*[:.\-–]?\s*(.*)$",
+                         re.IGNORECASE)
+SLOT_PATTERN = re.compile(r"^(" + "|".join(SLOT_NAMES + tuple(SLOT_ALIASES)) + r")\b\s*[:\-–]\s*(.+)$",
+                          re.IGNORECASE)
+TIPS_PATTERN = re.compile(r"^(?:[\w\- ]{0,30}\s)?tips?\s*:?\s*(.*)$", re.IGNORECASE)
+ACTIVITY_SEPARATOR = re.compile(r"\s*;\s*|,?\s+then\s+", re.IGNORECASE)
+BULLET_PATTERN = re.compile(r"^(?:[-*•+]|\d+[.)])\s*")
+TOTAL_PATTERN = re.compile(r"\btotal\b", re.IGNORECASE)
+
+
+def _clean(line):
+    """Strip bullets, numbering and markdown emphasis from one line"""
+    line = line.strip().replace("**", "").replace("__", "").strip("#").strip()
+    return BULLET_PATTERN.sub("", line).strip()
+
+
+def _number(digits, multiplier):
+    value = float(digits.replace(",", "")) * MULTIPLIERS.get(multiplier.strip().lower(), 1)
+    return int(value) if value.is_integer() else round(value, 2)
+
+
+def parse_amounts(text):
+    """Every money amount in ``text`` as {"amount", "currency"} (plus "max" for a range)"""
+    amounts = []
+    for match in AMOUNT_PATTERN.finditer(text):
+        if match.group("num"):
+            amount = {"amount": _number(match.group("num"), match.group("nm")),
+                      "currency": CURRENCIES[match.group("suffix").lower()]}
+        else:
+            amount = {"amount": _number(match.group("low"), match.group("lm")),
+                      "currency": CURRENCIES[match.group("cur").lower()]}
+            if match.group("high"):
+                amount["max"] = _number(match.group("high"), match.group("hm") or match.group("lm"))
+        if amount["amount"]:
+            amounts.append(amount)
+    return amounts
+
+
+def parse_itinerary(text):
+    """Itinerary text -> {"days": [...], "tips": [...]}"""
+    days = []
+    tips = []
+    day = None
+    in_tips = False
+    for raw in text.splitlines():
+        line = _clean(raw)
+        if not line:
+            continue
+        match = DAY_PATTERN.match(line)
+        if match:
+            in_tips = False
+            number = int(match.group(1)) if match.group(1) else (days[-1].get("last_day", days[-1]["day"]) + 1
+                                                                  if days else 1)
+            day = {"day": number, "title": match.group(4).strip(), "slots": []}
+            if match.group(2):
+                day["last_day"] = int(match.group(2))
+            days.append(day)
+            continue
+        match = TIPS_PATTERN.match(line)
+        if match and len(line) < 200 and ":" in line[:40]:
+            in_tips = True
+            if match.group(1):
+                tips.append(match.group(1).strip())
+            continue
+        if in_tips:
+            tips.append(line)
+            continue
+        if day is None:
+            continue
+        match = SLOT_PATTERN.match(line)
+        if match:
+            name = match.group(1).lower()
+            slot = {"slot": SLOT_ALIASES.get(name, name),
+                    "activities": [a.strip(" .") for a in ACTIVITY_SEPARATOR.split(match.group(2)) if a.strip(" .")]}
+            costs = parse_amounts(match.group(2))
+            if costs:
+                slot["costs"] = costs
+            day["slots"].append(slot)
+        else:
+            day.setdefault("notes", []).append(line)
+    return {"days": days, "tips": tips}
+
+
+def _line_amount(text, amounts):
+    """The amount a budget line adds up to: the one after "=" in "2 nights x ₹3,000 = ₹6,000", else the last"""
+    _, equals, result = text.rpartition("=")
+    if equals:
+        after = parse_amounts(result)
+        if after:
+            return after[0]
+    return amounts[-1]
+
+
+def parse_budget(text):
+    """Budget text -> {"currency", "items": [...], "total", "total_max"?, "total_stated", "tips": [...]}"""
+    items = []
+    tips = []
+    total = None
+    in_tips = False
+    for raw in text.splitlines():
+        line = _clean(raw)
+        if not line:
+            continue
+        match = TIPS_PATTERN.match(line)
+        if match and ":" in line[:40] and not parse_amounts(line.split(":", 1)[0]):
+            in_tips = True
+            if match.group(1):
+                tips.append(match.group(1).strip())
+            continue
+        if in_tips:
+            tips.append(line)
+            continue
+
+        label, _, value = line.partition(":")
+        amounts = parse_amounts(value) if value else []
+        if not amounts:
+            label, amounts = line, parse_amounts(line)
+        if not amounts:
+            continue
+        label = AMOUNT_PATTERN.sub("", label).strip(" :-–()") if label == line else label.strip()
+        amount = _line_amount(value or line, amounts)
+        if TOTAL_PATTERN.search(label):
+            if total is None:
+                total = amount
+            continue
+        items.append({"label": label, **amount})
+
+    currencies = Counter(item["currency"] for item in items + ([total] if total else []))
+    currency = currencies.most_common(1)[0][0] if currencies else None
+    stated = total is not None
+    if not stated and items:
+        total = {"amount": sum(item["amount"] for item in items if item["currency"] == currency),
+                 "currency": currency}
+    budget = {
+        "currency": currency,
+        "items": items,
+        "total": total["amount"] if total else None,
+        "total_stated": stated,
+        "tips": tips
+    }
+    if total and "max" in total:
+        budget["total_max"] = total["max"]
+    return budget
+
+
+@lru_cache(maxsize=1024)
+def parse_generation(kind, text):
+    """Structured form of a generation of ``kind`` (itinerary, budget or trip); memoized by text.
+
+    The result is shared between callers and must not be modified.
+    """
+    if kind == "itinerary":
+        structured = parse_itinerary(text)
+    elif kind == "budget":
+        structured = parse_budget(text)
+    else:
+        sections = split_trip_sections(text)
+        structured = {
+            "itinerary": parse_itinerary(sections.get("itinerary", "")),
+            "budget": parse_budget(sections.get("budget", ""))
+        }
+    return {"version": PARSER_VERSION, **structured}
@@ -0,0 +1,318 @@
+"""Trip requests: structured JSON bodies and single-pass free-text parsing.
+
+Every request is turned into a ``TripRequest`` exactly once. That object
+is shared by the prompt builder and the fallback generators. Structured
+bodies (destination, duration or dates, travelers, budget tier,
+interests) are validated in one pass and normalized into a short
+canonical prompt, so equivalent requests share cache entries. A body
+with only ``prompt`` is parsed with the precompiled patterns below;
+those parses are memoized by prompt text.
+"""
+import re
+import string
+from datetime import date
+from functools import lru_cache
+
+DURATION_PATTERN = re.compile(r'(\d+)\s*-?\s*days?\b')
+VISITING_PATTERN = re.compile(r'visiting\s+([^.\n]+)')
+TRIP_TO_PATTERN = re.compile(r'trip to\s+([^.,\n]+?)(?:\s+for\b|[.,\n]|$)', re.IGNORECASE)
+TRAVELERS_PATTERN = re.compile(r'(\d+)\s*(?:traveler|traveller|people|persons|adults|pax)')
+# translate + split is faster than a word regex on long form prompts
+_SEPARATORS = string.punctuation + string.digits + "₹€£"
+_NON_LETTERS = str.maketrans(_SEPARATORS, " " * len(_SEPARATORS))
+
+INTERESTS = (
+    "adventure", "backwaters", "beach", "culture", "food", "heritage", "hiking", "history", "houseboat",
+    "lakes", "markets", "mountains", "museums", "nature", "nightlife", "palaces", "relaxation", "seafood",
+    "shopping", "snow", "spiritual", "temples", "trekking", "wildlife", "yoga"
+)
+# Singular and plural spellings of each interest, matched against the prompt's word set
+_INTEREST_BY_FORM = {form: name for name in INTERESTS
+                     for form in (name, name.rstrip("s"), name.rstrip("s") + "s", name + "es")}
+_INTEREST_RANK = {name: i for i, name in enumerate(INTERESTS)}
+
+INTERNATIONAL_DESTINATIONS = (
+    "australia", "bali", "bangkok", "dubai", "europe", "france", "germany", "indonesia", "italy", "japan",
+    "london", "malaysia", "maldives", "nepal", "new york", "paris", "singapore", "spain", "sri lanka",
+    "switzerland", "thailand", "tokyo", "uae", "uk", "usa", "vietnam"
+)
+_INTERNATIONAL_WORDS = frozenset(d for d in INTERNATIONAL_DESTINATIONS if " " not in d)
+_INTERNATIONAL_PHRASES = tuple(d for d in INTERNATIONAL_DESTINATIONS if " " in d)
+
+
+BUDGET_TIERS = ("budget", "mid", "luxury")
+BUDGET_TIER_ALIASES = {
+    "low": "budget", "cheap": "budget", "economy": "budget", "backpacker": "budget",
+    "medium": "mid", "moderate": "mid", "mid-range": "mid", "midrange": "mid", "standard": "mid",
+    "high": "luxury", "premium": "luxury"
+}
+TRANSPORT_MODES = ("flight", "train", "bus", "car", "cruise")
+ACCOMMODATION_TYPES = {"3star": "budget", "4star": "mid", "5star": "luxury", "hostel": "budget", "homestay": "budget"}
+MEALS = ("breakfast", "lunch", "dinner")
+
+STRUCTURED_FIELDS = ("destination", "duration", "start_date", "end_date", "travelers", "budget_tier", "interests",
+                     "transport", "accommodation", "meals")
+MAX_DURATION = 30
+MAX_TRAVELERS = 50
+MAX_INTERESTS = 10
+MAX_TEXT_LENGTH = 2000
+
+
+class InvalidTripRequest(ValueError):
+    """Raised when a request body fails validation; ``errors`` maps field to message"""
+
+    def __init__(self, errors, message="Invalid trip request"):
+        super().__init__(message)
+        self.errors = errors
+
+
+class TripRequest:
+    """Trip details extracted from one user prompt; immutable and hashable.
+
+    ``duration`` and ``travelers`` are ``None`` when the prompt does not
+    state them. Each caller then applies its own default (the prompt
+    builder says "multi"-day, the fallbacks assume 7 days and 2 travelers).
+    """
+
+    __slots__ = ("prompt", "duration", "destination", "travelers", "interests", "international",
+                 "start_date", "budget_tier", "transport", "accommodation", "meals", "structured")
+
+    def __init__(self, prompt, duration=None, destination=None, travelers=None, interests=(), international=False,
+                 start_date=None, budget_tier=None, transport=None, accommodation=None, meals=(), structured=False):
+        self.prompt = prompt
+        self.duration = duration
+        self.destination = destination
+        self.travelers = travelers
+        self.interests = tuple(interests)
+        self.international = international
+        self.start_date = start_date
+        self.budget_tier = budget_tier
+        self.transport = transport
+        self.accommodation = accommodation
+        self.meals = tuple(meals)
+        self.structured = structured
+
+    @property
+    def domestic(self):
+        return not self.international
+
+    def key(self):
+        """Normalized tuple of the extracted fields, usable as a cache key"""
+        return (self.duration, (self.destination or "").lower(), self.travelers, self.interests, self.international,
+                self.start_date, self.budget_tier, self.transport, self.accommodation, self.meals)
+
+    def __eq__(self, other):
+        return isinstance(other, TripRequest) and self.prompt == other.prompt
+
+    def __hash__(self):
+        return hash(self.prompt)
+
+    def __repr__(self):
+        return (f"TripRequest(duration={self.duration!r}, destination={self.destination!r}, "
+                f"travelers={self.travelers!r}, interests={self.interests!r}, international={self.international!r})")
+
+    def to_dict(self):
+        return {
+            "duration": self.duration,
+            "destination": self.destination,
+            "travelers": self.travelers,
+            "interests": list(self.interests),
+            "international": self.international,
+            "start_date": self.start_date,
+            "budget_tier": self.budget_tier,
+            "transport": self.transport,
+            "accommodation": self.accommodation,
+            "meals": list(self.meals),
+            "structured": self.structured
+        }
+
+    def template_fields(self):
+        """Values for the ``{duration}``/``{destination}``/``{travelers}``/``{prompt}`` template slots"""
+        return {
+            "duration": self.duration or "multi",
+            "destination": self.destination or "the destination",
+            "travelers": f"{self.travelers} travelers" if self.travelers else "travelers",
+            "prompt": self.prompt
+        }
+
+
+def is_international(lower, words=None):
+    """Whether lower-cased text names a destination outside India"""
+    if words is None:
+        words = lower.translate(_NON_LETTERS).split()
+    return not _INTERNATIONAL_WORDS.isdisjoint(words) or any(p in lower for p in _INTERNATIONAL_PHRASES)
+
+
+@lru_cache(maxsize=1024)
+def _parse(prompt):
+    lower = prompt.lower()
+
+    match = DURATION_PATTERN.search(lower)
+    duration = int(match.group(1)) if match else None
+
+    destination = None
+    start = lower.find("visiting")
+    if start >= 0:
+        match = VISITING_PATTERN.match(prompt, start) or VISITING_PATTERN.search(lower, start)
+    else:
+        match = TRIP_TO_PATTERN.search(prompt) if "trip to" in lower else None
+    if match:
+        destination = prompt[match.start(1):match.end(1)].strip()
+
+    match = TRAVELERS_PATTERN.search(lower)
+    travelers = int(match.group(1)) if match else None
+
+    words = set(lower.translate(_NON_LETTERS).split())
+    interests = sorted({_INTEREST_BY_FORM[w] for w in words.intersection(_INTEREST_BY_FORM)}, key=_INTEREST_RANK.get)
+    international = is_international(lower, words)
+    return TripRequest(prompt, duration, destination, travelers, interests, international)
+
+
+def parse_trip_request(prompt):
+    """Parse a prompt into a TripRequest; passing a TripRequest returns it unchanged"""
+    if isinstance(prompt, TripRequest):
+        return prompt
+    return _parse(prompt)
+
+
+def _positive_int(value, field, maximum, errors):
+    if isinstance(value, bool):
+        value = None
+    elif isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or not 1 <= value <= maximum:
+        errors[field] = f"must be a whole number between 1 and {maximum}"
+        return None
+    return value
+
+
+def _iso_date(value, field, errors):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        errors[field] = "must be a date in YYYY-MM-DD format"
+        return None
+
+
+def _choice(value, field, choices, errors, aliases=None):
+    key = value.strip().lower().replace(" ", "") if isinstance(value, str) else None
+    if aliases and key in aliases:
+        return aliases[key]
+    if key not in choices:
+        errors[field] = f"must be one of: {', '.join(choices)}"
+        return None
+    return key
+
+
+def _string_list(value, field, errors, choices=None, limit=MAX_INTERESTS):
+    if isinstance(value, str):
+        value = [v for v in value.split(",")]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value) or len(value) > limit:
+        errors[field] = f"must be a list of at most {limit} strings"
+        return ()
+    items = sorted({" ".join(v.lower().split()) for v in value if v.strip()})
+    if choices:
+        unknown = [v for v in items if v not in choices]
+        if unknown:
+            errors[field] = f"unknown values {unknown}; expected any of: {', '.join(choices)}"
+            return ()
+    return tuple(items)
+
+
+def _normalize_destination(value):
+    name = " ".join(value.split())
+    return name.title() if name.islower() else name
+
+
+def canonical_prompt(fields, notes=None):
+    """Short, deterministic prompt text for a structured request's normalized fields"""
+    text = f"{fields['duration']}-day trip to {fields['destination']} for {fields['travelers']} traveler(s)"
+    if fields["start_date"]:
+        text += f", starting {fields['start_date']}"
+    details = [text]
+    if fields["budget_tier"]:
+        details.append(f"Budget: {fields['budget_tier']}")
+    if fields["interests"]:
+        details.append(f"Interests: {', '.join(fields['interests'])}")
+    if fields["transport"]:
+        details.append(f"Transport: {fields['transport']}")
+    if fields["accommodation"]:
+        details.append(f"Accommodation: {fields['accommodation'].replace('star', '-star hotel')}")
+    if fields["meals"]:
+        details.append(f"Meals included: {', '.join(fields['meals'])}")
+    if notes:
+        details.append(f"Notes: {notes}")
+    return ". ".join(details) + "."
+
+
+def trip_request_from_json(data):
+    """Validate a request body in one pass and return its TripRequest.
+
+    Bodies carrying any structured field are validated field by field and
+    all problems are reported together. A ``prompt`` alongside them is
+    kept as free-text notes. Bodies with only ``prompt`` take the
+    free-text path.
+    """
+    if not isinstance(data, dict):
+        raise InvalidTripRequest({"body": "expected a JSON object"}, "No prompt provided")
+
+    prompt = data.get("prompt")
+    if prompt is not None and not isinstance(prompt, str):
+        raise InvalidTripRequest({"prompt": "must be a string"})
+    prompt = (prompt or "").strip()
+    if len(prompt) > MAX_TEXT_LENGTH:
+        raise InvalidTripRequest({"prompt": f"must be at most {MAX_TEXT_LENGTH} characters"})
+
+    if not any(data.get(field) not in (None, "", []) for field in STRUCTURED_FIELDS):
+        if not prompt:
+            raise InvalidTripRequest({"prompt": "required unless structured fields are given"}, "No prompt provided")
+        return parse_trip_request(prompt)
+
+    errors = {}
+    destination = data.get("destination")
+    if not isinstance(destination, str) or not destination.strip():
+        errors["destination"] = "required"
+    elif len(destination) > 100:
+        errors["destination"] = "must be at most 100 characters"
+    else:
+        destination = _normalize_destination(destination)
+
+    start = _iso_date(data["start_date"], "start_date", errors) if data.get("start_date") else None
+    end = _iso_date(data["end_date"], "end_date", errors) if data.get("end_date") else None
+    duration = None
+    if data.get("duration") not in (None, ""):
+        duration = _positive_int(data["duration"], "duration", MAX_DURATION, errors)
+    if start and end:
+        span = (end - start).days + 1
+        if span < 1:
+            errors["end_date"] = "must not be before start_date"
+        elif duration is not None and duration != span:
+            errors["duration"] = f"does not match the dates ({span} days)"
+        elif span > MAX_DURATION:
+            errors["end_date"] = f"trip must be at most {MAX_DURATION} days"
+        else:
+            duration = span
+    if duration is None and "duration" not in errors and "end_date" not in errors:
+        errors["duration"] = "required (or give start_date and end_date)"
+
+    travelers = _positive_int(data.get("travelers", 1), "travelers", MAX_TRAVELERS, errors)
+    transport = _choice(data["transport"], "transport", TRANSPORT_MODES, errors) if data.get("transport") else None
+    accommodation = (_choice(data["accommodation"], "accommodation", tuple(ACCOMMODATION_TYPES), errors)
+                     if data.get("accommodation") else None)
+    if data.get("budget_tier"):
+        budget_tier = _choice(data["budget_tier"], "budget_tier", BUDGET_TIERS, errors, BUDGET_TIER_ALIASES)
+    else:
+        budget_tier = ACCOMMODATION_TYPES.get(accommodation)
+    interests = _string_list(data.get("interests") or [], "interests", errors)
+    meals = _string_list(data.get("meals") or [], "meals", errors, choices=MEALS, limit=len(MEALS))
+
+    if errors:
+        raise InvalidTripRequest(errors)
+
+    fields = {
+        "duration": duration, "destination": destination, "travelers": travelers, "interests": interests,
+        "start_date": start.isoformat() if start else None, "budget_tier": budget_tier, "transport": transport,
+        "accommodation": accommodation, "meals": meals
+    }
+    return TripRequest(canonical_prompt(fields, prompt), international=is_international(destination.lower()),
+                       structured=True, **fields)
@@ -0,0 +1,66 @@
+import re
+
+SECTION_NAMES = ("itinerary", "budget")
+
+SECTION_MARKER = re.compile(r'^[#*\s]*=+\s*(ITINERARY|BUDGET)\s*=+[#*\s]*$', re.IGNORECASE)
+PARTIAL_MARKER = re.compile(r'^[#*\s]*(=[=\sA-Za-z#*]*)?$')
+
+
+class TripSectionStream:
+    """Incrementally route a combined trip generation into its sections.
+
+    Text is passed through as soon as it arrives; only a line that could
+    still turn out to be a ``=== SECTION ===`` header is held back until
+    its newline shows up.
+    """
+
+    def __init__(self, initial_section="itinerary"):
+        self.section = initial_section
+        self.seen = set()
+        self._line = ""
+        self._emitted = 0
+
+    def _emit(self, out, text):
+        if not text:
+            return
+        self.seen.add(self.section)
+        if out and out[-1][0] == self.section:
+            out[-1] = (self.section, out[-1][1] + text)
+        else:
+            out.append((self.section, text))
+
+    def _end_line(self, out):
+        match = SECTION_MARKER.match(self._line.strip())
+        if match:
+            self.section = match.group(1).lower()
+        else:
+            self._emit(out, self._line[self._emitted:])
+        self._line = ""
+        self._emitted = 0
+
+    def feed(self, piece):
+        """Consume a chunk of generated text; returns a list of (section, text)"""
+        out = []
+        for part in piece.splitlines(keepends=True):
+            self._line += part
+            if self._line.endswith("\n"):
+                self._end_line(out)
+            elif not PARTIAL_MARKER.match(self._line):
+                self._emit(out, self._line[self._emitted:])
+                self._emitted = len(self._line)
+        return out
+
+    def flush(self):
+        out = []
+        if self._line:
+            self._end_line(out)
+        return out
+
+
+def split_trip_sections(text):
+    """Split a complete combined generation into {'itinerary': ..., 'budget': ...}"""
+    splitter = TripSectionStream()
+    sections = {}
+    for section, piece in splitter.feed(text) + splitter.flush():
+        sections[section] = sections.get(section, "") + piece
+    return {name: body.strip() for name, body in sections.items() if body.strip()}
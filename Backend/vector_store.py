@@ -0,0 +1,364 @@
+"""Embedded, CPU-only vector store for similar-trip retrieval.
+
+Documents are embedded with a feature-hashing embedder, so no model
+download is needed and everything works offline. Embeddings live in a
+memory-mapped float32 matrix on disk. Ids, metadata and text live next
+to it in SQLite. A few metadata fields per store are kept as in-memory
+integer codes for vectorized equality filters. Search is a batched
+matrix product over the filtered rows.
+
+Several processes (e.g. uvicorn workers) may share one store. Rows are
+allocated while holding SQLite's write lock, after catching up with rows
+other processes appended, and each process picks up new rows before it
+searches.
+
+Once a collection reaches ``VECTOR_IVF_MIN_ROWS`` rows, an inverted-file
+(IVF) index is trained with spherical k-means. Queries then scan only
+the ``nprobe`` closest clusters instead of every row.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_PATH = os.environ.get("VECTOR_STORE_PATH", "vector_store")
+VECTOR_DIM = int(os.environ.get("VECTOR_DIM", "512"))
+VECTOR_IVF_MIN_ROWS = int(os.environ.get("VECTOR_IVF_MIN_ROWS", "4096"))
+VECTOR_IVF_NPROBE = int(os.environ.get("VECTOR_IVF_NPROBE", "8"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+INITIAL_CAPACITY = 1024
+SEARCH_CHUNK_ROWS = 65536
+
+
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams (and optionally bigrams) into ``dim`` dimensions.
+
+    Term counts are dampened with 1 + log(tf) and vectors are L2-normalized,
+    so a dot product is the cosine similarity.
+    """
+
+    def __init__(self, dim=VECTOR_DIM, bigrams=True):
+        self.dim = dim
+        self.bigrams = bigrams
+
+    def features(self, text):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if self.bigrams:
+            tokens = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        counts = {}
+        for feature in tokens:
+            counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self.features(text).items():
+                h = zlib.crc32(feature.encode())
+                matrix[row, h % self.dim] += (1.0 + np.log(count)) * (1.0 if h & 0x80000000 else -1.0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+def _field_value(value):
+    return "" if value is None else str(value).lower()
+
+
+def _grown(array, capacity):
+    grown = np.full(capacity, -1, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def spherical_kmeans(vectors, k, iterations=10, seed=0):
+    """Cluster unit vectors by cosine similarity; returns (centroids, assignments)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    assignments = np.zeros(len(vectors), dtype=np.int32)
+    for _ in range(iterations):
+        for start in range(0, len(vectors), SEARCH_CHUNK_ROWS):
+            block = vectors[start:start + SEARCH_CHUNK_ROWS]
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids.astype(np.float32), assignments
+
+
+class VectorStore:
+    """Persistent collection of embedded documents with metadata filtering and optional IVF search.
+
+    ``fields`` names the metadata keys that can be used in ``where`` filters;
+    their values are compared as lowercase strings.
+    """
+
+    def __init__(self, path=VECTOR_STORE_PATH, dim=VECTOR_DIM, embedder=None, fields=("destination", "type"),
+                 ivf_min_rows=VECTOR_IVF_MIN_ROWS, nprobe=VECTOR_IVF_NPROBE):
+        self.path = path
+        self.dim = dim
+        self.embedder = embedder or HashingEmbedder(dim)
+        self.fields = tuple(fields)
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self._conn = sqlite3.connect(os.path.join(path, "documents.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                row INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                cluster INTEGER NOT NULL DEFAULT -1,
+                created_at REAL NOT NULL,
+                document TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        self._matrix_path = os.path.join(path, "embeddings.f32")
+        self._centroids_path = os.path.join(path, "centroids.npy")
+        self._load()
+
+    # -- storage -------------------------------------------------------
+
+    def _open_matrix(self, capacity):
+        size = capacity * self.dim * 4
+        with open(self._matrix_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def _load(self):
+        existing = os.path.getsize(self._matrix_path) // (self.dim * 4) if os.path.exists(self._matrix_path) else 0
+        self._open_matrix(max(existing, INITIAL_CAPACITY))
+
+        self.count = 0
+        self._ids = {}
+        self._codes = {field: {} for field in self.fields}
+        self._columns = {field: np.full(self._capacity, -1, dtype=np.int32) for field in self.fields}
+        self._clusters = np.full(self._capacity, -1, dtype=np.int32)
+        self._centroids = np.load(self._centroids_path) if os.path.exists(self._centroids_path) else None
+        self._indexed_rows = 0
+        self._refresh()
+        self._trained_rows = self._indexed_rows
+
+    def _refresh(self):
+        """Pick up rows appended since the last look, including those written by other processes"""
+        rows = self._conn.execute(
+            "SELECT row, id, cluster, metadata FROM documents WHERE row >= ? ORDER BY row", (self.count,)
+        ).fetchall()
+        if not rows:
+            return
+        self._grow(rows[-1][0] + 1)
+        for row, doc_id, cluster, metadata in rows:
+            self._ids[doc_id] = row
+            self._set_fields(row, json.loads(metadata))
+            self._clusters[row] = cluster
+            self._indexed_rows += int(cluster >= 0)
+        self.count = rows[-1][0] + 1
+
+    def _set_fields(self, row, metadata):
+        for field in self.fields:
+            codes = self._codes[field]
+            value = _field_value(metadata.get(field))
+            if value not in codes:
+                codes[value] = len(codes)
+            self._columns[field][row] = codes[value]
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        self._matrix.flush()
+        del self._matrix
+        self._open_matrix(capacity)
+        for field, old in list(self._columns.items()):
+            self._columns[field] = _grown(old, capacity)
+        self._clusters = _grown(self._clusters, capacity)
+
+    # -- writes --------------------------------------------------------
+
+    def add(self, documents, metadatas, ids=None):
+        """Embed and store documents (upserting by id); returns the ids"""
+        if ids is None:
+            ids = [hashlib.sha1("|".join([*(str(m.get(f)) for f in self.fields), d]).encode()).hexdigest()
+                   for d, m in zip(documents, metadatas)]
+        vectors = self.embedder.embed(documents)
+        now = time.time()
+
+        with self._lock:
+            # The write lock makes row allocation safe across processes sharing the store
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write(ids, documents, metadatas, vectors, now)
+            except Exception:
+                self._conn.rollback()
+                self._load()
+                raise
+
+            if self.count >= self.ivf_min_rows and (self._centroids is None or self.count >= 2 * self._trained_rows):
+                self.build_index()
+        return ids
+
+    def _write(self, ids, documents, metadatas, vectors, now):
+        """Store vectors and rows; runs inside the write transaction and commits it"""
+        self._refresh()
+        new_rows = sum(1 for i in ids if i not in self._ids)
+        self._grow(self.count + new_rows)
+        records = []
+        for doc_id, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+            row = self._ids.get(doc_id)
+            if row is None:
+                row = self.count
+                self.count += 1
+                self._ids[doc_id] = row
+            self._matrix[row] = vector
+            self._set_fields(row, metadata)
+            cluster = -1
+            if self._centroids is not None:
+                cluster = int(np.argmax(self._centroids @ vector))
+                self._indexed_rows += int(self._clusters[row] < 0)
+            self._clusters[row] = cluster
+            records.append((row, doc_id, cluster, now, document, json.dumps(metadata, default=str)))
+        # Vectors reach the shared file before their rows become visible to other processes
+        self._matrix.flush()
+        self._conn.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)", records)
+        self._conn.commit()
+
+    def build_index(self, nlist=None):
+        """Train IVF centroids on the current rows and assign every row to a cluster"""
+        with self._lock:
+            if self.count == 0:
+                return
+            nlist = nlist or max(1, int(np.sqrt(self.count)))
+            nlist = min(nlist, self.count)
+            started = time.time()
+            centroids, assignments = spherical_kmeans(np.asarray(self._matrix[:self.count]), nlist)
+            self._centroids = centroids
+            self._clusters[:self.count] = assignments
+            self._indexed_rows = self._trained_rows = self.count
+            np.save(self._centroids_path, centroids)
+            self._conn.executemany("UPDATE documents SET cluster = ? WHERE row = ?",
+                                   ((int(c), r) for r, c in enumerate(assignments)))
+            self._conn.commit()
+            logger.info(f"Vector IVF index: {nlist} clusters over {self.count} rows in {time.time() - started:.2f}s")
+
+    # -- reads ---------------------------------------------------------
+
+    def _filter_mask(self, n, where=None):
+        """Rows matching every ``where`` field (a value, or a list of accepted values); None if none can"""
+        mask = np.ones(n, dtype=bool)
+        for field, accepted in (where or {}).items():
+            if not isinstance(accepted, (list, tuple, set, frozenset)):
+                accepted = [accepted]
+            codes = self._codes[field]
+            wanted = [codes[v] for v in map(_field_value, accepted) if v in codes]
+            if not wanted:
+                return None
+            mask &= np.isin(self._columns[field][:n], wanted)
+        return mask
+
+    def _candidate_rows(self, query_vectors, mask, exact):
+        """Rows to score for each query: the filtered rows, narrowed to the nprobe nearest clusters with IVF"""
+        n = len(mask)
+        if exact or self._centroids is None or n < self.ivf_min_rows:
+            return [np.flatnonzero(mask)] * len(query_vectors)
+        nprobe = min(self.nprobe, len(self._centroids))
+        probes = np.argpartition(-(query_vectors @ self._centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        clusters = self._clusters[:n]
+        return [np.flatnonzero(mask & np.isin(clusters, p)) for p in probes]
+
+    def search_batch(self, queries, limit=5, where=None, exact=False):
+        """Top-``limit`` matches for each query text; returns one list of (row, score) per query"""
+        query_vectors = self.embedder.embed(queries)
+        with self._lock:
+            self._refresh()
+            n = self.count
+            mask = self._filter_mask(n, where) if n else None
+            if mask is None or not mask.any():
+                return [[] for _ in queries]
+            results = []
+            for query, rows in zip(query_vectors, self._candidate_rows(query_vectors, mask, exact)):
+                if len(rows) == 0:
+                    results.append([])
+                    continue
+                scores = np.concatenate([
+                    self._matrix[rows[i:i + SEARCH_CHUNK_ROWS]] @ query
+                    for i in range(0, len(rows), SEARCH_CHUNK_ROWS)
+                ])
+                k = min(limit, len(rows))
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+                results.append([(int(rows[i]), float(scores[i])) for i in top])
+            return results
+
+    def documents(self, rows):
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            found = self._conn.execute(
+                f"SELECT row, id, document, metadata FROM documents WHERE row IN ({placeholders})", rows
+            ).fetchall()
+        return {row: {"id": doc_id, "content": document, "metadata": json.loads(metadata)}
+                for row, doc_id, document, metadata in found}
+
+    def search(self, query, limit=5, where=None, exact=False):
+        """Best matches for one query as dicts with content, metadata, distance and relevance_score"""
+        hits = self.search_batch([query], limit, where, exact)[0]
+        docs = self.documents([row for row, _ in hits])
+        return [{**docs[row], "distance": round(1.0 - score, 6), "relevance_score": round(score, 6)}
+                for row, score in hits if row in docs]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "dim": self.dim,
+                "documents": self.count,
+                "capacity": self._capacity,
+                "ivf_clusters": len(self._centroids) if self._centroids is not None else 0,
+                "indexed_rows": self._indexed_rows,
+                "distinct_values": {field: len(codes) for field, codes in self._codes.items()}
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    """Return the process-wide VectorStore, opening it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore()
+                logger.info(f"Vector store: {_store.count} documents at {_store.path}")
+    return _store
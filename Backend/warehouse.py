@@ -0,0 +1,266 @@
+"""Precomputed trip plans for the most requested destinations.
+
+Itinerary and budget text for every destination x duration x travelers
+x budget tier x season combination in the configured grid is generated
+ahead of time and kept in a small SQLite table. The text is
+zlib-compressed and keyed by those five fields. A request without a
+budget tier uses the mid tier and one without a start date the current
+season, so bare API calls and the trip form (which always sends a date,
+transport, accommodation and meals) both land on the grid. Routes look a
+request up before touching the cache or the model. A background thread fills missing entries and regenerates stale
+ones, but only while the model server is otherwise idle.
+
+Build or refresh the whole grid offline with ``python warehouse.py --build``.
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from semantic_cache import SEASONS
+
+logger = logging.getLogger(__name__)
+
+
+def _csv(name, default):
+    return [v.strip() for v in os.environ.get(name, default).split(",") if v.strip()]
+
+
+WAREHOUSE_ENABLED = os.environ.get("WAREHOUSE_ENABLED", "1") != "0"
+WAREHOUSE_PATH = os.environ.get("WAREHOUSE_PATH", "trip_warehouse.sqlite3")
+WAREHOUSE_DESTINATIONS = _csv("WAREHOUSE_DESTINATIONS", "Goa,Jaipur,Kerala,Udaipur")
+WAREHOUSE_DURATIONS = [int(v) for v in _csv("WAREHOUSE_DURATIONS", "2,3,4,5")]
+WAREHOUSE_TRAVELERS = [int(v) for v in _csv("WAREHOUSE_TRAVELERS", "1,2,4")]
+WAREHOUSE_TIERS = _csv("WAREHOUSE_TIERS", "budget,mid,luxury")
+WAREHOUSE_SEASONS = _csv("WAREHOUSE_SEASONS", "winter,summer,monsoon,autumn")
+WAREHOUSE_MAX_AGE = float(os.environ.get("WAREHOUSE_MAX_AGE", str(7 * 24 * 3600)))
+WAREHOUSE_SERVE_STALE = float(os.environ.get("WAREHOUSE_SERVE_STALE", str(30 * 24 * 3600)))
+WAREHOUSE_REFRESH_INTERVAL = float(os.environ.get("WAREHOUSE_REFRESH_INTERVAL", "300"))
+# "exact" serves plans only to requests without interests, which change what the plan should cover;
+# "core" (opt-in) serves them whenever the five key fields match. Transport, meals and the exact start
+# date are booking details the plans do not depend on, so they never prevent a hit.
+WAREHOUSE_MATCH = os.environ.get("WAREHOUSE_MATCH", "exact")
+
+PREFERENCE_FIELDS = ("interests",)
+DEFAULT_TIER = "mid"
+SEASON_MONTHS = {"winter": "December to February", "summer": "March to May", "monsoon": "June to September",
+                 "autumn": "October and November"}
+
+
+def season_of(start_date):
+    """Season bucket of an ISO start date, or of today when there is none"""
+    month = int(start_date[5:7]) if start_date else time.localtime().tm_mon
+    return SEASONS[month]
+
+
+def plan_request(key):
+    """Structured request body a warehouse entry is generated from"""
+    destination, duration, travelers, tier, season = key
+    return {"destination": destination, "duration": duration, "travelers": travelers, "budget_tier": tier,
+            "prompt": f"Travelling in the {season} season ({SEASON_MONTHS[season]})"}
+
+
+class TripWarehouse:
+    """SQLite store of pre-generated itinerary/budget pairs plus a background refresher"""
+
+    def __init__(self, path=WAREHOUSE_PATH, destinations=WAREHOUSE_DESTINATIONS, durations=WAREHOUSE_DURATIONS,
+                 travelers=WAREHOUSE_TRAVELERS, tiers=WAREHOUSE_TIERS, seasons=WAREHOUSE_SEASONS,
+                 max_age=WAREHOUSE_MAX_AGE, serve_stale=WAREHOUSE_SERVE_STALE,
+                 refresh_interval=WAREHOUSE_REFRESH_INTERVAL, match=WAREHOUSE_MATCH, enabled=WAREHOUSE_ENABLED):
+        self.path = path
+        self.destinations = destinations
+        self.durations = durations
+        self.travelers = travelers
+        self.tiers = tiers
+        self.seasons = seasons
+        self.max_age = max_age
+        self.serve_stale = serve_stale
+        self.refresh_interval = refresh_interval
+        self.match = match
+        self.enabled = enabled
+        self._destination_names = {d.lower(): d for d in destinations}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._generate = None
+        self._can_refresh = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshed = 0
+        self.refresh_failures = 0
+
+        self._conn = None
+        if enabled:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(trip_plans)")}
+            if columns and "season" not in columns:
+                # Plans from before tier/season keys; the refresher regenerates them
+                self._conn.execute("DROP TABLE trip_plans")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS trip_plans (
+                    destination TEXT NOT NULL,
+                    duration INTEGER NOT NULL,
+                    travelers INTEGER NOT NULL,
+                    budget_tier TEXT NOT NULL,
+                    season TEXT NOT NULL,
+                    itinerary BLOB NOT NULL,
+                    budget BLOB NOT NULL,
+                    model TEXT NOT NULL,
+                    generated_at REAL NOT NULL,
+                    PRIMARY KEY (destination, duration, travelers, budget_tier, season)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_trip_plans_age ON trip_plans(generated_at)")
+
+    def grid(self):
+        return [(d, n, t, tier, season) for d in self.destinations for n in self.durations for t in self.travelers
+                for tier in self.tiers for season in self.seasons]
+
+    def key_for(self, trip):
+        """Warehouse key for a request, or None when it falls outside the precomputed grid"""
+        if not self.enabled or not trip.destination or not trip.duration or not trip.travelers:
+            return None
+        destination = self._destination_names.get(trip.destination.lower())
+        if destination is None or trip.duration not in self.durations or trip.travelers not in self.travelers:
+            return None
+        tier = trip.budget_tier or DEFAULT_TIER
+        season = season_of(trip.start_date)
+        if tier not in self.tiers or season not in self.seasons:
+            return None
+        if self.match == "exact" and any(getattr(trip, f) for f in PREFERENCE_FIELDS):
+            return None
+        return destination, trip.duration, trip.travelers, tier, season
+
+    def lookup(self, trip):
+        """Return {'itinerary': ..., 'budget': ...} for a matching, fresh-enough plan, else None"""
+        key = self.key_for(trip)
+        if key is None:
+            return None
+        if self._generate is not None:
+            self.start()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT itinerary, budget, generated_at FROM trip_plans "
+                "WHERE destination = ? AND duration = ? AND travelers = ? AND budget_tier = ? AND season = ?", key
+            ).fetchone()
+            if row is None or time.time() - row[2] > self.serve_stale:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {"itinerary": zlib.decompress(row[0]).decode(), "budget": zlib.decompress(row[1]).decode()}
+
+    def store(self, key, sections, model):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO trip_plans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, zlib.compress(sections["itinerary"].encode(), 9), zlib.compress(sections["budget"].encode(), 9),
+                 model, time.time())
+            )
+
+    def due(self, limit=None):
+        """Grid entries that are missing or older than max_age, oldest first and the current season first"""
+        with self._lock:
+            ages = {key[:5]: key[5] for key in self._conn.execute(
+                "SELECT destination, duration, travelers, budget_tier, season, generated_at FROM trip_plans"
+            )}
+        cutoff = time.time() - self.max_age
+        seasons = list(dict.fromkeys(SEASONS.values()))
+        now = seasons.index(season_of(None))
+        upcoming = seasons[now:] + seasons[:now]
+        due = [key for key in self.grid() if ages.get(key, 0) < cutoff]
+        due.sort(key=lambda k: (ages.get(k, 0), upcoming.index(k[4])))
+        return due[:limit] if limit else due
+
+    def refresh(self, generate, limit=None, can_continue=None):
+        """Generate plans for due entries; ``generate(key)`` returns sections or None"""
+        done = 0
+        for key in self.due(limit):
+            if self._stop.is_set() or (can_continue is not None and not can_continue()):
+                break
+            try:
+                result = generate(key)
+            except Exception as e:
+                logger.error(f"Warehouse generation failed for {key}: {e}")
+                result = None
+            if result is None:
+                self.refresh_failures += 1
+                continue
+            sections, model = result
+            self.store(key, sections, model)
+            self.refreshed += 1
+            done += 1
+            logger.info(f"Warehouse refreshed {key[0]} / {key[1]} days / {key[2]} travelers / {key[3]} / {key[4]}")
+        return done
+
+    def configure_refresh(self, generate, can_refresh):
+        """Register the generator used by the background refresher and its idle check"""
+        self._generate = generate
+        self._can_refresh = can_refresh
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._can_refresh is None or self._can_refresh():
+                self.refresh(self._generate, can_continue=self._can_refresh)
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        """Start the background refresher once per process"""
+        if not self.enabled or self._generate is None:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="warehouse-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            entries, size, oldest = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(itinerary) + LENGTH(budget)), 0), MIN(generated_at) FROM trip_plans"
+            ).fetchone()
+        return {
+            "enabled": True,
+            "path": self.path,
+            "grid_size": len(self.grid()),
+            "entries": entries,
+            "compressed_bytes": size,
+            "oldest_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "due": len(self.due()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshed": self.refreshed,
+            "refresh_failures": self.refresh_failures
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the precomputed trip plan warehouse")
+    parser.add_argument("--build", action="store_true", help="generate every missing or stale entry now")
+    parser.add_argument("--limit", type=int, help="generate at most this many entries")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    import app  # the generator needs the model client, prompt templates and admission control
+
+    if args.build:
+        done = app.warehouse.refresh(app.generate_warehouse_plan, limit=args.limit)
+        print(f"Generated {done} plan(s)")
+    for name, value in app.warehouse.stats().items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()